@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+import json
+import socket
+import threading
+import time
+
+import httpx
+import numpy as np
+import orjson
+import uvicorn
+
+from openmockllm.logger import init_logger
+
+logger = init_logger(__name__)
+
+WORKLOADS = ("chat", "chat-stream", "embeddings", "rerank")
+PERCENTILES = (50, 95, 99)
+
+
+def parse_bench_args(argv: list[str] | None = None) -> tuple[argparse.Namespace, list[str]]:
+    """
+    Parse the arguments of the bench command, the unknown arguments are the arguments of the in-process server
+    """
+    parser = argparse.ArgumentParser(prog="openmockllm bench", description="Measure the throughput and latencies of OpenMockLLM")
+    parser.add_argument("--url", type=str, default=None, help="URL of the server to bench (default: a server started in-process)")
+    parser.add_argument("--workload", type=str, choices=WORKLOADS, default="chat", help="Requests sent by the bench (default: chat)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Number of requests in flight (default: 32)")
+    parser.add_argument("--requests", type=int, default=1000, help="Number of requests sent (default: 1000)")
+    parser.add_argument("--duration", type=float, default=None, help="Duration of the bench in seconds, instead of --requests (optional)")
+    parser.add_argument("--warmup-requests", type=int, default=10, help="Number of requests sent before the measures (default: 10)")
+    parser.add_argument("--model", type=str, default="openmockllm", help="Model of the requests (default: openmockllm)")
+    parser.add_argument("--prompt-tokens", type=int, default=128, help="Number of tokens of the prompts and inputs (default: 128)")
+    parser.add_argument("--max-tokens", type=int, default=128, help="Number of tokens of the chat completions (default: 128)")
+    parser.add_argument(
+        "--top-logprobs", type=int, default=None, help="Request the logprobs of the chat completions, with this number of top logprobs (optional)"
+    )
+    parser.add_argument("--batch-size", type=int, default=8, help="Number of inputs of the embeddings requests (default: 8)")
+    parser.add_argument("--rerank-texts", type=int, default=16, help="Number of texts of the rerank requests (default: 16)")
+    parser.add_argument("--api-key", type=str, default=None, help="API key of the server (optional)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    return parser.parse_known_args(argv)
+
+
+@dataclass
+class BenchResults:
+    """Measures of the requests of a bench"""
+
+    latencies: list[float] = field(default_factory=list)
+    ttfts: list[float] = field(default_factory=list)
+    itls: list[float] = field(default_factory=list)
+    tokens: int = 0
+    errors: int = 0
+
+
+class Workload:
+    """
+    Requests of a bench workload and how their response is measured.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.name = args.workload
+        # a repeated word is a token per repetition
+        prompt = " hello" * args.prompt_tokens
+        # tokens counted for the responses without usage
+        self.request_tokens = 0
+        if self.name in ("chat", "chat-stream"):
+            self.path = "/v1/chat/completions"
+            self.body = {"model": args.model, "messages": [{"role": "user", "content": prompt}], "max_tokens": args.max_tokens}
+            if self.name == "chat-stream":
+                self.body.update({"stream": True, "stream_options": {"include_usage": True}})
+            if args.top_logprobs is not None:
+                self.body.update({"logprobs": True, "top_logprobs": args.top_logprobs})
+        elif self.name == "embeddings":
+            self.path = "/v1/embeddings"
+            self.body = {"model": args.model, "input": [prompt] * args.batch_size}
+        else:
+            self.path = "/rerank"
+            self.body = {"query": "What is Deep Learning?", "texts": [prompt] * args.rerank_texts}
+            self.request_tokens = args.prompt_tokens * args.rerank_texts
+        self.content = orjson.dumps(self.body)
+
+    async def send(self, client: httpx.AsyncClient, results: BenchResults) -> None:
+        started = time.perf_counter()
+        try:
+            if self.name == "chat-stream":
+                tokens = await self._stream(client=client, started=started, results=results)
+            else:
+                response = await client.post(self.path, content=self.content)
+                response.raise_for_status()
+                tokens = self._count_tokens(data=response.json())
+        except httpx.HTTPError:
+            results.errors += 1
+            return
+
+        results.latencies.append(time.perf_counter() - started)
+        results.tokens += tokens
+
+    async def _stream(self, client: httpx.AsyncClient, started: float, results: BenchResults) -> int:
+        tokens, previous = 0, None
+        async with client.stream("POST", self.path, content=self.content) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                # only the content chunks are timed, and only the usage chunk is parsed
+                if '"content"' in line and '"content":""' not in line:
+                    now = time.perf_counter()
+                    if previous is None:
+                        results.ttfts.append(now - started)
+                    else:
+                        results.itls.append(now - previous)
+                    previous = now
+                if '"completion_tokens"' in line:
+                    tokens = self._count_tokens(data=orjson.loads(line[6:]))
+
+        return tokens
+
+    def _count_tokens(self, data: dict | list) -> int:
+        if isinstance(data, list):
+            # TEI /rerank returns the scores without usage, the tokens are those of the reranked texts
+            return self.request_tokens
+
+        usage = data.get("usage") or {}
+        if self.name in ("chat", "chat-stream"):
+            return usage.get("completion_tokens") or 0
+
+        return usage.get("prompt_tokens") or 0
+
+
+async def run_workload(
+    url: str, workload: Workload, concurrency: int, requests: int, duration: float | None = None, api_key: str | None = None
+) -> dict:
+    """
+    Send the requests of a workload with `concurrency` requests in flight.
+
+    Args:
+        url (str): URL of the server.
+        workload (Workload): Requests of the bench.
+        concurrency (int): Number of requests in flight.
+        requests (int): Number of requests sent, unless `duration` is set.
+        duration (float | None): Duration of the bench in seconds.
+        api_key (str | None): API key of the server.
+
+    Returns:
+        dict: Report of the bench.
+    """
+    results = BenchResults()
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    remaining = requests
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker():
+        nonlocal remaining
+        while (deadline is None and remaining > 0) or (deadline is not None and time.perf_counter() < deadline):
+            remaining -= 1
+            await workload.send(client=client, results=results)
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=None) as client:
+        cpu_started = time.process_time()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        cpu_time = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+
+    completed = len(results.latencies)
+    report = {
+        "workload": workload.name,
+        "concurrency": concurrency,
+        "requests": completed,
+        "errors": results.errors,
+        "duration": elapsed,
+        "requests_per_second": completed / elapsed,
+        "tokens_per_second": results.tokens / elapsed,
+        "latency_ms": get_percentiles(values=results.latencies),
+        "cpu_ms_per_request": 1000 * cpu_time / completed if completed else None,
+    }
+    if workload.name == "chat-stream":
+        report["ttft_ms"] = get_percentiles(values=results.ttfts)
+        report["itl_ms"] = get_percentiles(values=results.itls)
+
+    return report
+
+
+def get_percentiles(values: list[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+
+    percentiles = np.percentile(np.asarray(values) * 1000, PERCENTILES)
+    return {f"p{p}": float(value) for p, value in zip(PERCENTILES, percentiles, strict=True)}
+
+
+def start_server(server_argv: list[str]) -> tuple[uvicorn.Server, threading.Thread, str]:
+    """
+    Start a server in a thread of the bench process, on a free port.
+
+    Args:
+        server_argv (list[str]): Arguments of the server.
+
+    Returns:
+        tuple[uvicorn.Server, threading.Thread, str]: The server, its thread and its URL.
+    """
+    from openmockllm.config import load_models_config
+    from openmockllm.main import create_app, create_models_app, parse_args
+
+    args = parse_args(argv=server_argv)
+    app = create_models_app(models=load_models_config(path=args.config, args=args)) if args.config else create_app(args)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app=app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="bench-server", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The bench server failed to start")
+        time.sleep(0.01)
+
+    return server, thread, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"Workload:          {report['workload']}",
+        f"Concurrency:       {report['concurrency']}",
+        f"Requests:          {report['requests']} ({report['errors']} errors) in {report['duration']:.2f}s",
+        f"Requests/s:        {report['requests_per_second']:.1f}",
+        f"Tokens/s:          {report['tokens_per_second']:.1f}",
+    ]
+    for key, label in (("latency_ms", "Latency (ms)"), ("ttft_ms", "TTFT (ms)"), ("itl_ms", "ITL (ms)")):
+        if report.get(key):
+            lines.append(f"{label + ':':<19}" + "  ".join(f"{p} {value:.2f}" for p, value in report[key].items()))
+    if report["cpu_ms_per_request"] is not None:
+        lines.append(f"CPU/request (ms):  {report['cpu_ms_per_request']:.3f} ({report['cpu_scope']})")
+
+    return "\n".join(lines)
+
+
+def run_bench(argv: list[str] | None = None) -> dict:
+    """
+    Entry point of the `openmockllm bench` command.
+
+    The bench drives a workload against the server at `--url`, or against a server started in the bench
+    process with the remaining arguments (e.g. `openmockllm bench --workload rerank --backend tei`).
+    The CPU time per request is the one of the bench process, so it includes the server when it runs
+    in-process.
+    """
+    args, server_argv = parse_bench_args(argv=argv)
+
+    server = thread = None
+    url = args.url
+    if url is None:
+        if args.workload == "rerank" and "--backend" not in server_argv:
+            server_argv = [*server_argv, "--backend", "tei"]
+        server, thread, url = start_server(server_argv=server_argv)
+
+    try:
+        workload = Workload(args=args)
+        if args.warmup_requests:
+            concurrency = min(args.concurrency, args.warmup_requests)
+            asyncio.run(run_workload(url=url, workload=workload, concurrency=concurrency, requests=args.warmup_requests, api_key=args.api_key))
+        report = asyncio.run(
+            run_workload(
+                url=url, workload=workload, concurrency=args.concurrency, requests=args.requests, duration=args.duration, api_key=args.api_key
+            )
+        )
+        report["cpu_scope"] = "client only" if args.url else "client and server"
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report=report))
+
+    return report
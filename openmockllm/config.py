@@ -0,0 +1,105 @@
+import argparse
+import json
+from pathlib import Path
+
+from openmockllm.latency import LatencyProfile
+
+# arguments of the whole server, shared by all the models of a config file
+SERVER_ARGS = frozenset(
+    {
+        "host",
+        "port",
+        "reload",
+        "workers",
+        "config",
+        "api_key",
+        "tiktoken_encoder",
+        "faker_langage",
+        "faker_seed",
+        "corpus_size",
+        "simulate_latency",
+        "reference_tps",
+        "reference_embedding_tps",
+        "embedding_overhead_ms",
+        "embedding_contention",
+        "stream_chunk_tokens",
+    }
+)
+
+
+def load_models_config(path: str | Path, args: argparse.Namespace) -> list[argparse.Namespace]:
+    """
+    Arguments of each model of a config file.
+
+    The config file is a JSON object with a list of models, each with a `name`, a `backend` and any
+    model argument of the command line, with dashes or underscores. The arguments missing from a model
+    are those of the command line, the paths of the config file are relative to its directory. A model
+    is served under the `/<prefix>` path, its name by default:
+
+        {"models": [{"name": "llama", "backend": "vllm", "max-context": 8192, "latency-profile": "llama.json"},
+                    {"name": "bge", "backend": "tei", "embedding-dimension": 768, "prefix": "embeddings"}]}
+
+    Args:
+        path (str | Path): The config file.
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        list[argparse.Namespace]: The arguments of each model, with its `model_name` and `prefix`.
+    """
+    path = Path(path)
+    config = json.loads(path.read_text())
+    if not isinstance(config, dict) or not config.get("models"):
+        raise ValueError(f"Config file {path} has no models")
+
+    models, names, prefixes = [], set(), set()
+    for model in config["models"]:
+        values = {key.replace("-", "_"): value for key, value in model.items()}
+        name = values.pop("name", None)
+        if not name or "backend" not in values:
+            raise ValueError(f"Model without name or backend in config file {path}: {model}")
+        if name in names:
+            raise ValueError(f"Duplicate model `{name}` in config file {path}")
+        names.add(name)
+        if values["backend"] not in ("vllm", "mistral", "tei"):
+            raise ValueError(f"Unknown backend `{values['backend']}` of model `{name}` in config file {path}")
+
+        prefix = str(values.pop("prefix", name)).strip("/")
+        if not prefix or "/" in prefix or prefix in prefixes:
+            raise ValueError(f"Invalid or duplicate prefix `{prefix}` of model `{name}` in config file {path}")
+        prefixes.add(prefix)
+
+        for key in values:
+            if key in SERVER_ARGS:
+                raise ValueError(f"`{key}` of model `{name}` is an argument of the whole server, set it on the command line")
+            if not hasattr(args, key):
+                raise ValueError(f"Unknown argument `{key}` of model `{name}` in config file {path}")
+
+        if values.get("latency_profile"):
+            values["latency_profile"] = str(path.parent / values["latency_profile"])
+
+        models.append(argparse.Namespace(**{**vars(args), **values, "model_name": name, "prefix": prefix}))
+
+    # the latency profiles are checked before starting the server, each file once
+    profiles = {}
+    for model in models:
+        if model.latency_profile and model.latency_profile not in profiles:
+            profiles[model.latency_profile] = check_latency_profile(path=model.latency_profile, model_name=model.model_name)
+
+    return models
+
+
+def check_latency_profile(path: str | Path, model_name: str) -> LatencyProfile:
+    """
+    Load the latency profile of a model, to report a missing or invalid file before starting the server.
+
+    Args:
+        path (str | Path): The latency profile file.
+        model_name (str): The model using the profile.
+
+    Returns:
+        LatencyProfile: The latency profile.
+    """
+    try:
+        return LatencyProfile.from_file(path=path)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Invalid latency profile {path} of model `{model_name}`: {e}") from e
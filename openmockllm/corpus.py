@@ -0,0 +1,100 @@
+from array import array
+from bisect import bisect_left
+import random
+from typing import TYPE_CHECKING
+
+import numpy as np
+from tiktoken import Encoding
+
+if TYPE_CHECKING:
+    from faker import Faker
+
+
+class TextCorpus:
+    """
+    Pool of Faker text encoded once with the configured tokenizer.
+
+    Completions are slices of consecutive tokens of the pool: the text of a slice is read
+    from the character offsets computed at build time, so sampling a completion of N tokens
+    costs O(N) and never calls Faker nor the tokenizer. The pool is circular, a slice longer
+    than the pool wraps around.
+    """
+
+    def __init__(self, tokenizer: Encoding, fake: "Faker", size: int = 65536):
+        """
+        Args:
+            tokenizer (Encoding): Tokenizer used to encode the pool.
+            fake (Faker): Faker instance used to generate the paragraphs.
+            size (int): Minimum number of tokens in the pool.
+        """
+        paragraphs = []
+        token_ids = []
+        tokens_per_paragraph = 50
+        while len(token_ids) < size:
+            # the pool is re-encoded until it is large enough, the first round estimates the size of a paragraph
+            missing = max(1, (size - len(token_ids)) // tokens_per_paragraph) if paragraphs else 16
+            paragraphs.extend(fake.paragraph(nb_sentences=random.randint(2, 6)) for _ in range(missing))
+            # trailing separator so that a slice wrapping around the pool keeps paragraphs apart
+            token_ids = tokenizer.encode("\n\n".join(paragraphs) + "\n\n")
+            tokens_per_paragraph = max(1, len(token_ids) // len(paragraphs))
+
+        text, offsets = tokenizer.decode_with_offsets(token_ids)
+
+        self.text = text
+        self.token_ids = array("I", token_ids)
+        # offsets[i] is the character offset of token i, offsets[len(token_ids)] is the end of the text
+        self.offsets = array("I", offsets)
+        self.offsets.append(len(text))
+        # number of characters of each token
+        self.token_lengths = np.diff(np.frombuffer(self.offsets, dtype=np.uint32).astype(np.int64))
+        # sorted distinct token IDs of the pool, the candidates of the mock logprobs
+        self.vocabulary = np.unique(np.frombuffer(self.token_ids, dtype=np.uint32)).astype(np.int64)
+
+        # completions start at the beginning of a paragraph
+        starts, position = [0], text.find("\n\n")
+        while position != -1 and position + 2 < len(text):
+            starts.append(bisect_left(self.offsets, position + 2))
+            position = text.find("\n\n", position + 2)
+        self.paragraph_starts = starts
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    def slice(self, start: int, stop: int) -> str:
+        """
+        Text of the tokens from `start` (included) to `stop` (excluded), wrapping around the pool.
+        """
+        size = len(self.token_ids)
+        chunks = []
+        while start < stop:
+            offset = start % size
+            end = min(size, offset + stop - start)
+            chunks.append(self.text[self.offsets[offset] : self.offsets[end]])
+            start += end - offset
+
+        return "".join(chunks)
+
+    def window_token_ids(self, start: int, stop: int) -> np.ndarray:
+        """
+        Token IDs from `start` (included) to `stop` (excluded), wrapping around the pool.
+        """
+        return np.take(np.frombuffer(self.token_ids, dtype=np.uint32), np.arange(start, stop), mode="wrap").astype(np.int64)
+
+    def count_tokens(self, start: int, stop: int, num_chars: int) -> int:
+        """
+        Number of tokens from `start` needed to cover the first `num_chars` characters of their text, at most `stop - start`.
+        """
+        ends = np.cumsum(np.take(self.token_lengths, np.arange(start, stop), mode="wrap"))
+        return min(int(np.searchsorted(ends, num_chars, side="left")) + 1, stop - start)
+
+    def sample_starts(self, num_sequences: int) -> list[int]:
+        """
+        Random paragraph starts of `num_sequences` completions, drawn at once.
+        """
+        return random.choices(self.paragraph_starts, k=num_sequences)
+
+    def chunks(self, start: int, stop: int, chunk_tokens: int = 1) -> list[str]:
+        """
+        Same as `slice`, split in chunks of `chunk_tokens` tokens (the last one may be shorter).
+        """
+        return [self.slice(start=i, stop=min(i + chunk_tokens, stop)) for i in range(start, stop, chunk_tokens)]
@@ -0,0 +1,252 @@
+import base64
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+from itertools import chain
+from typing import Any
+
+from fastapi.responses import JSONResponse
+import numpy as np
+import orjson
+
+rng = np.random.default_rng()
+
+
+class EmbeddingsResponse(JSONResponse):
+    """
+    JSON response serialized with orjson: embeddings are written straight from their NumPy
+    rows, without converting each value to a Python float.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def generate_mock_embeddings(num_inputs: int, dimension: int = 1024) -> np.ndarray:
+    """
+    Generate a batch of mock embedding vectors
+
+    Args:
+        num_inputs: The number of embedding vectors
+        dimension: The dimension of the embedding vectors
+
+    Returns:
+        Array of shape (num_inputs, dimension) of float32
+    """
+    return rng.random((num_inputs, dimension), dtype=np.float32)
+
+
+def encode_embeddings(embeddings: np.ndarray, encoding_format: str = "float") -> list[np.ndarray] | list[str]:
+    """
+    Encode a batch of embedding vectors for the response
+
+    Args:
+        embeddings: Array of shape (num_inputs, dimension)
+        encoding_format: Either "float" or "base64"
+
+    Returns:
+        List of rows, serialized as floats by EmbeddingsResponse, or list of base64 encoded strings
+    """
+    if encoding_format == "base64":
+        # Encode the little-endian float32 buffer of each row, without intermediate list
+        embeddings = embeddings.astype("<f4", copy=False)
+        return [base64.b64encode(row).decode("utf-8") for row in embeddings]
+
+    return list(embeddings)
+
+
+def generate_hash_embedding(model: str, input: str | list[int], dimension: int = 1024) -> np.ndarray:
+    """
+    Generate an embedding vector derived from a hash of the model, the input and the dimension:
+    the same input always gets the same vector.
+
+    Args:
+        model: The model name
+        input: The input text or token IDs
+        dimension: The dimension of the embedding vector
+
+    Returns:
+        L2-normalized array of shape (dimension,) of float32
+    """
+    payload = b"s" + input.encode() if isinstance(input, str) else b"t" + np.asarray(input, dtype="<i8").tobytes()
+    digest = hashlib.blake2b(f"{model}\x00{dimension}\x00".encode() + payload, digest_size=16).digest()
+
+    vector = np.random.default_rng(int.from_bytes(digest, "little")).standard_normal(dimension, dtype=np.float32)
+    vector /= np.linalg.norm(vector)
+
+    return vector
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of embedding vectors, keyed by (model, input, dimension).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.vectors: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> np.ndarray | None:
+        vector = self.vectors.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.vectors.move_to_end(key)
+        return vector
+
+    def put(self, key: tuple, vector: np.ndarray) -> None:
+        # cached vectors are shared between responses
+        vector.setflags(write=False)
+        self.vectors[key] = vector
+        self.vectors.move_to_end(key)
+        if len(self.vectors) > self.max_size:
+            self.vectors.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self.vectors), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+class RandomEmbedder:
+    """Uniform random embeddings, a new vector at each call."""
+
+    mode = "random"
+
+    def embed(self, model: str, inputs: list[str | list[int]], dimension: int) -> np.ndarray:
+        return generate_mock_embeddings(num_inputs=len(inputs), dimension=dimension)
+
+    def embed_tokens(self, model: str, token_ids: list[int], dimension: int) -> np.ndarray:
+        return generate_mock_embeddings(num_inputs=len(token_ids), dimension=dimension)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode}
+
+
+class HashEmbedder:
+    """
+    Deterministic embeddings derived from a hash of (model, input, dimension), memoized in a LRU
+    cache so that repeated inputs are not generated again.
+    """
+
+    mode = "hash"
+
+    def __init__(self, cache_size: int = 10000):
+        self.cache = EmbeddingCache(max_size=cache_size)
+
+    def embed(self, model: str, inputs: list[str | list[int]], dimension: int) -> np.ndarray:
+        embeddings = np.empty((len(inputs), dimension), dtype=np.float32)
+        for i, input in enumerate(inputs):
+            key = (model, input if isinstance(input, str) else tuple(input), dimension)
+            vector = self.cache.get(key)
+            if vector is None:
+                vector = generate_hash_embedding(model=model, input=input, dimension=dimension)
+                self.cache.put(key, vector)
+            embeddings[i] = vector
+
+        return embeddings
+
+    def embed_tokens(self, model: str, token_ids: list[int], dimension: int) -> np.ndarray:
+        return self.embed(model=model, inputs=[[token_id] for token_id in token_ids], dimension=dimension)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "cache": self.cache.stats()}
+
+
+def hash_token_ids(token_ids: list[list[int]], num_buckets: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the token IDs of a batch of inputs into `num_buckets` buckets (hashing trick).
+
+    Args:
+        token_ids: The token IDs of each input
+        num_buckets: The number of buckets
+
+    Returns:
+        Tuple of two flat arrays with one item per token: the index of its input and its bucket
+    """
+    lengths = np.fromiter(map(len, token_ids), dtype=np.intp, count=len(token_ids))
+    ids = np.fromiter(chain.from_iterable(token_ids), dtype=np.uint64, count=int(lengths.sum()))
+
+    # Fibonacci hashing, the multiplication wraps around 2**64
+    buckets = ((ids * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)) % np.uint64(num_buckets)
+    rows = np.repeat(np.arange(len(token_ids)), lengths)
+
+    return rows, buckets.astype(np.intp)
+
+
+@lru_cache(maxsize=8)
+def get_projection_matrix(num_buckets: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """
+    Fixed Gaussian projection matrix of shape (num_buckets, dimension), generated once per dimension.
+    """
+    matrix = np.random.default_rng(seed).standard_normal((num_buckets, dimension), dtype=np.float32)
+    matrix.setflags(write=False)
+
+    return matrix
+
+
+class ProjectionEmbedder:
+    """
+    Embeddings of the bag of tokens of each input, projected with a fixed seeded random matrix.
+
+    Token IDs are hashed into `num_buckets` rows of the projection matrix (hashing trick), so that
+    the cosine similarity between two vectors tracks the token overlap of their inputs. The whole
+    batch is encoded with `encode_batch` and projected with a single matrix product.
+    """
+
+    mode = "projection"
+
+    def __init__(self, num_buckets: int = 4096, seed: int = 0):
+        # imported here so that the tokenizer is built from the settings of the app
+        from openmockllm.tokenizer import tokenizer
+
+        self.tokenizer = tokenizer
+        self.num_buckets = num_buckets
+        self.seed = seed
+
+    def encode(self, inputs: list[str | list[int]]) -> list[list[int]]:
+        texts = [input for input in inputs if isinstance(input, str)]
+        encoded = iter(self.tokenizer.encode_batch(texts, disallowed_special=()) if texts else [])
+
+        return [next(encoded) if isinstance(input, str) else input for input in inputs]
+
+    def bags(self, token_ids: list[list[int]]) -> np.ndarray:
+        """
+        Token counts of each input per hash bucket.
+
+        Returns:
+            Array of shape (num_inputs, num_buckets) of float32
+        """
+        rows, buckets = hash_token_ids(token_ids=token_ids, num_buckets=self.num_buckets)
+        counts = np.bincount(rows * self.num_buckets + buckets, minlength=len(token_ids) * self.num_buckets)
+
+        return counts.reshape(len(token_ids), self.num_buckets).astype(np.float32)
+
+    def embed(self, model: str, inputs: list[str | list[int]], dimension: int) -> np.ndarray:
+        embeddings = self.bags(self.encode(inputs)) @ get_projection_matrix(num_buckets=self.num_buckets, dimension=dimension, seed=self.seed)
+        # inputs without tokens keep a null vector
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), np.float32(1e-12))
+
+        return embeddings
+
+    def embed_tokens(self, model: str, token_ids: list[int], dimension: int) -> np.ndarray:
+        # the vector of a token is the row of its bucket
+        buckets = hash_token_ids(token_ids=[token_ids], num_buckets=self.num_buckets)[1]
+        embeddings = get_projection_matrix(num_buckets=self.num_buckets, dimension=dimension, seed=self.seed)[buckets]
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        return embeddings
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "num_buckets": self.num_buckets}
+
+
+def create_embedder(mode: str, cache_size: int = 10000) -> RandomEmbedder | HashEmbedder | ProjectionEmbedder:
+    if mode == "hash":
+        return HashEmbedder(cache_size=cache_size)
+    if mode == "projection":
+        return ProjectionEmbedder()
+
+    return RandomEmbedder()
@@ -0,0 +1,207 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+import fcntl
+from multiprocessing.shared_memory import SharedMemory
+import os
+from pathlib import Path
+import tempfile
+import time
+
+import numpy as np
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# columns of a worker row of the shared counters
+PID, GROUP, RUNNING, TOTAL, PROMPT_TOKENS, COMPLETION_TOKENS = range(6)
+
+
+class SharedCounters:
+    """
+    Request and token counters of all the workers of the server, in a shared memory block.
+
+    Each worker claims a row of the block per group of counters (one group per model served) at
+    startup and is the only one writing it, so updates need no lock: the counters of a group are the
+    sums of its rows. The row of a dead worker is taken over by its replacement, which keeps its totals.
+    """
+
+    def __init__(self, shm: SharedMemory, num_workers: int, num_groups: int = 1):
+        self.shm = shm
+        self.num_workers = num_workers
+        self.num_groups = num_groups
+        self.rows = np.ndarray((num_workers * num_groups, COMPLETION_TOKENS + 1), dtype=np.int64, buffer=shm.buf)
+
+    @classmethod
+    def create(cls, num_workers: int, num_groups: int = 1) -> "SharedCounters":
+        shm = SharedMemory(create=True, size=num_workers * num_groups * (COMPLETION_TOKENS + 1) * np.dtype(np.int64).itemsize)
+        counters = cls(shm=shm, num_workers=num_workers, num_groups=num_groups)
+        counters.rows[:] = 0
+
+        return counters
+
+    @classmethod
+    def attach(cls, name: str, num_workers: int, num_groups: int = 1) -> "SharedCounters":
+        return cls(shm=SharedMemory(name=name), num_workers=num_workers, num_groups=num_groups)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def lock_path(self) -> Path:
+        return Path(tempfile.gettempdir()) / f"{self.name.lstrip('/')}.lock"
+
+    def claim(self, group: int = 0) -> np.ndarray:
+        """
+        Claim a row of a group for the current process: the row of a dead worker of the group, or a free row.
+
+        Args:
+            group (int): Group of the counters.
+
+        Returns:
+            np.ndarray: The row of the process, a view on the shared memory.
+        """
+        pid = os.getpid()
+        # workers start concurrently, the claim is serialized by a lock on a file
+        with self.lock_path.open("a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            for row in self.rows:
+                if row[PID] != 0 and row[GROUP] == group and not self._is_alive(pid=int(row[PID])):
+                    row[PID] = pid
+                    # the requests of a dead worker died with it
+                    row[RUNNING] = 0
+                    return row
+            for row in self.rows:
+                if row[PID] == 0:
+                    row[PID], row[GROUP] = pid, group
+                    return row
+
+        raise RuntimeError(f"No free row in the shared counters of {self.num_workers} workers")
+
+    @staticmethod
+    def _is_alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+
+        return True
+
+    def _group_rows(self, group: int) -> np.ndarray:
+        if self.num_groups == 1:
+            return self.rows
+
+        return self.rows[(self.rows[:, PID] != 0) & (self.rows[:, GROUP] == group)]
+
+    def running(self, group: int = 0) -> int:
+        return int(self._group_rows(group=group)[:, RUNNING].sum())
+
+    def stats(self, group: int = 0) -> dict:
+        totals = self._group_rows(group=group).sum(axis=0)
+        return {
+            "workers": self.num_workers,
+            "running": int(totals[RUNNING]),
+            "total": int(totals[TOTAL]),
+            "prompt_tokens": int(totals[PROMPT_TOKENS]),
+            "completion_tokens": int(totals[COMPLETION_TOKENS]),
+        }
+
+    def close(self) -> None:
+        self.rows = None
+        self.shm.close()
+
+    def unlink(self) -> None:
+        self.close()
+        self.shm.unlink()
+        self.lock_path.unlink(missing_ok=True)
+
+
+class InflightTracker:
+    """
+    Count the requests being processed by a backend.
+
+    The counters are only updated from the event loop, so no lock is needed. The number of running
+    requests feeds the latency model: the more requests in flight, the slower the responses. With
+    several workers, the counters are also written to the row of the worker in the shared counters,
+    and the requests in flight of all the workers are used by the latency model and reported on
+    `/stats`. The peak and the per route counters are those of the worker.
+    """
+
+    def __init__(self, backend: str, counters: SharedCounters | None = None, group: int = 0):
+        self.backend = backend
+        self.running = 0
+        self.peak = 0
+        self.total = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.routes: dict[str, dict[str, int]] = {}
+        self.counters = counters
+        self.group = group
+        self.row = counters.claim(group=group) if counters is not None else None
+
+    @property
+    def inflight_requests(self) -> int:
+        """Number of requests in flight on the server, all workers included."""
+        return self.counters.running(group=self.group) if self.counters is not None else self.running
+
+    @contextmanager
+    def track(self, route: str) -> Iterator[None]:
+        counters = self.routes.setdefault(route, {"running": 0, "total": 0})
+        self.running += 1
+        self.total += 1
+        self.peak = max(self.peak, self.running)
+        counters["running"] += 1
+        counters["total"] += 1
+        if self.row is not None:
+            self.row[RUNNING] += 1
+            self.row[TOTAL] += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            counters["running"] -= 1
+            if self.row is not None:
+                self.row[RUNNING] -= 1
+
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int = 0) -> None:
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if self.row is not None:
+            self.row[PROMPT_TOKENS] += prompt_tokens
+            self.row[COMPLETION_TOKENS] += completion_tokens
+
+    def stats(self) -> dict:
+        stats = {
+            "backend": self.backend,
+            "running": self.running,
+            "peak": self.peak,
+            "total": self.total,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "routes": self.routes,
+        }
+        if self.counters is not None:
+            stats.update(self.counters.stats(group=self.group))
+
+        return stats
+
+
+class InflightMiddleware:
+    """
+    ASGI middleware tracking inference requests (POST) until their response is fully sent,
+    streamed responses included. The arrival time of the request is recorded on its state
+    (`request.state.arrival_time`) for the metrics.
+    """
+
+    def __init__(self, app: ASGIApp, tracker: InflightTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["arrival_time"] = time.perf_counter()
+        with self.tracker.track(route=scope["path"]):
+            await self.app(scope, receive, send)
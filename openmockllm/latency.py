@@ -0,0 +1,185 @@
+from bisect import bisect_left, bisect_right
+from contextvars import ContextVar
+import csv
+import json
+import math
+from pathlib import Path
+import random
+import re
+
+import numpy as np
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+PERCENTILE_PATTERN = re.compile(r"^p(\d+(?:\.\d+)?)$")
+
+
+class InverseCDF:
+    """
+    Empirical distribution of a latency, sampled in O(1).
+
+    The measured percentiles are interpolated once into a table of `size` quantiles: sampling
+    picks a random quantile of the table, without any math per request.
+    """
+
+    def __init__(self, percentiles: dict[float, float], size: int = 1024):
+        """
+        Args:
+            percentiles (dict[float, float]): Latency in seconds for each percentile (between 0 and 100).
+            size (int): Number of quantiles of the table.
+        """
+        points = sorted(percentiles.items())
+        quantiles = np.array([percentile / 100 for percentile, _ in points])
+        # a latency distribution is non decreasing, measurement noise is smoothed out
+        values = np.maximum.accumulate(np.array([value for _, value in points]))
+
+        table = np.interp((np.arange(size) + 0.5) / size, quantiles, values)
+        self.table = table.tolist()
+        self.size = size
+        self.mean = float(table.mean())
+
+    def sample(self) -> float:
+        return self.table[int(random.random() * self.size)]
+
+
+class LatencyTables:
+    """
+    Inverse CDF tables of a metric, per prompt length bucket and concurrency level.
+
+    A bucket holds the prompts up to its number of tokens, longer prompts than the last bucket use
+    it. A concurrency level holds the measures from this number of requests in flight up to the next
+    level.
+    """
+
+    def __init__(self, rows: list[tuple[float, int, dict[float, float]]]):
+        """
+        Args:
+            rows (list[tuple[float, int, dict[float, float]]]): (prompt tokens, concurrency, percentiles) of each measure.
+        """
+        tables: dict[float, dict[int, InverseCDF]] = {}
+        for prompt_tokens, concurrency, percentiles in rows:
+            tables.setdefault(prompt_tokens, {})[concurrency] = InverseCDF(percentiles=percentiles)
+
+        self.buckets = sorted(tables)
+        self.levels = [sorted(tables[bucket]) for bucket in self.buckets]
+        self.tables = [[tables[bucket][level] for level in levels] for bucket, levels in zip(self.buckets, self.levels, strict=True)]
+
+    def lookup(self, prompt_tokens: int, concurrency: int) -> InverseCDF:
+        i = min(bisect_left(self.buckets, prompt_tokens), len(self.buckets) - 1)
+        j = max(bisect_right(self.levels[i], concurrency) - 1, 0)
+        return self.tables[i][j]
+
+
+class LatencyProfile:
+    """
+    Measured TTFT and ITL percentiles of a production model, used instead of the Gaussian latency model.
+
+    JSON profiles have a list of measures per metric:
+
+        {"ttft": [{"prompt_tokens": 512, "concurrency": 1, "percentiles": {"p50": 0.12, "p90": 0.2, "p99": 0.35}}, ...],
+         "itl": [{"concurrency": 1, "percentiles": {"p50": 0.011, "p99": 0.02}}, ...]}
+
+    CSV profiles have one measure per row, with a `metric` (ttft or itl), `prompt_tokens` and
+    `concurrency` column, and one column per percentile (p50, p90, p99...). Latencies are in seconds.
+    A measure without `prompt_tokens` applies to all prompt lengths.
+    """
+
+    def __init__(self, ttft: LatencyTables, itl: LatencyTables):
+        self.ttft = ttft
+        self.itl = itl
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "LatencyProfile":
+        path = Path(path)
+        if path.suffix.lower() == ".csv":
+            with path.open(newline="") as f:
+                measures = [cls._parse_csv_row(row) for row in csv.DictReader(f)]
+        else:
+            profile = json.loads(path.read_text())
+            if not isinstance(profile, dict):
+                raise ValueError(f"Latency profile {path} is not a JSON object")
+            measures = [(metric, cls._parse_measure(measure)) for metric in ("ttft", "itl") for measure in profile.get(metric, [])]
+
+        rows = {"ttft": [], "itl": []}
+        for metric, measure in measures:
+            if metric not in rows:
+                raise ValueError(f"Unknown latency profile metric `{metric}` in {path}, expected ttft or itl")
+            rows[metric].append(measure)
+
+        for metric, metric_rows in rows.items():
+            if not metric_rows:
+                raise ValueError(f"Latency profile {path} has no {metric} measure")
+
+        return cls(ttft=LatencyTables(rows=rows["ttft"]), itl=LatencyTables(rows=rows["itl"]))
+
+    @staticmethod
+    def _parse_percentiles(values: dict[str, str | float]) -> dict[float, float]:
+        percentiles = {}
+        for key, value in values.items():
+            match = PERCENTILE_PATTERN.match(key.strip().lower())
+            if match and value not in (None, ""):
+                percentiles[float(match.group(1))] = float(value)
+        if not percentiles:
+            raise ValueError(f"Latency profile measure without percentiles: {values}")
+
+        return percentiles
+
+    @classmethod
+    def _parse_measure(cls, measure: dict) -> tuple[float, int, dict[float, float]]:
+        if not isinstance(measure, dict) or not isinstance(measure.get("percentiles"), dict):
+            raise ValueError(f"Latency profile measure without percentiles: {measure}")
+        prompt_tokens = measure.get("prompt_tokens")
+        prompt_tokens = math.inf if prompt_tokens is None else float(prompt_tokens)
+
+        return prompt_tokens, int(measure.get("concurrency", 1)), cls._parse_percentiles(measure["percentiles"])
+
+    @classmethod
+    def _parse_csv_row(cls, row: dict[str, str]) -> tuple[str, tuple[float, int, dict[float, float]]]:
+        if not row.get("metric"):
+            raise ValueError(f"Latency profile measure without metric: {row}")
+        prompt_tokens = math.inf if not row.get("prompt_tokens") else float(row["prompt_tokens"])
+        concurrency = int(row.get("concurrency") or 1)
+
+        return row["metric"].strip().lower(), (prompt_tokens, concurrency, cls._parse_percentiles(row))
+
+    def sample_ttft(self, input_tokens: int, inflight_requests: int = 1) -> float:
+        return self.ttft.lookup(prompt_tokens=input_tokens, concurrency=inflight_requests).sample()
+
+    def sample_itl(self, output_tokens: int, inflight_requests: int = 1, input_tokens: int = 0) -> float:
+        """
+        Latency of the generation of `output_tokens` tokens: a single sample, scaled so that its mean and
+        spread are those of the sum of `output_tokens` independent inter-token latencies.
+        """
+        distribution = self.itl.lookup(prompt_tokens=input_tokens, concurrency=inflight_requests)
+        if output_tokens == 1:
+            return distribution.sample()
+
+        return max(0.0, output_tokens * distribution.mean + (distribution.sample() - distribution.mean) * math.sqrt(output_tokens))
+
+
+_app_profile: ContextVar[LatencyProfile | None] = ContextVar("latency_profile", default=None)
+
+
+def get_latency_profile() -> LatencyProfile | None:
+    """
+    Latency profile of the app handling the current request, None if it uses the Gaussian latency model.
+    """
+    return _app_profile.get()
+
+
+class LatencyProfileMiddleware:
+    """
+    ASGI middleware setting the latency profile of an app while it handles a request, so that the
+    models served by the same process can have different profiles. Tasks started by the request,
+    like the scheduler loop, inherit it.
+    """
+
+    def __init__(self, app: ASGIApp, profile: LatencyProfile):
+        self.app = app
+        self.profile = profile
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        token = _app_profile.set(self.profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _app_profile.reset(token)
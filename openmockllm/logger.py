@@ -24,6 +24,10 @@ def init_logger(name: str, level: str = "INFO") -> Logger:
     """Initialize a logger with colored output"""
     logger = getLogger(name=name)
     logger.setLevel(level=level)
+    if logger.handlers:
+        # already initialized, by another import of the module
+        return logger
+
     handler = StreamHandler(stream=sys.stdout)
     formatter = ColoredFormatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from openmockllm.tokenizer import tokenizer
+
+rng = np.random.default_rng()
+
+# the sampled token is the most likely one of its position with this probability, the next ranks are less and less likely
+RANK_1_PROBABILITY = 0.6
+
+
+@dataclass
+class TokenLogprobs:
+    """
+    Log probabilities of a sequence of tokens, one row per position.
+    """
+
+    token_ids: np.ndarray  # (num_tokens,)
+    logprobs: np.ndarray  # (num_tokens,) logprob of each token
+    ranks: np.ndarray  # (num_tokens,) rank of each token among the candidates of its position, from 1
+    top_token_ids: np.ndarray  # (num_tokens, num_top) most likely candidates of each position
+    top_logprobs: np.ndarray  # (num_tokens, num_top) their logprobs, in decreasing order
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+
+def sample_logprobs(token_ids: np.ndarray, vocabulary: np.ndarray, num_top: int = 0) -> TokenLogprobs:
+    """
+    Sample the log probabilities of a sequence of tokens, for all the positions at once.
+
+    The candidates of each position are distinct tokens of the vocabulary, the token of the position ranks
+    first most of the time. The probabilities of a position decrease with the rank and sum to less than 1:
+    the first rank gets at least 1/e, each next rank at most half of the remaining mass.
+
+    Args:
+        token_ids (np.ndarray): Token IDs of the sequence.
+        vocabulary (np.ndarray): Sorted token IDs the candidates are drawn from.
+        num_top (int): Number of most likely candidates returned for each position, at most the size of the vocabulary minus 1.
+
+    Returns:
+        TokenLogprobs: Log probabilities of the sequence.
+    """
+    token_ids = np.asarray(token_ids, dtype=np.int64)
+    num_tokens, size = len(token_ids), len(vocabulary)
+    num_top = max(0, min(num_top, size - 1))
+    positions = np.arange(num_tokens)
+
+    ranks = rng.geometric(p=RANK_1_PROBABILITY, size=num_tokens)
+    num_ranks = max(num_top, int(ranks.max(initial=1)))
+    first = np.exp(-np.minimum(rng.exponential(scale=0.3, size=(num_tokens, 1)), 1.0))
+    following = (1 - first) * np.cumprod(rng.uniform(0.1, 0.5, size=(num_tokens, num_ranks - 1)), axis=1)
+    logprobs = np.log(np.concatenate([first, following], axis=1))
+
+    # distinct candidates other than the token: strided offsets from its index in the vocabulary, the stride is
+    # small enough that the offsets never wrap around the vocabulary
+    indices = np.searchsorted(vocabulary, token_ids) % size
+    stride = rng.integers(1, (size - 1) // max(num_top, 1) + 1, size=(num_tokens, 1))
+    offsets = (rng.integers(0, size - 1, size=(num_tokens, 1)) + stride * np.arange(num_top)) % (size - 1)
+    candidates = vocabulary[(indices[:, None] + 1 + offsets) % size]
+    top_token_ids = np.where(np.arange(1, num_top + 1) == ranks[:, None], token_ids[:, None], candidates)
+
+    return TokenLogprobs(
+        token_ids=token_ids,
+        logprobs=logprobs[positions, ranks - 1],
+        ranks=ranks,
+        top_token_ids=top_token_ids,
+        top_logprobs=logprobs[:, :num_top],
+    )
+
+
+@lru_cache(maxsize=65536)
+def decode_token(token_id: int) -> tuple[str, list[int]]:
+    """
+    Text and UTF-8 bytes of a token, a token ending within a character is decoded with a replacement character.
+    """
+    data = tokenizer.decode_single_token_bytes(token_id)
+
+    return data.decode("utf-8", errors="replace"), list(data)
@@ -1,15 +1,30 @@
 import argparse
+from contextlib import asynccontextmanager
+import json
+import os
+import sys
+import time
 
 from fastapi import FastAPI
 import uvicorn
 
+from openmockllm.config import check_latency_profile, load_models_config
+from openmockllm.embeddings import create_embedder
+from openmockllm.inflight import InflightMiddleware, InflightTracker, SharedCounters
+from openmockllm.latency import LatencyProfile, LatencyProfileMiddleware
 from openmockllm.logger import init_logger
+from openmockllm.router import ModelDispatchMiddleware
+from openmockllm.router import router as models_router
 from openmockllm.settings import settings
 
 logger = init_logger("openmockllm")
 
+# the arguments and the shared counters are passed to the worker processes through the environment
+ARGS_ENV = "OPENMOCKLLM_ARGS"
+SHARED_COUNTERS_ENV = "OPENMOCKLLM_SHARED_COUNTERS"
 
-def parse_args():
+
+def parse_args(argv: list[str] | None = None):
     """Parse command line arguments"""
     parser = argparse.ArgumentParser(description="OpenMockLLM - Mock LLM API Server")
 
@@ -17,30 +32,92 @@ def parse_args():
     parser.add_argument("--host", type=str, default="0.0.0.0", help="Host to run the server on (default: 0.0.0.0)")
     parser.add_argument("--port", type=int, default=8000, help="Port to run the server on (default: 8000)")
     parser.add_argument("--reload", action="store_true", help="Reload the server on code changes (default: False)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes sharing the listening socket (default: 1)")
 
     # Common arguments
+    parser.add_argument("--config", type=str, default=None, help="JSON file of the models served by the server, each with its backend (optional)")
     parser.add_argument("--backend", type=str, choices=["vllm", "mistral", "tei"], default="vllm", help="Backend to use (vllm, mistral, or tei)")
     parser.add_argument("--simulate-latency", type=bool, default=False, help="Simulate latency (default: False)")
     parser.add_argument("--reference-tps", type=int, default=100, help="Reference tokens per second (default: 100)")
+    parser.add_argument("--latency-profile", type=str, default=None, help="JSON or CSV file of measured TTFT/ITL percentiles (optional)")
+    parser.add_argument("--reference-embedding-tps", type=int, default=50000, help="Reference embedding tokens per second (default: 50000)")
+    parser.add_argument("--embedding-overhead-ms", type=float, default=5.0, help="Overhead of an embedding request in ms (default: 5.0)")
+    parser.add_argument("--embedding-contention", type=float, default=0.1, help="Embedding slowdown per concurrent request (default: 0.1)")
+    parser.add_argument("--stream-chunk-tokens", type=int, default=1, help="Number of tokens per streamed chunk (default: 1)")
     parser.add_argument("--max-context", type=int, default=128000, help="Maximum context length (default: 128000)")
     parser.add_argument("--owned-by", type=str, default="OpenMockLLM", help="Owner of the API (default: OpenMockLLM)")
     parser.add_argument("--model-name", type=str, default="openmockllm", help="Model name to return (default: openmockllm)")
     parser.add_argument("--embedding-dimension", type=int, default=1024, help="Embedding dimension (default: 1024)")
+    parser.add_argument("--embedding-mode", type=str, choices=["random", "hash", "projection"], default="random", help="Embeddings (default: random)")
+    parser.add_argument("--embedding-cache-size", type=int, default=10000, help="Number of vectors kept in the embedding cache (default: 10000)")
     parser.add_argument("--api-key", type=str, default=None, help="API key for authentication (optional)")
     parser.add_argument("--tiktoken-encoder", type=str, default="cl100k_base", help="Tiktoken encoder (default: cl100k_base)")
     parser.add_argument("--faker-langage", type=str, default="fr_FR", help="Langage used for generating prompt responses (default: fr_FR)")
     parser.add_argument("--faker-seed", type=int, default=None, help="Seed for Faker generation (optional)")
+    parser.add_argument("--corpus-size", type=int, default=65536, help="Number of tokens of the pre-encoded text corpus (default: 65536)")
+
+    # vLLM-specific arguments
+    parser.add_argument("--continuous-batching", action="store_true", help="Simulate the continuous batching scheduler of vLLM (default: False)")
+    parser.add_argument("--max-num-seqs", type=int, default=256, help="Maximum number of sequences decoded in a step (default: 256)")
+    parser.add_argument("--kv-cache-tokens", type=int, default=None, help="Number of tokens in the simulated KV cache (default: --max-context)")
+    parser.add_argument(
+        "--scheduling-policy", type=str, choices=["fcfs", "priority"], default="fcfs", help="Order of the queued chat requests (default: fcfs)"
+    )
+    parser.add_argument(
+        "--max-running-requests",
+        type=int,
+        default=None,
+        help="Maximum number of chat requests generated at once, without --continuous-batching (optional)",
+    )
+    parser.add_argument("--enable-prefix-caching", action="store_true", help="Simulate the automatic prefix caching of vLLM (default: False)")
+    parser.add_argument("--block-size", type=int, default=16, help="Number of tokens per block of the prefix cache (default: 16)")
+    parser.add_argument(
+        "--num-prefix-cache-blocks",
+        type=int,
+        default=None,
+        help="Number of blocks kept in the prefix cache (default: --kv-cache-tokens / --block-size)",
+    )
 
     # TEI-specific arguments
     parser.add_argument("--payload-limit", type=int, default=2000000, help="Payload size limit in bytes (default: 2000000)")
     parser.add_argument("--max-client-batch-size", type=int, default=32, help="Maximum number of inputs per request (default: 32)")
+    parser.add_argument("--max-input-length", type=int, default=512, help="Maximum number of tokens per input (default: 512)")
     parser.add_argument("--auto-truncate", action="store_true", help="Automatically truncate inputs longer than max size")
     parser.add_argument("--max-batch-tokens", type=int, default=16384, help="Maximum total tokens in a batch (default: 16384)")
+    parser.add_argument(
+        "--max-concurrent-requests", type=int, default=128, help="Maximum number of requests in flight, beyond which 429 is returned (default: 128)"
+    )
+    parser.add_argument("--max-batch-requests", type=int, default=None, help="Maximum number of inputs in a batch (optional)")
+    parser.add_argument("--dynamic-batching", action="store_true", help="Simulate the dynamic batching of TEI (default: False)")
+    parser.add_argument("--batch-window-ms", type=float, default=2.0, help="Time waited for requests to coalesce in a batch (default: 2.0)")
+    parser.add_argument("--tokenization-workers", type=int, default=4, help="Number of threads encoding and decoding batches (default: 4)")
+    parser.add_argument("--tokenize-cache-size", type=int, default=1024, help="Number of recent encodings cached by /tokenize (default: 1024)")
+
+    return parser.parse_args(argv)
+
+
+def load_args() -> argparse.Namespace:
+    """Arguments passed by `run` through the environment, default arguments otherwise"""
+    if ARGS_ENV in os.environ:
+        return argparse.Namespace(**json.loads(os.environ[ARGS_ENV]))
+
+    return parse_args(argv=[])
+
+
+# backends generating completions from the text corpus
+COMPLETION_BACKENDS = ("vllm", "mistral")
 
-    return parser.parse_args()
 
+@asynccontextmanager
+async def warm_up(app: FastAPI):
+    """Build the text corpus in the background once the server has started"""
+    from openmockllm.utils import warm_up_corpus
 
-def create_app(args):
+    warm_up_corpus()
+    yield
+
+
+def create_app(args, counters: SharedCounters | None = None, group: int = 0):
     """Create and configure FastAPI application"""
     if args.api_key:
         settings.api_key = args.api_key
@@ -50,12 +127,23 @@ def create_app(args):
         settings.faker_langage = args.faker_langage
     if args.faker_seed:
         settings.faker_seed = args.faker_seed
+    if args.corpus_size:
+        settings.corpus_size = args.corpus_size
     if args.simulate_latency:
         settings.simulate_latency = True
     if args.reference_tps:
         settings.reference_tps = args.reference_tps
-
-    app = FastAPI(title="OpenMockLLM API", description="Mock LLM API Server supporting vllm and mistral", version="1.0.0")
+    if args.stream_chunk_tokens:
+        settings.stream_chunk_tokens = args.stream_chunk_tokens
+    if args.reference_embedding_tps:
+        settings.reference_embedding_tps = args.reference_embedding_tps
+    if args.embedding_overhead_ms is not None:
+        settings.embedding_request_overhead = args.embedding_overhead_ms / 1000
+    if args.embedding_contention is not None:
+        settings.embedding_contention = args.embedding_contention
+
+    lifespan = warm_up if args.backend in COMPLETION_BACKENDS else None
+    app = FastAPI(title="OpenMockLLM API", description="Mock LLM API Server supporting vllm and mistral", version="1.0.0", lifespan=lifespan)
 
     # Store configuration in app state
     app.state.backend = args.backend
@@ -65,11 +153,46 @@ def create_app(args):
     app.state.owned_by = args.owned_by
     app.state.model_name = args.model_name
     app.state.embedding_dimension = args.embedding_dimension
+    app.state.embedder = create_embedder(mode=args.embedding_mode, cache_size=args.embedding_cache_size)
+    app.state.inflight = InflightTracker(backend=args.backend, counters=counters, group=group)
+
+    # Count requests in flight, streamed responses included
+    app.add_middleware(InflightMiddleware, tracker=app.state.inflight)
+
+    # Sample the latencies of the app from its own profile
+    if args.latency_profile:
+        app.add_middleware(LatencyProfileMiddleware, profile=LatencyProfile.from_file(path=args.latency_profile))
 
     # Include routers based on backend
     if args.backend == "vllm":
-        from openmockllm.vllm.endpoints import chat, health, models
+        from openmockllm.vllm.endpoints import chat, embeddings, health, metrics, models, stats
         from openmockllm.vllm.exceptions import VLLMException, general_exception_handler, vllm_exception_handler
+        from openmockllm.vllm.utils.admission import AdmissionQueue
+        from openmockllm.vllm.utils.metrics import VLLMMetrics
+        from openmockllm.vllm.utils.prefix_cache import PrefixCache
+        from openmockllm.vllm.utils.scheduler import BatchScheduler
+
+        # Store vLLM-specific config in app state
+        app.state.scheduling_policy = args.scheduling_policy
+        app.state.scheduler = None
+        app.state.admission = None
+        if args.continuous_batching:
+            kv_cache_tokens = args.kv_cache_tokens or args.max_context
+            app.state.scheduler = BatchScheduler(max_num_seqs=args.max_num_seqs, kv_cache_tokens=kv_cache_tokens, policy=args.scheduling_policy)
+        elif args.max_running_requests:
+            app.state.admission = AdmissionQueue(max_running=args.max_running_requests, policy=args.scheduling_policy)
+        app.state.prefix_cache = None
+        if args.enable_prefix_caching:
+            num_blocks = args.num_prefix_cache_blocks or (args.kv_cache_tokens or args.max_context) // args.block_size
+            app.state.prefix_cache = PrefixCache(num_blocks=num_blocks, block_size=args.block_size)
+        app.state.metrics = VLLMMetrics(
+            model_name=args.model_name,
+            max_model_len=args.max_context,
+            inflight=app.state.inflight,
+            scheduler=app.state.scheduler,
+            admission=app.state.admission,
+            prefix_cache=app.state.prefix_cache,
+        )
 
         # Add exception handlers
         app.add_exception_handler(VLLMException, vllm_exception_handler)
@@ -77,12 +200,15 @@ def create_app(args):
 
         # Add routers (prefixes are defined in the router instances)
         app.include_router(chat.router)
+        app.include_router(embeddings.router)
         app.include_router(models.router)
         app.include_router(health.router)
+        app.include_router(metrics.router)
+        app.include_router(stats.router)
         logger.info("Loaded vllm backend with all endpoints")
 
     elif args.backend == "mistral":
-        from openmockllm.mistral.endpoints import chat, models, ocr
+        from openmockllm.mistral.endpoints import chat, models, ocr, stats
         from openmockllm.mistral.exceptions import MistralException, general_exception_handler, mistral_exception_handler
 
         # Add exception handlers
@@ -93,66 +219,187 @@ def create_app(args):
         app.include_router(chat.router)
         app.include_router(models.router)
         app.include_router(ocr.router)
+        app.include_router(stats.router)
         logger.info("Loaded mistral backend with exception handling")
 
     elif args.backend == "tei":
-        from openmockllm.tei.endpoints import embeddings, health, info, rerank
+        from openmockllm.tei.endpoints import embed, embeddings, health, info, metrics, predict, rerank, stats, tokenize
         from openmockllm.tei.exceptions import TEIException, general_exception_handler, tei_exception_handler
+        from openmockllm.tei.utils.batcher import DynamicBatcher
+        from openmockllm.tei.utils.metrics import TEIMetrics
+        from openmockllm.tei.utils.tokenize import EncodingCache
 
         # Store TEI-specific config in app state
         app.state.payload_limit = args.payload_limit
         app.state.max_client_batch_size = args.max_client_batch_size
+        app.state.max_input_length = args.max_input_length
         app.state.auto_truncate = args.auto_truncate
         app.state.max_batch_tokens = args.max_batch_tokens
+        app.state.max_batch_requests = args.max_batch_requests
+        app.state.max_concurrent_requests = args.max_concurrent_requests
+        app.state.batcher = None
+        if args.dynamic_batching:
+            app.state.batcher = DynamicBatcher(
+                max_batch_tokens=args.max_batch_tokens,
+                max_concurrent_requests=args.max_concurrent_requests,
+                max_batch_requests=args.max_batch_requests,
+                batch_window=args.batch_window_ms / 1000,
+            )
+        app.state.metrics = TEIMetrics(batcher=app.state.batcher)
+        if app.state.batcher is not None:
+            app.state.batcher.metrics = app.state.metrics
+        app.state.tokenization_workers = args.tokenization_workers
+        app.state.encoding_cache = EncodingCache(max_size=args.tokenize_cache_size)
 
         # Add exception handlers
         app.add_exception_handler(TEIException, tei_exception_handler)
         app.add_exception_handler(Exception, general_exception_handler)
 
         # Add routers
+        app.include_router(embed.router)
         app.include_router(embeddings.router)
         app.include_router(health.router)
         app.include_router(info.router)
+        app.include_router(metrics.router)
+        app.include_router(predict.router)
         app.include_router(rerank.router)
+        app.include_router(stats.router)
+        app.include_router(tokenize.router)
         logger.info("Loaded TEI backend with all endpoints")
 
     return app
 
 
-# Parse args and create app at module level (executed on import)
-args = parse_args()
+def create_models_app(models: list[argparse.Namespace], counters: SharedCounters | None = None):
+    """Create the application serving the models of a config file, each by the app of its backend"""
+    # the lifespans of mounted apps are not run
+    lifespan = warm_up if any(model.backend in COMPLETION_BACKENDS for model in models) else None
+    app = FastAPI(title="OpenMockLLM API", description="Mock LLM API Server supporting vllm, mistral and tei", version="1.0.0", lifespan=lifespan)
+    app.state.models = models
 
-logger.info("=" * 60)
-logger.info("OpenMockLLM API Server")
-logger.info("=" * 60)
-logger.info(f"Backend:          {args.backend}")
-logger.info(f"Port:             {args.port}")
-logger.info(f"Max Context:      {args.max_context}")
-logger.info(f"Owned By:         {args.owned_by}")
-logger.info(f"Model Name:       {args.model_name}")
-logger.info(f"API Key:          {'Enabled' if args.api_key else 'Disabled'}")
-logger.info(f"Tiktoken encoder: {args.tiktoken_encoder}")
-logger.info(f"Faker langage:    {args.faker_langage}")
-logger.info(f"Faker seed:       {args.faker_seed if args.faker_seed else 'Disabled'}")
+    model_apps = []
+    for group, model_args in enumerate(models):
+        model_app = create_app(model_args, counters=counters, group=group)
+        app.mount(f"/{model_args.prefix}", model_app)
+        model_apps.append((model_args.model_name, model_args.prefix, model_app))
 
-# TEI-specific parameters
-if args.backend == "tei":
-    logger.info(f"Payload Limit:    {args.payload_limit}")
-    logger.info(f"Max Client Batch: {args.max_client_batch_size}")
-    logger.info(f"Auto Truncate:    {args.auto_truncate}")
-    logger.info(f"Max Batch Tokens: {args.max_batch_tokens}")
+    app.include_router(models_router)
+    app.add_middleware(ModelDispatchMiddleware, models=model_apps)
+    logger.info(f"Loaded {len(models)} models: {', '.join(f'{model.model_name} ({model.backend})' for model in models)}")
 
-logger.info("=" * 60)
+    return app
+
+
+def create_app_from_env():
+    """Application factory of the worker processes"""
+    started = time.perf_counter()
+    args = load_args()
+    models = load_models_config(path=args.config, args=args) if args.config else None
+    counters = None
+    if SHARED_COUNTERS_ENV in os.environ:
+        counters = SharedCounters.attach(name=os.environ[SHARED_COUNTERS_ENV], num_workers=args.workers, num_groups=len(models or [args]))
+
+    if models:
+        app = create_models_app(models=models, counters=counters)
+    else:
+        app = create_app(args, counters=counters)
+    logger.info(f"Created the app in {time.perf_counter() - started:.2f}s")
+
+    return app
 
-# Create app instance (executed on import)
-app = create_app(args)
+
+def __getattr__(name: str):
+    """
+    Module-level `app` of `uvicorn openmockllm.main:app`, created from the environment on first access
+    (the default arguments without `OPENMOCKLLM_ARGS`), so that importing the module doesn't create it.
+    """
+    if name == "app":
+        global app
+        app = create_app_from_env()
+        return app
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def log_args(args, models: list[argparse.Namespace] | None = None):
+    """Log the configuration of the server"""
+    logger.info("=" * 60)
+    logger.info("OpenMockLLM API Server")
+    logger.info("=" * 60)
+    logger.info(f"Backend:          {args.backend}")
+    logger.info(f"Port:             {args.port}")
+    logger.info(f"Workers:          {args.workers}")
+    logger.info(f"Max Context:      {args.max_context}")
+    logger.info(f"Owned By:         {args.owned_by}")
+    logger.info(f"Model Name:       {args.model_name}")
+    logger.info(f"API Key:          {'Enabled' if args.api_key else 'Disabled'}")
+    logger.info(f"Tiktoken encoder: {args.tiktoken_encoder}")
+    logger.info(f"Faker langage:    {args.faker_langage}")
+    logger.info(f"Faker seed:       {args.faker_seed if args.faker_seed else 'Disabled'}")
+    logger.info(f"Corpus size:      {args.corpus_size}")
+    logger.info(f"Latency profile:  {args.latency_profile if args.latency_profile else 'Disabled'}")
+    if args.backend in ("vllm", "tei"):
+        logger.info(f"Embedding mode:   {args.embedding_mode}")
+
+    # Models of the config file, the arguments above are their defaults
+    if models:
+        logger.info(f"Config file:      {args.config}")
+        for model in models:
+            logger.info(f"Model:            {model.model_name} ({model.backend}) on /{model.prefix}")
+        logger.info("=" * 60)
+        return
+
+    # vLLM-specific parameters
+    if args.backend == "vllm":
+        logger.info(f"Cont. Batching:   {args.continuous_batching}")
+        if args.continuous_batching:
+            logger.info(f"Max Num Seqs:     {args.max_num_seqs}")
+            logger.info(f"KV Cache Tokens:  {args.kv_cache_tokens or args.max_context}")
+
+    # TEI-specific parameters
+    if args.backend == "tei":
+        logger.info(f"Payload Limit:    {args.payload_limit}")
+        logger.info(f"Max Client Batch: {args.max_client_batch_size}")
+        logger.info(f"Max Input Length: {args.max_input_length}")
+        logger.info(f"Auto Truncate:    {args.auto_truncate}")
+        logger.info(f"Max Batch Tokens: {args.max_batch_tokens}")
+        logger.info(f"Tokenize Workers: {args.tokenization_workers}")
+        logger.info(f"Dyn. Batching:    {args.dynamic_batching}")
+        if args.dynamic_batching:
+            logger.info(f"Max Concurrent:   {args.max_concurrent_requests}")
+            logger.info(f"Batch Window:     {args.batch_window_ms} ms")
+
+    logger.info("=" * 60)
 
 
 def run():
     """Entry point for CLI command"""
+    if sys.argv[1:2] == ["bench"]:
+        from openmockllm.bench import run_bench
+
+        run_bench(argv=sys.argv[2:])
+        return
+
+    args = parse_args()
+    # the config file and latency profiles are checked before starting the workers
+    models = load_models_config(path=args.config, args=args) if args.config else None
+    if not models and args.latency_profile:
+        check_latency_profile(path=args.latency_profile, model_name=args.model_name)
+    log_args(args, models=models)
+
+    os.environ[ARGS_ENV] = json.dumps(vars(args))
+    counters = None
+    if args.workers > 1:
+        counters = SharedCounters.create(num_workers=args.workers, num_groups=len(models or [args]))
+        os.environ[SHARED_COUNTERS_ENV] = counters.name
+
     logger.info(f"Starting server on http://{args.host}:{args.port}")
     logger.info(f"API documentation: http://{args.host}:{args.port}/docs")
-    uvicorn.run("openmockllm.main:app", host=args.host, port=args.port, reload=args.reload)
+    try:
+        uvicorn.run("openmockllm.main:create_app_from_env", factory=True, host=args.host, port=args.port, reload=args.reload, workers=args.workers)
+    finally:
+        if counters is not None:
+            counters.unlink()
 
 
 if __name__ == "__main__":
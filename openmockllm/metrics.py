@@ -0,0 +1,158 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+
+from fastapi.responses import PlainTextResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    values = ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items())
+
+    return f"{{{values}}}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """
+    Metric in the Prometheus text format.
+
+    Metrics are only updated from the event loop, like the counters of the requests in flight, so
+    an update is a plain increment without lock.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+
+    @abstractmethod
+    def samples(self, labels: dict[str, str]) -> Iterator[str]:
+        """Lines of the samples of the metric, with the labels of the app."""
+
+    def render(self, labels: dict[str, str]) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples(labels=labels)])
+
+
+class Counter(Metric):
+    """Monotonic counter, with a value per value of its label."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, label: str | None = None):
+        super().__init__(name=name, help=help)
+        self.label = label
+        self.values: dict[str | None, float] = {} if label else {None: 0}
+
+    def inc(self, amount: float = 1, label: str | None = None) -> None:
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def samples(self, labels: dict[str, str]) -> Iterator[str]:
+        for label, value in self.values.items():
+            sample_labels = {**labels, self.label: label} if self.label else labels
+            yield f"{self.name}{format_labels(sample_labels)} {format_value(value)}"
+
+
+class Gauge(Metric):
+    """Value read from the state of the app when the metrics are scraped."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]):
+        super().__init__(name=name, help=help)
+        self.function = function
+
+    def samples(self, labels: dict[str, str]) -> Iterator[str]:
+        yield f"{self.name}{format_labels(labels)} {format_value(self.function())}"
+
+
+class CounterFunction(Gauge):
+    """Counter read from the state of the app when the metrics are scraped."""
+
+    type = "counter"
+
+
+class Histogram(Metric):
+    """Histogram with fixed buckets, an observation increments the count of its bucket only."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...]):
+        super().__init__(name=name, help=help)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, labels: dict[str, str]) -> Iterator[str]:
+        count = 0
+        for bound, bucket_count in zip((*self.buckets, float("inf")), self.counts, strict=True):
+            count += bucket_count
+            yield f"{self.name}_bucket{format_labels({**labels, 'le': format_value(float(bound))})} {count}"
+        yield f"{self.name}_sum{format_labels(labels)} {format_value(self.sum)}"
+        yield f"{self.name}_count{format_labels(labels)} {count}"
+
+
+class MetricsRegistry:
+    """Metrics of a backend, rendered with the labels common to all its samples."""
+
+    def __init__(self, labels: dict[str, str] | None = None):
+        self.labels = labels or {}
+        self.metrics: list[Metric] = []
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, label: str | None = None) -> Counter:
+        return self.add(Counter(name=name, help=help, label=label))
+
+    def gauge(self, name: str, help: str, function: Callable[[], float]) -> Gauge:
+        return self.add(Gauge(name=name, help=help, function=function))
+
+    def counter_function(self, name: str, help: str, function: Callable[[], float]) -> CounterFunction:
+        return self.add(CounterFunction(name=name, help=help, function=function))
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...]) -> Histogram:
+        return self.add(Histogram(name=name, help=help, buckets=buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render(labels=self.labels) for metric in self.metrics) + "\n"
+
+    def response(self) -> PlainTextResponse:
+        return PlainTextResponse(content=self.render(), media_type=CONTENT_TYPE)
+
+
+def build_1_2_5_buckets(max_value: int) -> tuple[float, ...]:
+    """
+    Buckets 1, 2, 5, 10, 20, 50... up to `max_value`, like the token count histograms of vLLM
+    """
+    buckets, exponent = [], 0
+    while True:
+        for mantissa in (1, 2, 5):
+            value = mantissa * 10**exponent
+            if value > max_value:
+                return tuple(buckets)
+            buckets.append(value)
+        exponent += 1
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> tuple[float, ...]:
+    return tuple(start * factor**i for i in range(count))
@@ -9,7 +9,7 @@ from openmockllm.mistral.schemas import ChatCompletionRequest
 from openmockllm.mistral.utils.chat import extract_prompt, generate_stream
 from openmockllm.mistral.utils.common import check_max_context_length, check_model_not_found
 from openmockllm.security import check_api_key
-from openmockllm.utils import count_tokens, generate_unstreamed_chat_content
+from openmockllm.utils import RequestTokens, generate_unstreamed_chat_content
 
 router = APIRouter(prefix="/v1", tags=["chat"])
 
@@ -21,27 +21,27 @@ async def chat_completions(request: Request, body: ChatCompletionRequest) -> Cha
 
     # get content from messages
     prompt = "\n\n".join([extract_prompt(content=msg.content) for msg in body.messages])
+    tokens = RequestTokens(prompt=prompt)
 
     # check max context length
-    check_max_context_length(prompt=prompt, max_context_length=request.app.state.max_context)
+    check_max_context_length(tokens=tokens, max_context_length=request.app.state.max_context)
 
     if not body.stream:
         # generate response content
         max_tokens = None if isinstance(body.max_tokens, Unset) else body.max_tokens
-        content = await generate_unstreamed_chat_content(prompt=prompt, max_tokens=max_tokens)
-        input_tokens = count_tokens(text=prompt)
-        completion_tokens = count_tokens(text=content)
+        content = await generate_unstreamed_chat_content(tokens=tokens, max_tokens=max_tokens, inflight=request.app.state.inflight)
+        request.app.state.inflight.add_tokens(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens)
 
         # create response
         response = ChatCompletionResponse(
             id="baf234d63e524e74b25c2d764b043bc2",
             object="chat.completion",
             created=int(time.time()),
-            usage=UsageInfo(prompt_tokens=input_tokens, completion_tokens=completion_tokens, total_tokens=input_tokens + completion_tokens),
+            usage=UsageInfo(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens, total_tokens=tokens.total_tokens),
             model=request.app.state.model_name,
             choices=[ChatCompletionChoice(index=0, message=AssistantMessage(content=content, tool_calls=None), finish_reason="stop")],
         )
         return response
 
     else:
-        return StreamingResponse(content=generate_stream(request=request, body=body), media_type="text/event-stream")
+        return StreamingResponse(content=generate_stream(request=request, body=body, tokens=tokens), media_type="text/event-stream")
@@ -3,7 +3,7 @@ from mistralai.client.models import OCRImageObject, OCRPageDimensions, OCRPageOb
 
 from openmockllm.mistral.utils.common import check_model_not_found
 from openmockllm.security import check_api_key
-from openmockllm.utils import generate_unstreamed_chat_content, get_base64_jpeg_image
+from openmockllm.utils import RequestTokens, generate_unstreamed_chat_content, get_base64_jpeg_image
 
 router = APIRouter(prefix="/v1", tags=["models"])
 
@@ -12,7 +12,8 @@ router = APIRouter(prefix="/v1", tags=["models"])
 async def ocr(request: Request, body: OCRRequest) -> OCRResponse:
     check_model_not_found(called_model=body.model, current_model=request.app.state.model_name)
 
-    content = await generate_unstreamed_chat_content(prompt="Lorem ipsum dolor sit amet, consectetur adipiscing elit.", max_tokens=1000)
+    tokens = RequestTokens(prompt="Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+    content = await generate_unstreamed_chat_content(tokens=tokens, max_tokens=1000, inflight=request.app.state.inflight)
     image = get_base64_jpeg_image()
 
     pages = content.split("\n\n")
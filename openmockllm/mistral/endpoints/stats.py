@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/stats")
+async def stats(request: Request):
+    """Requests in flight, used by the latency model"""
+    return request.app.state.inflight.stats()
@@ -1,10 +1,11 @@
 import time
 
 from fastapi import Request
-from mistralai.client.models import ChatCompletionRequest, CompletionChunk, CompletionResponseStreamChoice, DeltaMessage
+from mistralai.client.models import ChatCompletionRequest, CompletionChunk, CompletionResponseStreamChoice, DeltaMessage, UsageInfo
 from mistralai.client.types.basemodel import Unset
 
-from openmockllm.utils import generate_stream_chat_content
+from openmockllm.sse import CONTENT_PLACEHOLDER, INDEX_PLACEHOLDER, SSETemplate
+from openmockllm.utils import RequestTokens, generate_stream_chat_content
 
 
 def extract_prompt(content: str | list | None) -> str:
@@ -29,37 +30,49 @@ def extract_prompt(content: str | list | None) -> str:
     return prompt
 
 
-async def generate_stream(request: Request, body: ChatCompletionRequest):
+async def generate_stream(request: Request, body: ChatCompletionRequest, tokens: RequestTokens):
     """Generate streaming response chunks in SSE format"""
 
-    prompt = "\n\n".join([extract_prompt(content=msg.content) for msg in body.messages])
+    # Content chunks only differ by their index and content, their frame is serialized once
+    created = int(time.time())
+    delta = DeltaMessage(role=None, content=CONTENT_PLACEHOLDER)
+    template = SSETemplate(
+        chunk=CompletionChunk(
+            id="baf234d63e524e74b25c2d764b043bc2",
+            object="chat.completion.chunk",
+            created=created,
+            model=request.app.state.model_name,
+            choices=[CompletionResponseStreamChoice(index=INDEX_PLACEHOLDER, delta=delta, finish_reason=None)],
+        )
+    )
     i = 0
     max_tokens = None if isinstance(body.max_tokens, Unset) else body.max_tokens
-    async for chunk_text in generate_stream_chat_content(prompt=prompt, max_tokens=max_tokens):
-        # Check if this is the final "[DONE]" chunk
-        # The generator sends "[DONE]\n\n" as the final chunk
-        if "[DONE]" in chunk_text:
-            # Send final chunk with finish_reason
+    async for chunk_text in generate_stream_chat_content(tokens=tokens, max_tokens=max_tokens, inflight=request.app.state.inflight):
+        if i == 0:
+            # The first chunk carries the role
             chunk = CompletionChunk(
                 id="baf234d63e524e74b25c2d764b043bc2",
                 object="chat.completion.chunk",
-                created=int(time.time()),
+                created=created,
                 model=request.app.state.model_name,
-                choices=[CompletionResponseStreamChoice(index=i, delta=DeltaMessage(role=None, content=""), finish_reason="stop")],
+                choices=[CompletionResponseStreamChoice(index=0, delta=DeltaMessage(role="assistant", content=chunk_text), finish_reason=None)],
             )
             # Format as SSE: data: <json>\n\n
-            yield f"data: {chunk.model_dump_json()}\n\n"
-            break
-
-        # Regular content chunk
-        role = "assistant" if i == 0 else None
-        chunk = CompletionChunk(
-            id="baf234d63e524e74b25c2d764b043bc2",
-            object="chat.completion.chunk",
-            created=int(time.time()),
-            model=request.app.state.model_name,
-            choices=[CompletionResponseStreamChoice(index=i, delta=DeltaMessage(role=role, content=chunk_text), finish_reason=None)],
-        )
-        # Format as SSE: data: <json>\n\n
-        yield f"data: {chunk.model_dump_json()}\n\n"
+            yield f"data: {chunk.model_dump_json()}\n\n".encode()
+        else:
+            yield template.render(index=0, content=chunk_text)
         i += 1
+    request.app.state.inflight.add_tokens(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens)
+
+    # Send final chunk with finish_reason, Mistral always reports usage in it
+    chunk = CompletionChunk(
+        id="baf234d63e524e74b25c2d764b043bc2",
+        object="chat.completion.chunk",
+        created=created,
+        model=request.app.state.model_name,
+        choices=[CompletionResponseStreamChoice(index=0, delta=DeltaMessage(role=None, content=""), finish_reason="stop")],
+        usage=UsageInfo(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens, total_tokens=tokens.total_tokens),
+    )
+    yield f"data: {chunk.model_dump_json()}\n\n".encode()
+
+    yield b"data: [DONE]\n\n"
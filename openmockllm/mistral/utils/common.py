@@ -1,4 +1,5 @@
 from openmockllm.mistral.exceptions import BadRequestError, NotFoundError
+from openmockllm.utils import RequestTokens
 from openmockllm.utils import check_max_context_length as _check_max_context_length
 
 
@@ -7,6 +8,6 @@ def check_model_not_found(called_model: str, current_model: str):
         raise NotFoundError
 
 
-def check_max_context_length(prompt: str, max_context_length: int):
-    if not _check_max_context_length(prompt=prompt, max_context_length=max_context_length):
+def check_max_context_length(tokens: RequestTokens, max_context_length: int):
+    if not _check_max_context_length(tokens=tokens, max_context_length=max_context_length):
         raise BadRequestError
@@ -0,0 +1,125 @@
+import time
+
+from fastapi import APIRouter, Depends, FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+import orjson
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from openmockllm.security import check_api_key
+
+router = APIRouter(tags=["models"])
+
+
+@router.get("/v1/models", dependencies=[Depends(check_api_key)])
+async def list_models(request: Request):
+    """Models of the config file, served under `/<prefix>` or dispatched on the `model` field of the requests"""
+    created = int(time.time())
+    return {
+        "object": "list",
+        "data": [
+            {
+                "id": model.model_name,
+                "object": "model",
+                "created": created,
+                "owned_by": model.owned_by,
+                "backend": model.backend,
+                "prefix": f"/{model.prefix}",
+                "max_model_len": model.max_context,
+            }
+            for model in request.app.state.models
+        ],
+    }
+
+
+@router.get("/health")
+async def health():
+    """Health check endpoint"""
+    return Response(status_code=200)
+
+
+class ModelDispatchMiddleware:
+    """
+    ASGI middleware of the app serving the models of a config file.
+
+    Requests under the `/<prefix>` of a model go to the app mounted there. The other requests go to
+    the app of the model named by the `model` field of their JSON body, or else to the first app
+    serving their path, like TEI requests which have no `model` field. Requests for a model missing
+    from the config file get a 404 error.
+    """
+
+    def __init__(self, app: ASGIApp, models: list[tuple[str, str, FastAPI]]):
+        """
+        Args:
+            app (ASGIApp): The app mounting the apps of the models.
+            models (list[tuple[str, str, FastAPI]]): Name, prefix and app of each model.
+        """
+        self.app = app
+        self.prefixes = tuple(f"/{prefix}/" for _, prefix, _ in models)
+        self.apps = {name: model_app for name, _, model_app in models}
+        self.paths = {route.path for route in router.routes}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.prefixes) or scope["path"] in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        model_app = None
+        if scope["method"] == "POST":
+            body = await self._read_body(receive=receive)
+            if body is None:
+                # client disconnected
+                return
+            model = self._get_model(body=body)
+            if model is not None and model not in self.apps:
+                message = f"The model `{model}` does not exist."
+                response = JSONResponse(
+                    status_code=404, content={"object": "error", "message": message, "type": "NotFoundError", "param": "model", "code": 404}
+                )
+                await response(scope, receive, send)
+                return
+            model_app = self.apps.get(model)
+            receive = self._replay(body=body, receive=receive)
+
+        if model_app is None:
+            model_app = next((model_app for model_app in self.apps.values() if self._serves(app=model_app, scope=scope)), self.app)
+
+        await model_app(scope, receive, send)
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes | None:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    @staticmethod
+    def _replay(body: bytes, receive: Receive) -> Receive:
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        return replay
+
+    @staticmethod
+    def _get_model(body: bytes) -> str | None:
+        try:
+            data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return None
+        model = data.get("model") if isinstance(data, dict) else None
+
+        return model if isinstance(model, str) else None
+
+    @staticmethod
+    def _serves(app: FastAPI, scope: Scope) -> bool:
+        return any(route.matches(scope)[0] != Match.NONE for route in app.router.routes)
@@ -6,7 +6,14 @@ class Settings(BaseModel):
     tiktoken_encoder: str = "cl100k_base"
     faker_langage: str = "fr_FR"
     faker_seed: int | None = None
+    corpus_size: int = 65536
+    stream_chunk_tokens: int = 1
     reference_tps: int = 100
+    reference_ttft_mean: float = 0.6
+    reference_prompt_tokens: int = 500
+    reference_embedding_tps: int = 50000
+    embedding_request_overhead: float = 0.005
+    embedding_contention: float = 0.1
     simulate_latency: bool = False
 
     model_config = ConfigDict(extra="allow")
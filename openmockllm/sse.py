@@ -0,0 +1,32 @@
+from json.encoder import encode_basestring
+
+from pydantic import BaseModel
+
+INDEX_PLACEHOLDER = 9007199254740991
+CONTENT_PLACEHOLDER = "__openmockllm_content__"
+
+
+class SSETemplate:
+    """
+    Server-sent event frame of a streamed chunk, serialized once per stream.
+
+    The chunk model is dumped with placeholders as choice index and delta content, and the frame is
+    split around them: rendering a frame for a new token only formats the index and JSON-escapes the
+    content, instead of building and validating a new model.
+    """
+
+    def __init__(self, chunk: BaseModel):
+        """
+        Args:
+            chunk (BaseModel): Chunk with `INDEX_PLACEHOLDER` as choice index and `CONTENT_PLACEHOLDER` as delta content.
+        """
+        frame = f"data: {chunk.model_dump_json()}\n\n"
+        head, tail = frame.split(encode_basestring(CONTENT_PLACEHOLDER))
+        prefix, middle = head.split(str(INDEX_PLACEHOLDER))
+
+        self.prefix = prefix.encode()
+        self.middle = middle.encode()
+        self.suffix = tail.encode()
+
+    def render(self, index: int, content: str) -> bytes:
+        return b"".join((self.prefix, str(index).encode(), self.middle, encode_basestring(content).encode(), self.suffix))
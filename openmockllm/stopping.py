@@ -0,0 +1,136 @@
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from openmockllm.corpus import TextCorpus
+
+# generated tokens of a request ignoring the end of sequence token without max_tokens, instead of the whole context
+MAX_IGNORE_EOS_TOKENS = 4096
+
+
+class StopStringMatcher:
+    """
+    Aho-Corasick automaton of the stop strings of a request.
+
+    The text is scanned once, character by character, whatever the number of stop strings: the
+    automaton follows the longest suffix of the text read so far that is a prefix of a stop string,
+    and reports the first position where a stop string ends.
+    """
+
+    def __init__(self, stop: tuple[str, ...]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail = [0]
+        self.output: list[str | None] = [None]  # longest stop string ending at each state
+
+        for string in stop:
+            state = 0
+            for char in string:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] = string
+
+        # failure links, breadth first so that the link of the parent is known
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+                queue.append(child)
+
+    def search(self, text: str, min_end: int = 0) -> tuple[int, str] | None:
+        """
+        Find the first stop string of the text.
+
+        Args:
+            text (str): Text to scan.
+            min_end (int): Stop strings ending within the first `min_end` characters are ignored, they may start there.
+
+        Returns:
+            tuple[int, str] | None: Start of the first stop string found in the text and the stop string,
+            None if the text contains no stop string.
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None and position >= min_end:
+                return position + 1 - len(output[state]), output[state]
+
+        return None
+
+
+@lru_cache(maxsize=256)
+def get_stop_string_matcher(stop: tuple[str, ...]) -> StopStringMatcher:
+    return StopStringMatcher(stop=stop)
+
+
+@dataclass(frozen=True)
+class StoppingCriteria:
+    """
+    Stopping parameters of a request, like the sampling parameters of vLLM.
+
+    Stop tokens and the end of sequence token are not generated within the first `min_tokens` tokens,
+    stop strings are matched once `min_tokens` tokens are generated: a stop string completed by a later
+    token may start within the first tokens. With `ignore_eos`, the generation goes on until `max_tokens`,
+    or without `max_tokens` until `max_model_tokens` (the room left in the context), capped at
+    `MAX_IGNORE_EOS_TOKENS` tokens.
+    """
+
+    stop: tuple[str, ...] = ()
+    stop_token_ids: frozenset[int] = frozenset()
+    min_tokens: int = 0
+    ignore_eos: bool = False
+    include_stop_str_in_output: bool = False
+    max_model_tokens: int | None = None
+
+    def apply(self, corpus: TextCorpus, start: int, num_tokens: int) -> tuple[int, int | None, str | int | None]:
+        """
+        Scan the tokens of a completion sliced from the corpus for the first stop token or stop string.
+
+        Args:
+            corpus (TextCorpus): Corpus the completion is sliced from.
+            start (int): Position of the first token of the completion in the corpus.
+            num_tokens (int): Number of tokens of the completion without stop.
+
+        Returns:
+            tuple[int, int | None, str | int | None]: Number of tokens generated, number of characters of the
+            text returned (None for the text of all the tokens) and the stop string or token that stopped the
+            generation (None if none did).
+        """
+        stop_reason, text_length = None, None
+
+        if self.stop_token_ids and num_tokens > self.min_tokens:
+            token_ids = corpus.window_token_ids(start=start + self.min_tokens, stop=start + num_tokens)
+            found = np.flatnonzero(np.isin(token_ids, np.fromiter(self.stop_token_ids, dtype=np.int64)))
+            if found.size:
+                # the stop token is generated and returned
+                num_tokens = self.min_tokens + int(found[0]) + 1
+                stop_reason = int(token_ids[found[0]])
+
+        if self.stop and num_tokens >= self.min_tokens:
+            text = corpus.slice(start=start, stop=start + num_tokens)
+            # like vLLM, stop strings are looked for once min_tokens tokens are generated, in the whole output
+            min_end = len(corpus.slice(start=start, stop=start + max(0, self.min_tokens - 1)))
+            match = get_stop_string_matcher(stop=self.stop).search(text=text, min_end=min_end)
+            if match is not None:
+                position, string = match
+                end = position + len(string)
+                # the generation stops at the token completing the stop string
+                num_tokens = corpus.count_tokens(start=start, stop=start + num_tokens, num_chars=end)
+                text_length = end if self.include_stop_str_in_output else position
+                stop_reason = string
+
+        return num_tokens, text_length, stop_reason
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, Request
+
+from openmockllm.embeddings import EmbeddingsResponse
+from openmockllm.security import check_api_key
+from openmockllm.tei.schemas import (
+    EmbedAllRequest,
+    EmbedAllResponse,
+    EmbedRequest,
+    EmbedResponse,
+    EmbedSparseRequest,
+    EmbedSparseResponse,
+)
+from openmockllm.tei.utils.batcher import wait_for_batches
+from openmockllm.tei.utils.embeddings import embed_batches, generate_sparse_embedding, normalize_embeddings
+from openmockllm.tei.utils.inputs import check_batch_size, encode_inputs, get_inputs
+
+router = APIRouter(tags=["Text Embeddings Inference"])
+
+
+@router.post("/embed", dependencies=[Depends(check_api_key)], response_model=EmbedResponse, response_class=EmbeddingsResponse)
+async def embed(request: Request, body: EmbedRequest):
+    """Get embeddings"""
+    inputs = get_inputs(input=body.inputs)
+    check_batch_size(request=request, num_inputs=len(inputs))
+    token_ids = encode_inputs(request=request, inputs=inputs, truncate=body.truncate, truncation_direction=body.truncation_direction)
+    await wait_for_batches(request=request, input_tokens=[len(ids) for ids in token_ids])
+
+    # Use dimensions from request or fall back to default
+    dimensions = body.dimensions or request.app.state.embedding_dimension
+
+    embeddings = embed_batches(request=request, model=request.app.state.model_name, token_ids=token_ids, dimension=dimensions)
+    if body.normalize:
+        embeddings = normalize_embeddings(embeddings=embeddings)
+
+    return EmbeddingsResponse(content=list(embeddings))
+
+
+@router.post("/embed_all", dependencies=[Depends(check_api_key)], response_model=EmbedAllResponse, response_class=EmbeddingsResponse)
+async def embed_all(request: Request, body: EmbedAllRequest):
+    """Get all embeddings without pooling, one vector per token of each input"""
+    inputs = get_inputs(input=body.inputs)
+    check_batch_size(request=request, num_inputs=len(inputs))
+    token_ids = encode_inputs(request=request, inputs=inputs, truncate=body.truncate, truncation_direction=body.truncation_direction)
+    await wait_for_batches(request=request, input_tokens=[len(ids) for ids in token_ids])
+
+    embedder, model, dimensions = request.app.state.embedder, request.app.state.model_name, request.app.state.embedding_dimension
+
+    return EmbeddingsResponse(content=[embedder.embed_tokens(model=model, token_ids=ids, dimension=dimensions) for ids in token_ids])
+
+
+@router.post("/embed_sparse", dependencies=[Depends(check_api_key)], response_model=EmbedSparseResponse, response_class=EmbeddingsResponse)
+async def embed_sparse(request: Request, body: EmbedSparseRequest):
+    """Get sparse embeddings, indexed by token ID"""
+    inputs = get_inputs(input=body.inputs)
+    check_batch_size(request=request, num_inputs=len(inputs))
+    token_ids = encode_inputs(request=request, inputs=inputs, truncate=body.truncate, truncation_direction=body.truncation_direction)
+    await wait_for_batches(request=request, input_tokens=[len(ids) for ids in token_ids])
+
+    return EmbeddingsResponse(content=[generate_sparse_embedding(token_ids=ids) for ids in token_ids])
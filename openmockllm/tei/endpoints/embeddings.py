@@ -1,43 +1,26 @@
 from fastapi import APIRouter, Depends, Request
 
+from openmockllm.embeddings import EmbeddingsResponse, encode_embeddings
 from openmockllm.security import check_api_key
-from openmockllm.tei.exceptions import EmptyBatchError, ValidationError
-from openmockllm.tei.schemas import (
-    EncodingFormat,
-    OpenAICompatEmbedding,
-    OpenAICompatRequest,
-    OpenAICompatResponse,
-    OpenAICompatUsage,
-)
-from openmockllm.tei.utils.embeddings import generate_mock_embedding, get_dimensions
+from openmockllm.tei.schemas import EncodingFormat, OpenAICompatRequest, OpenAICompatResponse, OpenAICompatUsage
+from openmockllm.tei.utils.batcher import wait_for_batches
+from openmockllm.tei.utils.embeddings import embed_batches, get_dimensions
+from openmockllm.tei.utils.inputs import check_batch_size, encode_inputs, get_inputs
 
 router = APIRouter(prefix="/v1", tags=["Text Embeddings Inference"])
 
 
-@router.post("/embeddings", dependencies=[Depends(check_api_key)])
+@router.post("/embeddings", dependencies=[Depends(check_api_key)], response_model=OpenAICompatResponse, response_class=EmbeddingsResponse)
 async def openai_embed(request: Request, body: OpenAICompatRequest):
     """OpenAI compatible embeddings endpoint"""
     # Use the model from the request or fall back to the default
     model = body.model or request.app.state.model_name
 
-    # Extract the input data from the RootModel
-    input_data = body.input.root
-
-    # Handle both single input and list of inputs
-    if isinstance(input_data, str):
-        inputs = [input_data]
-    elif isinstance(input_data, list):
-        if len(input_data) == 0:
-            raise EmptyBatchError("Batch is empty")
-        # Handle list of strings or list of token IDs
-        inputs = input_data
-    else:
-        inputs = [input_data]
-
-    # Validate batch size
-    max_batch_size = getattr(request.app.state, "max_client_batch_size", 32)
-    if len(inputs) > max_batch_size:
-        raise ValidationError(f"Batch size {len(inputs)} exceeds maximum {max_batch_size}", status_code=413)
+    inputs = get_inputs(input=body.input)
+    check_batch_size(request=request, num_inputs=len(inputs))
+    token_ids = encode_inputs(request=request, inputs=inputs)
+    input_tokens = [len(ids) for ids in token_ids]
+    await wait_for_batches(request=request, input_tokens=input_tokens)
 
     # Use dimensions from request or fall back to default
     dimensions = get_dimensions(request=request, body=body)
@@ -45,20 +28,15 @@ async def openai_embed(request: Request, body: OpenAICompatRequest):
     # Get encoding format
     encoding_format = body.encoding_format.value if isinstance(body.encoding_format, EncodingFormat) else body.encoding_format
 
-    # Generate mock embeddings
-    embeddings_data = [
-        OpenAICompatEmbedding(
-            object="embedding",
-            index=i,
-            embedding=generate_mock_embedding(dimension=dimensions, encoding_format=encoding_format),
-        )
-        for i in range(len(inputs))
-    ]
-
-    response = OpenAICompatResponse(
-        object="list",
-        data=embeddings_data,
-        model=model,
-        usage=OpenAICompatUsage(prompt_tokens=0, total_tokens=0),
+    # Embed by batches of --max-batch-tokens tokens, rows are serialized without going through Python floats
+    embeddings = embed_batches(request=request, model=model, token_ids=token_ids, dimension=dimensions)
+    embeddings = encode_embeddings(embeddings=embeddings, encoding_format=encoding_format)
+
+    return EmbeddingsResponse(
+        content={
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": embedding} for i, embedding in enumerate(embeddings)],
+            "model": model,
+            "usage": OpenAICompatUsage(prompt_tokens=sum(input_tokens), total_tokens=sum(input_tokens)).model_dump(),
+        }
     )
-    return response
@@ -15,7 +15,11 @@ async def get_model_info(request: Request):
     model_name = getattr(request.app.state, "model_name", "openmockllm")
     max_client_batch_size = getattr(request.app.state, "max_client_batch_size", 32)
     max_batch_tokens = getattr(request.app.state, "max_batch_tokens", 16384)
+    max_input_length = getattr(request.app.state, "max_input_length", 512)
     auto_truncate = getattr(request.app.state, "auto_truncate", False)
+    max_batch_requests = getattr(request.app.state, "max_batch_requests", None)
+    max_concurrent_requests = getattr(request.app.state, "max_concurrent_requests", 128)
+    tokenization_workers = getattr(request.app.state, "tokenization_workers", 4)
 
     # Create model_type for embedding model
     model_type = ModelType(root=ModelType2(embedding=EmbeddingModel(pooling="cls")))
@@ -27,13 +31,13 @@ async def get_model_info(request: Request):
         model_sha=None,
         model_dtype="float16",
         model_type=model_type,
-        max_concurrent_requests=128,
-        max_input_length=512,
+        max_concurrent_requests=max_concurrent_requests,
+        max_input_length=max_input_length,
         max_batch_tokens=max_batch_tokens,
         max_client_batch_size=max_client_batch_size,
-        max_batch_requests=None,
+        max_batch_requests=max_batch_requests,
         auto_truncate=auto_truncate,
-        tokenization_workers=4,
+        tokenization_workers=tokenization_workers,
         version="1.8.2",
         sha=None,
         docker_label=None,
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(tags=["Text Embeddings Inference"])
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus metrics of the TEI router, measured on the requests of the mock"""
+    return request.app.state.metrics.registry.response()
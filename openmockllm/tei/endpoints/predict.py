@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Request
+
+from openmockllm.security import check_api_key
+from openmockllm.tei.schemas import Prediction, PredictRequest, PredictResponse
+from openmockllm.tei.utils.batcher import wait_for_batches
+from openmockllm.tei.utils.inputs import check_batch_size, check_input_length, truncate_token_ids
+from openmockllm.tei.utils.predict import generate_predictions, get_sequences
+from openmockllm.tokenizer import tokenizer
+
+router = APIRouter(tags=["Text Embeddings Inference"])
+
+
+@router.post("/predict", dependencies=[Depends(check_api_key)])
+async def predict(request: Request, body: PredictRequest):
+    """Get predictions of the classification model"""
+    sequences, is_batch = get_sequences(inputs=body.inputs)
+    check_batch_size(request=request, num_inputs=len(sequences))
+
+    # Encode the texts of all the sequences at once
+    encoded = iter(tokenizer.encode_batch([text for sequence in sequences for text in sequence], disallowed_special=()))
+    sequences_ids = [[next(encoded) for _ in sequence] for sequence in sequences]
+
+    # Pairs are truncated on the second text side
+    max_input_length = request.app.state.max_input_length
+    if body.truncate or request.app.state.auto_truncate:
+        for sequence_ids in sequences_ids:
+            sequence_ids[0] = truncate_token_ids(
+                token_ids=sequence_ids[0], max_length=max_input_length, truncation_direction=body.truncation_direction
+            )
+            if len(sequence_ids) == 2:
+                max_length = max_input_length - len(sequence_ids[0])
+                sequence_ids[1] = truncate_token_ids(token_ids=sequence_ids[1], max_length=max_length, truncation_direction=body.truncation_direction)
+    else:
+        check_input_length(num_tokens=max(sum(map(len, sequence_ids)) for sequence_ids in sequences_ids), max_input_length=max_input_length)
+
+    await wait_for_batches(request=request, input_tokens=[sum(map(len, sequence_ids)) for sequence_ids in sequences_ids])
+
+    predictions = [
+        [Prediction(label=label, score=score) for label, score in sequence_predictions]
+        for sequence_predictions in generate_predictions(sequences_ids=sequences_ids, raw_scores=body.raw_scores)
+    ]
+
+    response: PredictResponse = predictions if is_batch else predictions[0]
+
+    return response
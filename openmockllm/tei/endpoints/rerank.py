@@ -2,9 +2,12 @@ from fastapi import APIRouter, Depends, Request
 
 from openmockllm.logger import init_logger
 from openmockllm.security import check_api_key
-from openmockllm.tei.exceptions import EmptyBatchError, ValidationError
+from openmockllm.tei.exceptions import EmptyBatchError
 from openmockllm.tei.schemas import Rank, RerankRequest, RerankResponse
-from openmockllm.tei.utils.rerank import generate_mock_rerank_scores
+from openmockllm.tei.utils.batcher import wait_for_batches
+from openmockllm.tei.utils.inputs import check_batch_size, check_input_length, truncate_token_ids
+from openmockllm.tei.utils.rerank import generate_rerank_scores
+from openmockllm.tokenizer import tokenizer
 
 logger = init_logger(__name__)
 router = APIRouter(tags=["Text Embeddings Inference"])
@@ -18,12 +21,25 @@ async def rerank(request: Request, body: RerankRequest):
         raise EmptyBatchError("Batch is empty")
 
     # Validate batch size
-    max_batch_size = getattr(request.app.state, "max_client_batch_size", 32)
-    if len(body.texts) > max_batch_size:
-        raise ValidationError(f"Batch size {len(body.texts)} exceeds maximum {max_batch_size}", status_code=413)
+    check_batch_size(request=request, num_inputs=len(body.texts))
 
-    # Generate mock reranking scores
-    ranked_results = generate_mock_rerank_scores(len(body.texts), body.query)
+    # Encode the query and the texts at once
+    query_ids, *texts_ids = tokenizer.encode_batch([body.query, *body.texts], disallowed_special=())
+
+    # Each text is scored as a (query, text) pair, longer pairs are truncated on the text side
+    max_input_length = request.app.state.max_input_length
+    if body.truncate or request.app.state.auto_truncate:
+        query_ids = truncate_token_ids(token_ids=query_ids, max_length=max_input_length, truncation_direction=body.truncation_direction)
+        max_length = max_input_length - len(query_ids)
+        texts_ids = [truncate_token_ids(token_ids=ids, max_length=max_length, truncation_direction=body.truncation_direction) for ids in texts_ids]
+    else:
+        check_input_length(num_tokens=len(query_ids) + max(map(len, texts_ids)), max_input_length=max_input_length)
+
+    # Each (query, text) pair is an input of the model
+    await wait_for_batches(request=request, input_tokens=[len(query_ids) + len(ids) for ids in texts_ids])
+
+    # Score the whole batch at once
+    ranked_results = generate_rerank_scores(query_ids=query_ids, texts_ids=texts_ids, raw_scores=body.raw_scores, top_n=body.top_n)
 
     # Create response
     response: RerankResponse = [
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(tags=["Text Embeddings Inference"])
+
+
+@router.get("/stats")
+async def stats(request: Request):
+    """Requests in flight, used by the latency model, state of the embedding and encoding caches and of the dynamic batcher"""
+    stats = request.app.state.inflight.stats()
+    if request.app.state.batcher is not None:
+        stats["batcher"] = request.app.state.batcher.stats()
+    stats["embeddings"] = request.app.state.embedder.stats()
+    stats["tokenize"] = request.app.state.encoding_cache.stats()
+
+    return stats
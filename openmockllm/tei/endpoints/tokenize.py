@@ -0,0 +1,37 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
+
+from openmockllm.security import check_api_key
+from openmockllm.tei.schemas import DecodeRequest, DecodeResponse, TokenizeRequest, TokenizeResponse
+from openmockllm.tei.utils.inputs import check_batch_size
+from openmockllm.tei.utils.tokenize import decode_batch, generate_tokens
+
+router = APIRouter(tags=["Text Embeddings Inference"])
+
+
+@router.post("/tokenize", dependencies=[Depends(check_api_key)], response_model=TokenizeResponse)
+async def tokenize(request: Request, body: TokenizeRequest):
+    """Tokenize inputs"""
+    texts = [body.inputs.root] if isinstance(body.inputs.root, str) else body.inputs.root
+    check_batch_size(request=request, num_inputs=len(texts))
+
+    # Recent encodings are cached, the other texts are encoded at once across threads, `add_special_tokens`
+    # has no BOS or EOS token to add with tiktoken encodings
+    token_ids = await request.app.state.encoding_cache.encode_batch(texts=texts, num_threads=request.app.state.tokenization_workers)
+
+    # Tokens are built as plain dicts, validating a SimpleToken per token is too slow for long documents
+    return JSONResponse(content=[generate_tokens(text=text, token_ids=ids) for text, ids in zip(texts, token_ids, strict=True)])
+
+
+@router.post("/decode", dependencies=[Depends(check_api_key)], response_model=DecodeResponse)
+async def decode(request: Request, body: DecodeRequest):
+    """Decode input ids"""
+    token_ids = body.ids.root
+    token_ids = token_ids if token_ids and isinstance(token_ids[0], list) else [token_ids]
+    check_batch_size(request=request, num_inputs=len(token_ids))
+
+    return await asyncio.to_thread(
+        decode_batch, token_ids=token_ids, skip_special_tokens=body.skip_special_tokens, num_threads=request.app.state.tokenization_workers
+    )
@@ -96,6 +96,7 @@ class UnhealthyError(TEIException):
 async def tei_exception_handler(request: Request, exc: TEIException) -> JSONResponse:
     """Handle TEI exceptions and return proper error response"""
     logger.error(f"TEIException: {exc.error_type} - {exc.detail} (status: {exc.status_code})")
+    request.app.state.metrics.request_failure.inc(label=exc.error_type)
 
     error_response = ErrorResponse(
         error=exc.detail,
@@ -111,6 +112,7 @@ async def tei_exception_handler(request: Request, exc: TEIException) -> JSONResp
 async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
     """Handle general exceptions"""
     logger.error(f"Unhandled exception: {type(exc).__name__} - {str(exc)}")
+    request.app.state.metrics.request_failure.inc(label="backend")
 
     error_response = ErrorResponse(
         error=str(exc),
@@ -167,6 +167,12 @@ class TruncationDirection(Enum):
     left = "left"
     right = "right"
 
+    @classmethod
+    def _missing_(cls, value):
+        # TEI also accepts the capitalized values ("Left", "Right")
+        if isinstance(value, str):
+            return cls.__members__.get(value.lower())
+
 
 class DecodeRequest(BaseModel):
     ids: InputIds
@@ -234,6 +240,7 @@ class RerankRequest(BaseModel):
     raw_scores: bool = Field(False, examples=[False])
     return_text: bool = Field(False, examples=[False])
     texts: list[str] = Field(..., examples=[["Deep Learning is ..."]])
+    top_n: conint(ge=1) | None = Field(None, examples=[None])
     truncate: bool | None = Field(False, examples=[False])
     truncation_direction: TruncationDirection = "right"
 
@@ -0,0 +1,189 @@
+import asyncio
+from collections import deque
+import time
+from typing import TYPE_CHECKING
+
+from fastapi import Request
+
+from openmockllm.logger import init_logger
+from openmockllm.settings import settings
+from openmockllm.tei.exceptions import OverloadedError
+from openmockllm.utils import get_realistic_embedding_latency, simulate_embedding_latency
+
+if TYPE_CHECKING:
+    from openmockllm.tei.utils.metrics import TEIMetrics
+
+logger = init_logger(__name__)
+
+
+class BatchedRequest:
+    """A request handled by the batcher, done when all its inputs went through a batch."""
+
+    def __init__(self, num_inputs: int):
+        self.num_inputs = num_inputs
+        self.processed = 0
+        self.queued = time.perf_counter()
+        self.started: float | None = None  # start of the first batch of the request
+        self.done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+
+class DynamicBatcher:
+    """
+    Dynamic batching simulation of the TEI router.
+
+    The inputs of the requests are queued and a single loop runs the forward passes: requests arriving
+    within `batch_window` seconds are coalesced, and each batch takes queued inputs in arrival order
+    while they fit in `max_batch_tokens` tokens and `max_batch_requests` inputs. A request returns once
+    all its inputs have been processed. Requests beyond `max_concurrent_requests` in flight are rejected
+    with a 429 error, like TEI.
+
+    When latency simulation is enabled, a forward pass lasts the embedding latency of the tokens of the
+    batch, without contention: concurrent requests wait for their batch in the queue instead.
+    """
+
+    def __init__(self, max_batch_tokens: int, max_concurrent_requests: int, max_batch_requests: int | None = None, batch_window: float = 0.002):
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_batch_requests = max_batch_requests
+        self.batch_window = batch_window
+        self.queue: deque[tuple[BatchedRequest, int]] = deque()  # one (request, number of tokens) per input
+        self.queued_tokens = 0
+        self.num_requests = 0
+        self.num_rejected = 0
+        self.num_batches = 0
+        self.num_batch_tokens = 0
+        self.metrics: TEIMetrics | None = None  # set by the app
+        self._task: asyncio.Task | None = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.num_requests,
+            "queued_inputs": len(self.queue),
+            "rejected": self.num_rejected,
+            "batches": self.num_batches,
+            "mean_batch_tokens": self.num_batch_tokens / self.num_batches if self.num_batches else 0.0,
+        }
+
+    async def process(self, input_tokens: list[int]) -> tuple[float, float]:
+        """
+        Queue the inputs of a request and wait until they have all been processed.
+
+        Args:
+            input_tokens (list[int]): Number of tokens of each input of the request.
+
+        Returns:
+            tuple[float, float]: Time spent by the request in the queue and in the batches, in seconds.
+        """
+        if self.num_requests >= self.max_concurrent_requests:
+            self.num_rejected += 1
+            raise OverloadedError("Model is overloaded")
+
+        request = BatchedRequest(num_inputs=len(input_tokens))
+        self.queue.extend((request, num_tokens) for num_tokens in input_tokens)
+        self.queued_tokens += sum(input_tokens)
+        self.num_requests += 1
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+        try:
+            await request.done
+            started = request.started if request.started is not None else time.perf_counter()
+            return started - request.queued, time.perf_counter() - started
+        finally:
+            self.num_requests -= 1
+            # client disconnected before the end of the processing
+            if not request.done.done():
+                self.queue = deque(item for item in self.queue if item[0] is not request)
+                self.queued_tokens = sum(num_tokens for _, num_tokens in self.queue)
+
+    def _next_batch(self) -> tuple[list[BatchedRequest], int]:
+        """
+        Returns:
+            tuple[list[BatchedRequest], int]: Request of each input of the batch, and number of tokens of the batch.
+        """
+        batch, num_tokens = [], 0
+        while self.queue and (not self.max_batch_requests or len(batch) < self.max_batch_requests):
+            # an input larger than the batch budget runs alone rather than never being scheduled
+            if batch and num_tokens + self.queue[0][1] > self.max_batch_tokens:
+                break
+            request, input_tokens = self.queue.popleft()
+            self.queued_tokens -= input_tokens
+            batch.append(request)
+            num_tokens += input_tokens
+
+        return batch, num_tokens
+
+    def _batch_time(self, num_tokens: int) -> float:
+        if not settings.simulate_latency:
+            return 0.0
+
+        return get_realistic_embedding_latency(input_tokens=num_tokens, inflight_requests=1)
+
+    async def _run(self) -> None:
+        try:
+            while self.queue:
+                # coalesce the requests arriving within the window, unless the batch is already full
+                if self.queued_tokens < self.max_batch_tokens:
+                    await asyncio.sleep(self.batch_window)
+
+                batch, num_tokens = self._next_batch()
+                if not batch:
+                    continue
+                self.num_batches += 1
+                self.num_batch_tokens += num_tokens
+                started = time.perf_counter()
+                for request in batch:
+                    if request.started is None:
+                        request.started = started
+                await asyncio.sleep(self._batch_time(num_tokens=num_tokens))
+                if self.metrics is not None:
+                    self.metrics.observe_batch(size=len(batch), num_tokens=num_tokens, duration=time.perf_counter() - started)
+
+                for request in batch:
+                    request.processed += 1
+                    if request.processed == request.num_inputs and not request.done.done():
+                        request.done.set_result(None)
+        except Exception:
+            logger.exception("Batcher loop failed")
+            for request, _ in self.queue:
+                if not request.done.done():
+                    request.done.set_result(None)
+            self.queue.clear()
+            self.queued_tokens = 0
+        finally:
+            self._task = None
+
+
+async def wait_for_batches(request: Request, input_tokens: list[int]) -> None:
+    """
+    Go through the dynamic batcher of the app if enabled, otherwise wait for the embedding latency of
+    the request. The input tokens are counted on `/stats` and the request is measured on `/metrics`.
+
+    Args:
+        request (Request): The request, for the batcher and the counters of the app.
+        input_tokens (list[int]): Number of tokens of each input of the request.
+    """
+    request.app.state.inflight.add_tokens(prompt_tokens=sum(input_tokens))
+    metrics = request.app.state.metrics
+    method = "batch" if len(input_tokens) > 1 else "single"
+    metrics.request_count.inc(label=method)
+    for num_tokens in input_tokens:
+        metrics.request_input_length.observe(num_tokens)
+    arrival_time = getattr(request.state, "arrival_time", None)
+    if arrival_time is not None:
+        metrics.request_tokenization_duration.observe(time.perf_counter() - arrival_time)
+
+    batcher = request.app.state.batcher
+    if batcher is not None:
+        queue_duration, inference_duration = await batcher.process(input_tokens=input_tokens)
+    else:
+        started = time.perf_counter()
+        await simulate_embedding_latency(input_tokens=sum(input_tokens), inflight=request.app.state.inflight)
+        queue_duration, inference_duration = 0.0, time.perf_counter() - started
+        metrics.observe_batch(size=len(input_tokens), num_tokens=sum(input_tokens), duration=inference_duration)
+
+    metrics.request_queue_duration.observe(queue_duration)
+    metrics.request_inference_duration.observe(inference_duration)
+    metrics.request_success.inc(label=method)
+    if arrival_time is not None:
+        metrics.request_duration.observe(time.perf_counter() - arrival_time)
@@ -1,10 +1,8 @@
-import base64
-from random import random
-import struct
-
 from fastapi import Request
+import numpy as np
 
 from openmockllm.tei.schemas import OpenAICompatRequest
+from openmockllm.tei.utils.inputs import split_batches
 
 
 def get_dimensions(request: Request, body: OpenAICompatRequest):
@@ -14,24 +12,46 @@ def get_dimensions(request: Request, body: OpenAICompatRequest):
         return body.dimensions
 
 
-def generate_mock_embedding(dimension: int = 1024, encoding_format: str = "float") -> list[float] | str:
+def embed_batches(request: Request, model: str, token_ids: list[list[int]], dimension: int) -> np.ndarray:
     """
-    Generate a mock embedding vector
+    Embed the inputs of a request by batches of at most `--max-batch-tokens` tokens
 
     Args:
-        dimension: The dimension of the embedding vector
-        encoding_format: Either "float" or "base64"
+        request: The request, for the embedder and the `--max-batch-tokens` setting
+        model: The model name
+        token_ids: The token IDs of each input
+        dimension: The dimension of the embedding vectors
 
     Returns:
-        List of floats or base64 encoded string
+        Array of shape (num_inputs, dimension) of float32
+    """
+    embedder = request.app.state.embedder
+    batches = split_batches(token_ids=token_ids, max_batch_tokens=request.app.state.max_batch_tokens)
+
+    return np.concatenate([embedder.embed(model=model, inputs=token_ids[batch], dimension=dimension) for batch in batches])
+
+
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize embedding vectors in place, null vectors are left unchanged
+    """
+    embeddings /= np.maximum(np.linalg.norm(embeddings, axis=-1, keepdims=True), np.float32(1e-12))
+
+    return embeddings
+
+
+def generate_sparse_embedding(token_ids: list[int]) -> list[dict]:
     """
-    # Generate random floats
-    embedding = [random() for _ in range(dimension)]
+    Generate a sparse embedding vector: the weight of each token of the input is the log of one plus
+    its number of occurrences, like the log-saturation of SPLADE models
 
-    if encoding_format == "base64":
-        # Convert floats to base64 encoded string
-        # Pack as little-endian floats
-        packed = struct.pack(f"<{dimension}f", *embedding)
-        return base64.b64encode(packed).decode("utf-8")
+    Args:
+        token_ids: The token IDs of the input
+
+    Returns:
+        List of {"index", "value"} sorted by index
+    """
+    indices, counts = np.unique(np.asarray(token_ids, dtype=np.int64), return_counts=True)
+    values = np.log1p(counts)
 
-    return embedding
+    return [{"index": index, "value": value} for index, value in zip(indices.tolist(), values.tolist(), strict=True)]
@@ -0,0 +1,117 @@
+from fastapi import Request
+
+from openmockllm.tei.exceptions import EmptyBatchError, ValidationError
+from openmockllm.tei.schemas import Input, InputType, TruncationDirection
+from openmockllm.utils import encode_texts
+
+
+def get_inputs(input: Input) -> list[str | list[int]]:
+    """
+    Unwrap the texts and token IDs of a request from their RootModel
+
+    Args:
+        input: The `input` or `inputs` field of the request
+
+    Returns:
+        List of texts or token IDs, one per input
+    """
+    input_data = input.root
+
+    # Handle both single input and list of inputs
+    if isinstance(input_data, list):
+        if len(input_data) == 0:
+            raise EmptyBatchError("Batch is empty")
+        inputs = input_data
+    else:
+        inputs = [input_data]
+
+    return [input.root if isinstance(input, InputType) else input for input in inputs]
+
+
+def check_batch_size(request: Request, num_inputs: int) -> None:
+    """
+    Raise the TEI validation error of requests with more than `--max-client-batch-size` inputs
+    """
+    max_batch_size = getattr(request.app.state, "max_client_batch_size", 32)
+    if num_inputs > max_batch_size:
+        raise ValidationError(f"Batch size {num_inputs} exceeds maximum {max_batch_size}", status_code=413)
+
+
+def truncate_token_ids(token_ids: list[int], max_length: int, truncation_direction: TruncationDirection = TruncationDirection.right) -> list[int]:
+    """
+    Truncate token IDs to `max_length` tokens
+
+    Args:
+        token_ids: The token IDs of the input
+        max_length: The maximum number of tokens to keep
+        truncation_direction: Whether the tokens are removed from the left or the right of the input
+
+    Returns:
+        List of at most `max_length` token IDs
+    """
+    if len(token_ids) <= max_length:
+        return token_ids
+    if truncation_direction == TruncationDirection.left:
+        return token_ids[len(token_ids) - max_length :]
+
+    return token_ids[:max_length]
+
+
+def check_input_length(num_tokens: int, max_input_length: int) -> None:
+    """
+    Raise the TEI validation error of inputs longer than `max_input_length` tokens
+    """
+    if num_tokens > max_input_length:
+        raise ValidationError(f"Input validation error: `inputs` must have less than {max_input_length} tokens. Given: {num_tokens}", status_code=413)
+
+
+def encode_inputs(
+    request: Request,
+    inputs: list[str | list[int]],
+    truncate: bool | None = False,
+    truncation_direction: TruncationDirection = TruncationDirection.right,
+) -> list[list[int]]:
+    """
+    Encode the texts of a batch at once and check the length of each input
+
+    Args:
+        request: The request, for the `--max-input-length` and `--auto-truncate` settings
+        inputs: List of texts or token IDs
+        truncate: Whether inputs longer than the max input length are truncated instead of rejected
+        truncation_direction: Whether the tokens are removed from the left or the right of the inputs
+
+    Returns:
+        List of token IDs, one per input
+    """
+    token_ids = encode_texts(inputs=inputs)
+
+    max_input_length = request.app.state.max_input_length
+    if truncate or request.app.state.auto_truncate:
+        return [truncate_token_ids(token_ids=ids, max_length=max_input_length, truncation_direction=truncation_direction) for ids in token_ids]
+
+    check_input_length(num_tokens=max(map(len, token_ids)), max_input_length=max_input_length)
+
+    return token_ids
+
+
+def split_batches(token_ids: list[list[int]], max_batch_tokens: int) -> list[slice]:
+    """
+    Split the inputs of a request in consecutive batches of at most `max_batch_tokens` tokens, like the
+    batches of a forward pass of the model
+
+    Args:
+        token_ids: The token IDs of each input
+        max_batch_tokens: The maximum number of tokens in a batch
+
+    Returns:
+        List of slices of the inputs
+    """
+    batches, start, num_tokens = [], 0, 0
+    for i, ids in enumerate(token_ids):
+        if i > start and num_tokens + len(ids) > max_batch_tokens:
+            batches.append(slice(start, i))
+            start, num_tokens = i, 0
+        num_tokens += len(ids)
+    batches.append(slice(start, len(token_ids)))
+
+    return batches
@@ -0,0 +1,54 @@
+from openmockllm.metrics import MetricsRegistry, exponential_buckets
+from openmockllm.tei.utils.batcher import DynamicBatcher
+
+# buckets of the TEI router histograms
+DURATION_BUCKETS = exponential_buckets(start=0.000015, factor=1.5, count=35)
+INPUT_LENGTH_BUCKETS = exponential_buckets(start=1, factor=2, count=20)
+BATCH_SIZE_BUCKETS = exponential_buckets(start=1, factor=2, count=13)
+BATCH_TOKENS_BUCKETS = exponential_buckets(start=1, factor=2, count=21)
+
+
+class TEIMetrics:
+    """
+    Prometheus metrics of the TEI router, with the same names and buckets, measured on the requests of the mock.
+
+    Without dynamic batching, each request is a batch of its own and never waits in the queue.
+    """
+
+    def __init__(self, batcher: DynamicBatcher | None = None):
+        self.batcher = batcher
+        self.registry = MetricsRegistry()
+        registry = self.registry
+
+        self.request_count = registry.counter("te_request_count", "Number of inference requests.", label="method")
+        self.request_success = registry.counter("te_request_success", "Number of successful inference requests.", label="method")
+        self.request_failure = registry.counter("te_request_failure", "Number of failed requests.", label="err")
+        self.request_duration = registry.histogram("te_request_duration", "Duration of the requests in seconds.", DURATION_BUCKETS)
+        self.request_tokenization_duration = registry.histogram(
+            "te_request_tokenization_duration", "Duration of the validation and tokenization of the requests in seconds.", DURATION_BUCKETS
+        )
+        self.request_queue_duration = registry.histogram(
+            "te_request_queue_duration", "Time spent by the requests in the queue in seconds.", DURATION_BUCKETS
+        )
+        self.request_inference_duration = registry.histogram(
+            "te_request_inference_duration", "Duration of the inference of the requests in seconds.", DURATION_BUCKETS
+        )
+        self.request_input_length = registry.histogram("te_request_input_length", "Number of tokens of the inputs.", INPUT_LENGTH_BUCKETS)
+        self.batch_inference_count = registry.counter("te_batch_inference_count", "Number of forward passes.")
+        self.batch_inference_success = registry.counter("te_batch_inference_success", "Number of successful forward passes.")
+        self.batch_next_size = registry.histogram("te_batch_next_size", "Number of inputs of the batches.", BATCH_SIZE_BUCKETS)
+        self.batch_next_tokens = registry.histogram("te_batch_next_tokens", "Number of tokens of the batches.", BATCH_TOKENS_BUCKETS)
+        self.batch_inference_duration = registry.histogram(
+            "te_batch_inference_duration", "Duration of the forward passes in seconds.", DURATION_BUCKETS
+        )
+        registry.gauge("te_queue_size", "Number of inputs in the queue.", function=self._queue_size)
+
+    def _queue_size(self) -> int:
+        return len(self.batcher.queue) if self.batcher is not None else 0
+
+    def observe_batch(self, size: int, num_tokens: int, duration: float) -> None:
+        self.batch_inference_count.inc()
+        self.batch_inference_success.inc()
+        self.batch_next_size.observe(size)
+        self.batch_next_tokens.observe(num_tokens)
+        self.batch_inference_duration.observe(duration)
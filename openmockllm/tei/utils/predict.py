@@ -0,0 +1,68 @@
+import numpy as np
+
+from openmockllm.tei.exceptions import EmptyBatchError, ValidationError
+from openmockllm.tei.schemas import PredictInput
+from openmockllm.tei.utils.rerank import score_texts, similarity_logits
+
+PREDICT_LABELS = ["LABEL_0", "LABEL_1"]
+
+rng = np.random.default_rng()
+
+
+def get_sequences(inputs: PredictInput) -> tuple[list[list[str]], bool]:
+    """
+    Unwrap the sequences of a predict request: a single string, a pair of strings or a batch of mixed
+    single and pairs of strings
+
+    Args:
+        inputs: The `inputs` field of the request
+
+    Returns:
+        Tuple of the list of sequences (one or two strings each) and whether the request is a batch
+    """
+    input_data = inputs.root
+
+    if isinstance(input_data, str):
+        return [[input_data]], False
+    # a list of two strings is a single pair, like in TEI
+    if len(input_data) == 2 and all(isinstance(text, str) for text in input_data):
+        return [input_data], False
+    if len(input_data) == 0:
+        raise EmptyBatchError("Batch is empty")
+
+    sequences = [[sequence] if isinstance(sequence, str) else sequence for sequence in input_data]
+    if any(len(sequence) not in (1, 2) for sequence in sequences):
+        raise ValidationError("Input validation error: `inputs` must be a string, a pair of strings or a batch of them")
+
+    return sequences, True
+
+
+def generate_predictions(sequences_ids: list[list[list[int]]], raw_scores: bool = False) -> list[list[tuple[str, float]]]:
+    """
+    Generate classification predictions for a batch of sequences
+
+    Pairs are classified from the similarity of their two texts (the rerank logit, LABEL_1 for similar
+    texts), single texts get random logits.
+
+    Args:
+        sequences_ids: The token IDs of the one or two texts of each sequence
+        raw_scores: Whether to return the logits instead of the softmax of the logits
+
+    Returns:
+        List of (label, score) tuples sorted by score in descending order, one list per sequence
+    """
+    logits = rng.standard_normal((len(sequences_ids), len(PREDICT_LABELS)))
+
+    pairs = [i for i, sequence in enumerate(sequences_ids) if len(sequence) == 2]
+    for i in pairs:
+        positive = similarity_logits(similarities=score_texts(query_ids=sequences_ids[i][0], texts_ids=[sequences_ids[i][1]]))[0]
+        logits[i] = [-positive, positive]
+
+    scores = logits
+    if not raw_scores:
+        scores = np.exp(logits - logits.max(axis=1, keepdims=True))
+        scores /= scores.sum(axis=1, keepdims=True)
+
+    order = np.argsort(-scores, axis=1, kind="stable")
+
+    return [[(PREDICT_LABELS[j], float(row[j])) for j in indices] for row, indices in zip(scores, order, strict=True)]
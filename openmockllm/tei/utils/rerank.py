@@ -1,21 +1,79 @@
-from random import random
+import numpy as np
 
+from openmockllm.embeddings import hash_token_ids
 
-def generate_mock_rerank_scores(num_texts: int, query: str = "") -> list[tuple[int, float]]:
+# similarity of the bags of tokens of two texts on the same topic: unrelated texts still share stop words and punctuation,
+# a question and its answer share their keywords on top of them
+SIMILARITY_THRESHOLD = 0.25
+
+
+def score_texts(query_ids: list[int], texts_ids: list[list[int]], num_buckets: int = 4096) -> np.ndarray:
+    """
+    Cosine similarity between the bag of tokens of the query and the bag of tokens of each text
+
+    Tokens are hashed into buckets like the projection embeddings, and the whole batch is scored in a single
+    pass over its tokens: texts with more tokens in common with the query get higher scores.
+
+    Args:
+        query_ids: The token IDs of the query
+        texts_ids: The token IDs of each text
+        num_buckets: The number of hash buckets
+
+    Returns:
+        Array of shape (num_texts,) of similarities between 0 and 1
+    """
+    query = np.bincount(hash_token_ids(token_ids=[query_ids], num_buckets=num_buckets)[1], minlength=num_buckets).astype(np.float64)
+    rows, buckets = hash_token_ids(token_ids=texts_ids, num_buckets=num_buckets)
+
+    dots = np.bincount(rows, weights=query[buckets], minlength=len(texts_ids))
+    # squared norm of each text bag, from the count of each (text, bucket) pair
+    keys, counts = np.unique(rows * num_buckets + buckets, return_counts=True)
+    norms = np.sqrt(np.bincount(keys // num_buckets, weights=counts.astype(np.float64) ** 2, minlength=len(texts_ids)))
+    norms *= np.linalg.norm(query)
+
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+
+def similarity_logits(similarities: np.ndarray) -> np.ndarray:
+    """
+    Map similarities to logits like the outputs of a cross-encoder: positive above `SIMILARITY_THRESHOLD`,
+    negative below, between -2.5 and 7.5
+    """
+    return 10.0 * (similarities - SIMILARITY_THRESHOLD)
+
+
+def top_k(scores: np.ndarray, k: int | None = None) -> np.ndarray:
+    """
+    Indices of the `k` highest scores, sorted by score in descending order
+
+    Only the selected scores are sorted: `argpartition` finds them in linear time.
+    """
+    if k is not None and k < len(scores):
+        indices = np.argpartition(-scores, k - 1)[:k]
+        return indices[np.argsort(-scores[indices], kind="stable")]
+
+    return np.argsort(-scores, kind="stable")
+
+
+def generate_rerank_scores(
+    query_ids: list[int], texts_ids: list[list[int]], raw_scores: bool = False, top_n: int | None = None
+) -> list[tuple[int, float]]:
     """
-    Generate mock reranking scores for a list of texts
+    Generate reranking scores for a list of texts
 
     Args:
-        num_texts: Number of texts to generate scores for
-        query: The query string (used for seed but not actually processed)
+        query_ids: The token IDs of the query
+        texts_ids: The token IDs of each text
+        raw_scores: Whether to return the logits instead of the sigmoid of the logits
+        top_n: Number of texts to return, all of them if None
 
     Returns:
         List of (index, score) tuples sorted by score in descending order
     """
-    # Generate random scores for each text
-    scores = [(i, random()) for i in range(num_texts)]
+    scores = similarity_logits(similarities=score_texts(query_ids=query_ids, texts_ids=texts_ids))
+    if not raw_scores:
+        scores = 1.0 / (1.0 + np.exp(-scores))
 
-    # Sort by score in descending order (highest relevance first)
-    scores.sort(key=lambda x: x[1], reverse=True)
+    indices = top_k(scores=scores, k=top_n)
 
-    return scores
+    return list(zip(indices.tolist(), scores[indices].tolist(), strict=True))
@@ -0,0 +1,142 @@
+import asyncio
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from openmockllm.tei.exceptions import TokenizerError
+from openmockllm.tokenizer import tokenizer
+
+
+class EncodingCache:
+    """
+    Bounded LRU cache of recent encodings, keyed by text.
+
+    Like Hugging Face tokenizers, special tokens written in a text are encoded as special tokens. The
+    tiktoken encodings have no BOS or EOS token to add, like GPT-2 style tokenizers, so the encoding of
+    a text doesn't depend on `add_special_tokens`.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.encodings: OrderedDict[str, list[int]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    async def encode_batch(self, texts: list[str], num_threads: int = 4) -> list[list[int]]:
+        """
+        Encode a batch of texts, the texts missing from the cache are encoded at once by `num_threads` threads,
+        outside of the event loop
+        """
+        token_ids: list[list[int] | None] = []
+        for text in texts:
+            ids = self.encodings.get(text)
+            if ids is not None:
+                self.encodings.move_to_end(text)
+            token_ids.append(ids)
+
+        missing = [i for i, ids in enumerate(token_ids) if ids is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            encoded = await asyncio.to_thread(tokenizer.encode_batch, [texts[i] for i in missing], num_threads=num_threads, allowed_special="all")
+            # the cache is only updated from the event loop
+            for i, ids in zip(missing, encoded, strict=True):
+                token_ids[i] = ids
+                self.encodings[texts[i]] = ids
+            while len(self.encodings) > self.max_size:
+                self.encodings.popitem(last=False)
+
+        return token_ids
+
+    def stats(self) -> dict:
+        return {"size": len(self.encodings), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache(maxsize=1)
+def get_token_byte_lengths() -> np.ndarray:
+    """
+    Number of bytes of each token of the vocabulary, computed once
+    """
+    lengths = np.zeros(tokenizer.n_vocab, dtype=np.int64)
+    for token_id in range(tokenizer.n_vocab):
+        try:
+            lengths[token_id] = len(tokenizer.decode_single_token_bytes(token_id))
+        except KeyError:
+            # gap in the vocabulary
+            continue
+
+    return lengths
+
+
+@lru_cache(maxsize=1)
+def get_special_token_ids() -> frozenset[int]:
+    return frozenset(tokenizer.encode_single_token(token) for token in tokenizer.special_tokens_set)
+
+
+def get_offsets(text: str, token_ids: list[int]) -> tuple[list[int], list[int]]:
+    """
+    Character offsets of the tokens of an encoded text, computed from the byte length of each token
+
+    Args:
+        text: The encoded text
+        token_ids: The token IDs of the text
+
+    Returns:
+        Tuple of the start (included) and stop (excluded) character offsets of each token
+    """
+    lengths = get_token_byte_lengths()[np.asarray(token_ids, dtype=np.int64)]
+    stops = np.cumsum(lengths)
+    starts = stops - lengths
+
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    if len(data) != len(text):
+        # map byte offsets to character offsets: a character split across tokens belongs to the first one
+        continuation = np.append((data & 0xC0) == 0x80, False)
+        char_of_byte = np.append(np.cumsum(~continuation[:-1]) - 1, len(text))
+        starts = char_of_byte[starts] + continuation[starts]
+        stops = np.maximum(np.where(lengths > 0, char_of_byte[np.maximum(stops - 1, 0)] + 1, starts), starts)
+
+    return starts.tolist(), stops.tolist()
+
+
+def generate_tokens(text: str, token_ids: list[int]) -> list[dict]:
+    """
+    Tokens of an encoded text in the format of TEI `SimpleToken`
+
+    Args:
+        text: The encoded text
+        token_ids: The token IDs of the text
+
+    Returns:
+        List of {"id", "special", "start", "stop", "text"}
+    """
+    special_ids = get_special_token_ids()
+    starts, stops = get_offsets(text=text, token_ids=token_ids)
+
+    return [
+        {"id": token_id, "special": token_id in special_ids, "start": start, "stop": stop, "text": text[start:stop]}
+        for token_id, start, stop in zip(token_ids, starts, stops, strict=True)
+    ]
+
+
+def decode_batch(token_ids: list[list[int]], skip_special_tokens: bool = True, num_threads: int = 4) -> list[str]:
+    """
+    Decode a batch of token IDs
+
+    Args:
+        token_ids: The token IDs of each text
+        skip_special_tokens: Whether special tokens are removed from the texts
+        num_threads: The number of threads decoding the batch
+
+    Returns:
+        List of decoded texts
+    """
+    if skip_special_tokens:
+        special_ids = get_special_token_ids()
+        token_ids = [[token_id for token_id in ids if token_id not in special_ids] for ids in token_ids]
+
+    try:
+        return tokenizer.decode_batch(token_ids, num_threads=num_threads)
+    except (KeyError, OverflowError) as e:
+        raise TokenizerError(f"Tokenization error: {e.args[0]}")
@@ -0,0 +1,7 @@
+import tiktoken
+
+from openmockllm.settings import settings
+
+# Loaded once, by the first module importing it: the modules of the backends are imported by
+# create_app, after the settings of the app are set.
+tokenizer = tiktoken.get_encoding(settings.tiktoken_encoder)
@@ -1,19 +1,57 @@
 import asyncio
 import base64
 from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+import itertools
 from pathlib import Path
 import random
+import threading
+import time
 
-from faker import Faker
-import tiktoken
+import numpy as np
 
+from openmockllm.corpus import TextCorpus
+from openmockllm.inflight import InflightTracker
+from openmockllm.latency import get_latency_profile
+from openmockllm.logger import init_logger
 from openmockllm.settings import settings
+from openmockllm.stopping import MAX_IGNORE_EOS_TOKENS, StoppingCriteria
+from openmockllm.tokenizer import tokenizer
+
+logger = init_logger(__name__)
 
 UTILS_DIR = Path(__file__).parent  # The directory where this file is located
 
-tokenizer = tiktoken.get_encoding(settings.tiktoken_encoder)
-fake = Faker(settings.faker_langage)
-fake.seed_instance(settings.faker_seed)
+_corpus: TextCorpus | None = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus() -> TextCorpus:
+    """
+    Text corpus the completions are sliced from, built on first use unless the warm-up already built it.
+    """
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                started = time.perf_counter()
+                # Faker is only needed to build the corpus
+                from faker import Faker
+
+                fake = Faker(settings.faker_langage)
+                fake.seed_instance(settings.faker_seed)
+                _corpus = TextCorpus(tokenizer=tokenizer, fake=fake, size=settings.corpus_size)
+                logger.info(f"Built the text corpus of {len(_corpus)} tokens in {time.perf_counter() - started:.2f}s")
+
+    return _corpus
+
+
+def warm_up_corpus() -> None:
+    """
+    Build the text corpus in a background thread, so that the server accepts requests meanwhile: the
+    first completions wait for it.
+    """
+    threading.Thread(target=get_corpus, name="corpus-warm-up", daemon=True).start()
 
 
 def get_base64_jpeg_image() -> str:
@@ -26,65 +64,138 @@ def get_base64_jpeg_image() -> str:
     return image
 
 
-def count_tokens(text: str) -> int:
-    return len(tokenizer.encode(text))
+class RequestTokens:
+    """
+    Token accounting of a single request.
+
+    The prompt is encoded once when the object is created, the number of completion tokens is
+    set by the generator. The same object is then used for the context length check, the latency
+    model and the usage block of the response. The generator also records when the first token is
+    generated, for the metrics, and the prefix cache the number of prompt tokens it already holds.
+    """
 
+    def __init__(self, prompt: str):
+        self.prompt_token_ids = tokenizer.encode(prompt)
+        self.prompt_tokens = len(self.prompt_token_ids)
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.first_token_time: float | None = None
 
-def check_max_context_length(prompt: str, max_context_length: int) -> int:
-    return len(tokenizer.encode(prompt)) <= max_context_length
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
 
 
-def _clamp_to_max_tokens(text: str, max_tokens: int) -> str:
+def encode_texts(inputs: list[str | list[int]]) -> list[list[int]]:
     """
-    Trim text so that it is at most `max_tokens` tokens according to the configured tokenizer.
+    Token IDs of a batch of texts or token IDs, the texts are encoded at once and the token IDs kept as is.
     """
-    tokens = tokenizer.encode(text)
-    if len(tokens) <= max_tokens:
-        return text
-    return tokenizer.decode(tokens[:max_tokens])
+    texts = [input for input in inputs if isinstance(input, str)]
+    encoded = iter(tokenizer.encode_batch(texts, disallowed_special=()) if texts else [])
+
+    return [next(encoded) if isinstance(input, str) else input for input in inputs]
+
 
+def check_max_context_length(tokens: RequestTokens, max_context_length: int) -> bool:
+    return tokens.prompt_tokens <= max_context_length
 
-def generate_text(input_tokens: int, max_tokens: int | None = None) -> str:
+
+def get_default_completion_tokens(prompt_tokens: int) -> int:
+    """
+    Number of tokens generated before the end of sequence token, random between 100 and 1000 with a boost for long prompts.
     """
-    Generate text based on the input tokens and the max tokens.
+    prompt_boost = min(1.5, 1 + prompt_tokens / 2000)  # +50% max
 
-    Args:
-        input_tokens (int): Number of tokens in the input prompt.
-        max_tokens (int | None): Number of tokens to be generated. Default is random between 100 and 1000.
+    return min(2000, int(random.randint(100, 1000) * prompt_boost))
 
-    Returns:
-        str: Generated text.
+
+@dataclass
+class GeneratedChoice:
+    """
+    Completion of a choice: consecutive tokens of the corpus, cut by the stopping criteria of the request.
     """
 
-    max_tokens = max_tokens if max_tokens is not None else random.randint(100, 1000)
+    start: int  # position of the first token in the corpus
+    num_tokens: int
+    chunks: list[str]
+    finish_reason: str = "stop"
+    stop_reason: str | int | None = None
 
-    # Number of tokens generated ≈ proportional to max_tokens
-    # + small boost if prompt long
-    prompt_boost = min(1.5, 1 + input_tokens / 2000)  # +50% max
-    target_chars = int(max_tokens * 4 * prompt_boost)
-    target_chars = min(target_chars, 8000)
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
 
-    # Number of paragraphs based mostly on the generated length
-    num_paragraphs = max(1, target_chars // 800)
+    @property
+    def token_ids(self) -> np.ndarray:
+        return get_corpus().window_token_ids(start=self.start, stop=self.start + self.num_tokens)
 
-    response_parts = []
-    current_length = 0
 
-    while current_length < target_chars and len(response_parts) < num_paragraphs:
-        text = fake.paragraph(nb_sentences=random.randint(2, 6))
-        response_parts.append(text)
-        current_length += len(text)
+def truncate_chunks(chunks: list[str], length: int) -> list[str]:
+    """
+    Truncate the text of the chunks to `length` characters, the chunks past the end are kept empty.
+    """
+    truncated = []
+    for chunk in chunks:
+        truncated.append(chunk[: max(0, length)])
+        length -= len(chunk)
+
+    return truncated
 
-    text = "\n\n".join(response_parts)
 
-    # Enforce hard cap when max_tokens is provided to satisfy tests and callers.
-    if max_tokens is not None:
-        text = _clamp_to_max_tokens(text, max_tokens)
+def generate_choices(
+    tokens: RequestTokens,
+    max_tokens: int | None = None,
+    n: int = 1,
+    chunk_tokens: int | None = None,
+    stopping: StoppingCriteria | None = None,
+) -> list[GeneratedChoice]:
+    """
+    Generate `n` choices at once, each sliced from the corpus at a random paragraph.
 
-    return text
+    A choice is `max_tokens` tokens long (finish reason "length"), or ends with an end of sequence token
+    after a random number of tokens without `max_tokens` (finish reason "stop"), unless a stop token or
+    stop string of the stopping criteria is generated first.
 
+    Args:
+        tokens (RequestTokens): Token accounting of the request, its number of completion tokens is set for all the choices.
+        max_tokens (int | None): Maximum number of tokens to be generated per choice.
+        n (int): Number of choices.
+        chunk_tokens (int | None): Number of tokens per chunk of the text of the choices, a single chunk if None.
+        stopping (StoppingCriteria | None): Stopping criteria of the request.
 
-def get_realistic_ttft(input_tokens: int, inflight_requests: int = 1) -> float:
+    Returns:
+        list[GeneratedChoice]: Generated choices.
+    """
+    stopping = stopping or StoppingCriteria()
+    corpus = get_corpus()
+    choices = []
+    for start in corpus.sample_starts(num_sequences=n):
+        if max_tokens is not None:
+            num_tokens, finish_reason = max_tokens, "length"
+        elif stopping.ignore_eos and stopping.max_model_tokens is not None:
+            num_tokens, finish_reason = min(stopping.max_model_tokens, MAX_IGNORE_EOS_TOKENS), "length"
+        else:
+            num_tokens, finish_reason = max(stopping.min_tokens, get_default_completion_tokens(prompt_tokens=tokens.prompt_tokens)), "stop"
+            if stopping.max_model_tokens is not None and num_tokens >= stopping.max_model_tokens:
+                num_tokens, finish_reason = stopping.max_model_tokens, "length"
+
+        num_tokens, text_length, stop_reason = stopping.apply(corpus=corpus, start=start, num_tokens=num_tokens)
+        if stop_reason is not None:
+            finish_reason = "stop"
+        if chunk_tokens is None:
+            chunks = [corpus.slice(start=start, stop=start + num_tokens)]
+        else:
+            chunks = corpus.chunks(start=start, stop=start + num_tokens, chunk_tokens=chunk_tokens)
+        if text_length is not None:
+            chunks = truncate_chunks(chunks=chunks, length=text_length)
+        choices.append(GeneratedChoice(start=start, num_tokens=num_tokens, chunks=chunks, finish_reason=finish_reason, stop_reason=stop_reason))
+
+    tokens.completion_tokens = sum(choice.num_tokens for choice in choices)
+
+    return choices
+
+
+def get_realistic_ttft(input_tokens: int, inflight_requests: int = 1, cached_tokens: int = 0) -> float:
     """
     Compute a realistic Time To First Token (TTFT) using a normal distribution.
 
@@ -97,14 +208,21 @@ def get_realistic_ttft(input_tokens: int, inflight_requests: int = 1) -> float:
     - The variance is approximately 30% of this base TTFT.
     - Prompt size slightly increases TTFT (context preparation).
     - Concurrent requests increase TTFT in a quasi-linear fashion.
+    - Prompt tokens found in the prefix cache are not prefilled: the prompt part of the TTFT is
+      reduced to its uncached share, down to the time of a single forward pass.
 
     Args:
         input_tokens (int): Number of tokens in the prompt.
         inflight_requests (int): Number of concurrent requests (>= 1).
+        cached_tokens (int): Number of tokens of the prompt found in the prefix cache.
 
     Returns:
         float: Realistic TTFT in seconds (>= 1 ms).
     """
+    # Measured distributions of the latency profile, if loaded
+    profile = get_latency_profile()
+    if profile is not None:
+        return profile.sample_ttft(input_tokens=input_tokens - cached_tokens, inflight_requests=inflight_requests)
 
     # 1) Base TTFT (for a "reference" size prompt and 1 request)
     # Ex: settings.reference_ttft_mean = 0.6  # 600 ms
@@ -116,7 +234,7 @@ def get_realistic_ttft(input_tokens: int, inflight_requests: int = 1) -> float:
     # 2) Input size effect
     # We assume that beyond a certain threshold, context preparation
     # costs a bit more (but in a sub-linear manner).
-    reference_prompt_tokens = getattr(settings, "reference_prompt_tokens", 500)
+    reference_prompt_tokens = settings.reference_prompt_tokens
 
     # Overhead factor: for each "block" of prompt_reference, we add ~10% TTFT
     # clamped to avoid becoming absurd on gigantic prompts
@@ -125,6 +243,12 @@ def get_realistic_ttft(input_tokens: int, inflight_requests: int = 1) -> float:
     size_adjusted_mean = base_ttft_mean * size_factor
     size_adjusted_std = base_ttft_std * size_factor  # variance also increases slightly
 
+    # Prefix cache effect: only the uncached tokens are prefilled, a forward pass is still needed
+    if cached_tokens > 0:
+        cache_factor = max(1.0 - cached_tokens / input_tokens, 1.0 / (settings.reference_tps * base_ttft_mean))
+        size_adjusted_mean *= cache_factor
+        size_adjusted_std *= cache_factor
+
     # 3) Concurrent requests effect (queue):
     # Each additional request increases TTFT by approximately 15–25% of base TTFT.
     # We use 20% here.
@@ -147,22 +271,28 @@ def get_realistic_ttft(input_tokens: int, inflight_requests: int = 1) -> float:
     return max(0.001, ttft)  # min 1 ms to avoid 0
 
 
-def get_realistic_itl(output_tokens: int, inflight_requests: int = 1) -> float:
+def get_realistic_itl(output_tokens: int, inflight_requests: int = 1, input_tokens: int = 0) -> float:
     """
     Compute realistic Inter-Token Latency (ITL) using normal distribution.
 
     Based on benchmarks from major LLM providers (OpenAI GPT-4, Anthropic Claude, Meta LLaMA).
-    The parameters are derived from reference_output_tokens_per_second.
+    The parameters are derived from reference_tps. The returned latency covers the generation
+    of `output_tokens` tokens, use `output_tokens=1` for the delay between two streamed tokens.
 
     Args:
         output_tokens (int): Number of tokens to be generated.
         inflight_requests (int): Number of concurrent requests.
+        input_tokens (int): Number of tokens in the prompt, only used by latency profiles.
 
     Returns:
         Realistic Inter-Token Latency (nTL) in seconds.
     """
+    # Measured distributions of the latency profile, if loaded
+    profile = get_latency_profile()
+    if profile is not None:
+        return profile.sample_itl(output_tokens=output_tokens, inflight_requests=inflight_requests, input_tokens=input_tokens)
     # Reference throughput for generation
-    reference_throughput = settings.reference_output_tokens_per_second
+    reference_throughput = settings.reference_tps
 
     # Average time per token
     time_per_token_mean = 1.0 / reference_throughput
@@ -188,35 +318,115 @@ def get_realistic_itl(output_tokens: int, inflight_requests: int = 1) -> float:
     return max(0.001, itl)
 
 
-async def generate_unstreamed_chat_content(prompt: str, max_tokens: int | None = None) -> str:
-    input_tokens = count_tokens(prompt)
-    text = generate_text(input_tokens=input_tokens, max_tokens=max_tokens)
+def get_realistic_embedding_latency(input_tokens: int, inflight_requests: int = 1) -> float:
+    """
+    Compute a realistic latency of an embedding or rerank forward pass.
+
+    The cost model is a fixed overhead per request (settings.embedding_request_overhead) plus
+    a prefill cost per token (1 / settings.reference_embedding_tps), stretched by the contention
+    of the requests running concurrently on the same model (settings.embedding_contention per
+    additional request).
+
+    Args:
+        input_tokens (int): Number of tokens of all the inputs of the request.
+        inflight_requests (int): Number of concurrent requests (>= 1).
+
+    Returns:
+        float: Realistic latency in seconds (>= 1 ms), within 30% of the mean of the cost model.
+    """
+    mean = settings.embedding_request_overhead + input_tokens / settings.reference_embedding_tps
+    mean *= 1.0 + settings.embedding_contention * max(0, inflight_requests - 1)
 
+    # Gaussian sampling (~10% variance), truncated at 3 standard deviations
+    latency = min(max(random.gauss(mean, mean * 0.10), mean * 0.7), mean * 1.3)
+    return max(0.001, latency)
+
+
+def get_inflight_requests(inflight: InflightTracker | None) -> int:
+    return max(1, inflight.inflight_requests) if inflight is not None else 1
+
+
+async def simulate_embedding_latency(input_tokens: int, inflight: InflightTracker | None = None) -> None:
     if settings.simulate_latency:
-        ttft = get_realistic_ttft(input_tokens=input_tokens, inflight_requests=1)
+        latency = get_realistic_embedding_latency(input_tokens=input_tokens, inflight_requests=get_inflight_requests(inflight=inflight))
+        await asyncio.sleep(latency)
+
+
+async def generate_unstreamed_chat_content(tokens: RequestTokens, max_tokens: int | None = None, inflight: InflightTracker | None = None) -> str:
+    choices = await generate_unstreamed_chat_choices(tokens=tokens, max_tokens=max_tokens, inflight=inflight)
+
+    return choices[0].text
+
+
+async def generate_unstreamed_chat_choices(
+    tokens: RequestTokens,
+    max_tokens: int | None = None,
+    n: int = 1,
+    inflight: InflightTracker | None = None,
+    stopping: StoppingCriteria | None = None,
+) -> list[GeneratedChoice]:
+    """
+    Generate `n` choices for the same prompt: the prompt is prefilled once, then the choices are decoded
+    together, like `n` more requests in flight, until the longest one ends.
+    """
+    choices = generate_choices(tokens=tokens, max_tokens=max_tokens, n=n, stopping=stopping)
+
+    if settings.simulate_latency:
+        ttft = get_realistic_ttft(
+            input_tokens=tokens.prompt_tokens, inflight_requests=get_inflight_requests(inflight=inflight), cached_tokens=tokens.cached_tokens
+        )
         await asyncio.sleep(ttft)
-        completion_tokens = count_tokens(text)
-        itl = get_realistic_itl(output_tokens=completion_tokens, inflight_requests=1)
-        await asyncio.sleep(itl * completion_tokens)
+    tokens.first_token_time = time.perf_counter()
 
-    return text
+    if settings.simulate_latency:
+        itl = get_realistic_itl(
+            output_tokens=max(choice.num_tokens for choice in choices),
+            inflight_requests=get_inflight_requests(inflight=inflight) + n - 1,
+            input_tokens=tokens.prompt_tokens,
+        )
+        await asyncio.sleep(itl)
 
+    return choices
 
-async def generate_stream_chat_content(prompt: str, max_tokens: int | None = None) -> AsyncGenerator[str, None]:
-    input_tokens = count_tokens(prompt)
-    text = generate_text(input_tokens=input_tokens, max_tokens=max_tokens)
 
-    chunks = text.split(" ")
-    itl = 0.0  # Default ITL when latency simulation is disabled
+async def generate_stream_chat_content(
+    tokens: RequestTokens, max_tokens: int | None = None, inflight: InflightTracker | None = None
+) -> AsyncGenerator[str, None]:
+    """
+    Yield the completion in chunks of `settings.stream_chunk_tokens` tokens.
+    """
+    choices = generate_choices(tokens=tokens, max_tokens=max_tokens, chunk_tokens=settings.stream_chunk_tokens)
+    async for _, _, chunk in generate_stream_chat_choices(tokens=tokens, choices=choices, inflight=inflight):
+        yield chunk
+
+
+async def generate_stream_chat_choices(
+    tokens: RequestTokens, choices: list[GeneratedChoice], inflight: InflightTracker | None = None
+) -> AsyncGenerator[tuple[int, int, str], None]:
+    """
+    Yield the `(index, num_tokens, chunk)` of the chunks of the choices, generated by chunks of `settings.stream_chunk_tokens`
+    tokens, interleaved: each decode step yields a chunk of every unfinished choice. The prompt is prefilled once,
+    then the choices are decoded together, like more requests in flight.
+    """
+    chunk_tokens = settings.stream_chunk_tokens
+    n = len(choices)
+
     if settings.simulate_latency:
-        ttft = get_realistic_ttft(input_tokens=input_tokens, inflight_requests=1)
+        ttft = get_realistic_ttft(
+            input_tokens=tokens.prompt_tokens, inflight_requests=get_inflight_requests(inflight=inflight), cached_tokens=tokens.cached_tokens
+        )
         await asyncio.sleep(ttft)
-        completion_tokens = count_tokens(text)
-        itl = get_realistic_itl(output_tokens=completion_tokens, inflight_requests=1)
 
-    for chunk in chunks:
+    for position, step in zip(itertools.count(step=chunk_tokens), itertools.zip_longest(*(choice.chunks for choice in choices))):
         if settings.simulate_latency:
+            # sampled for each chunk so that the stream slows down when the load rises
+            itl = get_realistic_itl(
+                output_tokens=chunk_tokens, inflight_requests=get_inflight_requests(inflight=inflight) + n - 1, input_tokens=tokens.prompt_tokens
+            )
             await asyncio.sleep(itl)
-        yield f"{chunk}\n\n"
-
-    yield "[DONE]\n\n"
+        if tokens.first_token_time is None:
+            tokens.first_token_time = time.perf_counter()
+        for index, chunk in enumerate(step):
+            if chunk is not None:
+                # the last chunk of a choice may be shorter
+                yield index, min(chunk_tokens, choices[index].num_tokens - position), chunk
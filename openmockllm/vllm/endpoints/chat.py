@@ -5,10 +5,23 @@ from fastapi.responses import StreamingResponse
 
 from openmockllm.logger import init_logger
 from openmockllm.security import check_api_key
-from openmockllm.utils import count_tokens, generate_unstreamed_chat_content
+from openmockllm.utils import RequestTokens, generate_choices, generate_unstreamed_chat_choices
 from openmockllm.vllm.schemas import ChatCompletionRequest
-from openmockllm.vllm.schemas.chat import ChatResponse, ChatResponseChoice, Message, Usage
-from openmockllm.vllm.utils.chat import check_max_context_length, extract_prompt, generate_stream
+from openmockllm.vllm.schemas.chat import ChatResponse, ChatResponseChoice, Message
+from openmockllm.vllm.utils.chat import (
+    check_logprobs,
+    check_max_context_length,
+    check_num_choices,
+    check_priority,
+    extract_prompt,
+    generate_stream,
+    get_choice_logprobs,
+    get_prompt_logprobs,
+    get_stopping_criteria,
+    get_usage,
+    match_prefix_cache,
+    sample_choice_logprobs,
+)
 
 logger = init_logger(__name__)
 router = APIRouter(prefix="/v1", tags=["chat"])
@@ -18,15 +31,49 @@ router = APIRouter(prefix="/v1", tags=["chat"])
 async def chat_completions(request: Request, body: ChatCompletionRequest):
     # get content from messages
     prompt = "\n\n".join([extract_prompt(content=msg.content) for msg in body.messages])
+    tokens = RequestTokens(prompt=prompt)
 
     # check max context length
-    check_max_context_length(prompt=prompt, max_context_length=request.app.state.max_context)
+    check_max_context_length(tokens=tokens, max_context_length=request.app.state.max_context)
+    priority = check_priority(request=request, priority=body.priority)
+    n, best_of = check_num_choices(body=body)
+    stopping = get_stopping_criteria(request=request, body=body, tokens=tokens)
+    check_logprobs(body=body)
+
+    # look up the prompt in the prefix cache
+    match_prefix_cache(request=request, body=body, tokens=tokens)
 
     if not body.stream:
         # generate response content
-        content = await generate_unstreamed_chat_content(prompt=prompt, max_tokens=body.max_tokens)
-        input_tokens = count_tokens(prompt)
-        completion_tokens = count_tokens(content)
+        scheduler, admission = request.app.state.scheduler, request.app.state.admission
+        inflight = request.app.state.inflight
+        if scheduler is not None:
+            choices = generate_choices(tokens=tokens, max_tokens=body.max_tokens, n=best_of, chunk_tokens=1, stopping=stopping)
+            choices = await scheduler.complete(tokens=tokens, choices=choices, priority=priority)
+        elif admission is not None:
+            async with admission.admit(priority=priority):
+                choices = await generate_unstreamed_chat_choices(
+                    tokens=tokens, max_tokens=body.max_tokens, n=best_of, inflight=inflight, stopping=stopping
+                )
+        else:
+            choices = await generate_unstreamed_chat_choices(
+                tokens=tokens, max_tokens=body.max_tokens, n=best_of, inflight=inflight, stopping=stopping
+            )
+        if best_of > n:
+            # the mock has no scores to rank the sequences, the first n are returned and counted in the usage
+            choices = choices[:n]
+            tokens.completion_tokens = sum(choice.num_tokens for choice in choices)
+        request.app.state.inflight.add_tokens(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens)
+        request.app.state.metrics.observe_request(
+            arrival_time=getattr(request.state, "arrival_time", None),
+            prompt_tokens=tokens.prompt_tokens,
+            completion_tokens=tokens.completion_tokens,
+            first_token_time=tokens.first_token_time,
+            finished_reason=choices[0].finish_reason,
+        )
+
+        # logprobs of the returned choices
+        choice_logprobs = sample_choice_logprobs(body=body, choices=choices)
 
         # create response
         response = ChatResponse(
@@ -34,10 +81,22 @@ async def chat_completions(request: Request, body: ChatCompletionRequest):
             object="chat.completion",
             created=int(time.time()),
             model=body.model,
-            choices=[ChatResponseChoice(index=0, message=Message(role="assistant", content=content), finish_reason="stop")],
-            usage=Usage(prompt_tokens=input_tokens, completion_tokens=completion_tokens, total_tokens=input_tokens + completion_tokens),
+            choices=[
+                ChatResponseChoice(
+                    index=index,
+                    message=Message(role="assistant", content=choice.text),
+                    finish_reason=choice.finish_reason,
+                    logprobs=get_choice_logprobs(logprobs=logprobs),
+                    stop_reason=choice.stop_reason,
+                )
+                for index, (choice, logprobs) in enumerate(zip(choices, choice_logprobs, strict=True))
+            ],
+            usage=get_usage(request=request, tokens=tokens),
+            prompt_logprobs=get_prompt_logprobs(body=body, tokens=tokens),
         )
         return response
 
     else:
-        return StreamingResponse(content=generate_stream(request=request, body=body), media_type="text/event-stream")
+        return StreamingResponse(
+            content=generate_stream(request=request, body=body, tokens=tokens, stopping=stopping, n=n), media_type="text/event-stream"
+        )
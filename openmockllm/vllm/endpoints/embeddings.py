@@ -1,22 +1,17 @@
 from fastapi import APIRouter, Depends, Request
 
+from openmockllm.embeddings import EmbeddingsResponse, encode_embeddings
 from openmockllm.logger import init_logger
 from openmockllm.security import check_api_key
-from openmockllm.utils import count_tokens
+from openmockllm.utils import encode_texts, simulate_embedding_latency
 from openmockllm.vllm.exceptions import NotFoundError
-from openmockllm.vllm.schemas.embeddings import (
-    EmbeddingData,
-    EmbeddingRequest,
-    EmbeddingResponse,
-    EmbeddingUsage,
-)
-from openmockllm.vllm.utils.embeddings import generate_mock_embedding
+from openmockllm.vllm.schemas.embeddings import EmbeddingRequest, EmbeddingResponse, EmbeddingUsage
 
 logger = init_logger(__name__)
 router = APIRouter(prefix="/v1", tags=["embeddings"])
 
 
-@router.post("/embeddings", dependencies=[Depends(check_api_key)])
+@router.post("/embeddings", dependencies=[Depends(check_api_key)], response_model=EmbeddingResponse, response_class=EmbeddingsResponse)
 async def create_embeddings(request: Request, body: EmbeddingRequest):
     """Create embeddings for the input"""
     # Use the model from the request or fall back to the default
@@ -26,8 +21,8 @@ async def create_embeddings(request: Request, body: EmbeddingRequest):
     if body.model and body.model != request.app.state.model_name:
         raise NotFoundError(f"The model `{body.model}` does not exist.")
 
-    # Handle both single string and list of strings
-    if isinstance(body.input, str):
+    # Handle single string, list of strings, token IDs and list of token IDs
+    if isinstance(body.input, str) or (body.input and isinstance(body.input[0], int)):
         inputs = [body.input]
     else:
         inputs = body.input
@@ -38,23 +33,23 @@ async def create_embeddings(request: Request, body: EmbeddingRequest):
     # Use encoding format from request
     encoding_format = body.encoding_format or "float"
 
-    # Calculate token usage
-    total_tokens = sum(count_tokens(text) for text in inputs)
-
-    # Generate mock embeddings
-    embeddings_data = [
-        EmbeddingData(
-            object="embedding",
-            index=i,
-            embedding=generate_mock_embedding(dimension=dimensions, encoding_format=encoding_format),
-        )
-        for i in range(len(inputs))
-    ]
-
-    response = EmbeddingResponse(
-        object="list",
-        data=embeddings_data,
-        model=model,
-        usage=EmbeddingUsage(prompt_tokens=total_tokens, total_tokens=total_tokens),
+    # Encode the texts once, for the token usage and the embedder
+    token_ids = encode_texts(inputs=inputs)
+    total_tokens = sum(map(len, token_ids))
+
+    await simulate_embedding_latency(input_tokens=total_tokens, inflight=request.app.state.inflight)
+    request.app.state.inflight.add_tokens(prompt_tokens=total_tokens)
+    request.app.state.metrics.observe_request(arrival_time=getattr(request.state, "arrival_time", None), prompt_tokens=total_tokens)
+
+    # Embed the whole batch at once, rows are serialized without going through Python floats
+    embeddings = request.app.state.embedder.embed(model=model, inputs=token_ids, dimension=dimensions)
+    embeddings = encode_embeddings(embeddings=embeddings, encoding_format=encoding_format)
+
+    return EmbeddingsResponse(
+        content={
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": embedding} for i, embedding in enumerate(embeddings)],
+            "model": model,
+            "usage": EmbeddingUsage(prompt_tokens=total_tokens, total_tokens=total_tokens).model_dump(),
+        }
     )
-    return response
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus metrics of vLLM, measured on the requests of the mock"""
+    return request.app.state.metrics.registry.response()
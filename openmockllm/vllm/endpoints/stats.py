@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/stats")
+async def stats(request: Request):
+    """Requests in flight, used by the latency model, state of the scheduling of the requests and of the prefix and embedding caches"""
+    stats = request.app.state.inflight.stats()
+    stats["embeddings"] = request.app.state.embedder.stats()
+    if request.app.state.scheduler is not None:
+        stats["scheduler"] = request.app.state.scheduler.stats()
+    if request.app.state.admission is not None:
+        stats["admission"] = request.app.state.admission.stats()
+    if request.app.state.prefix_cache is not None:
+        stats["prefix_cache"] = request.app.state.prefix_cache.stats()
+
+    return stats
@@ -108,6 +108,7 @@ class ChatResponse(VllmBaseModel):
     usage: Usage | None = None
     system_fingerprint: str | None = None
     service_tier: str | None = None
+    prompt_logprobs: list[dict[str, Any] | None] | None = None  # vLLM specific
 
 
 class StreamDelta(VllmBaseModel):
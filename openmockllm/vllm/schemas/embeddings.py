@@ -1,6 +1,16 @@
+from typing import Literal
+
 from openmockllm.vllm.schemas.core import VllmBaseModel
 
 
+class EmbeddingRequest(VllmBaseModel):
+    model: str | None = None
+    input: str | list[str] | list[int] | list[list[int]]
+    encoding_format: Literal["float", "base64"] = "float"
+    dimensions: int | None = None
+    user: str | None = None
+
+
 class EmbeddingData(VllmBaseModel):
     object: str = "embedding"
     index: int
@@ -0,0 +1,64 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+
+
+class AdmissionQueue:
+    """
+    Admission queue of the chat requests when the continuous batching scheduler is disabled.
+
+    At most `max_running` requests are generated at once, the others wait in a heap ordered by
+    arrival (`fcfs` policy) or by priority then arrival (`priority` policy, lower values first, like
+    vLLM). When a request finishes, its slot is handed over to the first waiting request. The time
+    spent in the queue is part of the TTFT of the request.
+    """
+
+    def __init__(self, max_running: int, policy: str = "fcfs"):
+        self.max_running = max_running
+        self.policy = policy
+        self.running = 0
+        self.waiting: list[tuple[int, int, asyncio.Future[None]]] = []  # heap of (priority, arrival, future)
+        self._arrivals = itertools.count()
+
+    def stats(self) -> dict:
+        return {"running": self.running, "waiting": len(self.waiting), "max_running": self.max_running, "policy": self.policy}
+
+    @asynccontextmanager
+    async def admit(self, priority: int = 0) -> AsyncIterator[None]:
+        """
+        Wait for a slot, held until the end of the context.
+
+        Args:
+            priority (int): Priority of the request, only used by the `priority` policy.
+        """
+        if self.running < self.max_running and not self.waiting:
+            self.running += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiting, (priority if self.policy == "priority" else 0, next(self._arrivals), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # client disconnected while waiting, unless the slot was handed over meanwhile
+                if future.cancelled():
+                    self.waiting = [item for item in self.waiting if item[2] is not future]
+                    heapq.heapify(self.waiting)
+                else:
+                    self._release()
+                raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        while self.waiting:
+            _, _, future = heapq.heappop(self.waiting)
+            if not future.done():
+                # the slot goes to the first waiting request, the number of running requests is unchanged
+                future.set_result(None)
+                return
+        self.running -= 1
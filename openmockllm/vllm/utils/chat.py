@@ -1,19 +1,29 @@
-from faker import Faker
+from collections.abc import AsyncGenerator
+
 from fastapi import Request
-import tiktoken
+import numpy as np
 
+from openmockllm.logprobs import TokenLogprobs, decode_token, sample_logprobs
 from openmockllm.settings import settings
-from openmockllm.utils import generate_stream_chat_content
+from openmockllm.sse import CONTENT_PLACEHOLDER, INDEX_PLACEHOLDER, SSETemplate
+from openmockllm.stopping import StoppingCriteria
+from openmockllm.utils import GeneratedChoice, RequestTokens, generate_choices, generate_stream_chat_choices, get_corpus
+from openmockllm.utils import check_max_context_length as _check_max_context_length
+from openmockllm.vllm.exceptions import BadRequestError
 from openmockllm.vllm.schemas import ChatCompletionRequest
 from openmockllm.vllm.schemas.chat import (
     ChatStreamResponse,
     ChatStreamResponseChoice,
+    ChoiceLogprobs,
+    LogprobContent,
+    PromptTokensDetails,
     StreamDelta,
+    Usage,
 )
+from openmockllm.vllm.utils.admission import AdmissionQueue
 
-tokenizer = tiktoken.get_encoding(settings.tiktoken_encoder)
-fake = Faker(settings.faker_langage)
-fake.seed_instance(settings.faker_seed)
+# default --max-logprobs of vLLM
+MAX_LOGPROBS = 20
 
 
 def extract_prompt(content: str | list | None) -> str:
@@ -38,43 +48,243 @@ def extract_prompt(content: str | list | None) -> str:
     return prompt
 
 
-def count_tokens(text: str) -> int:
-    return len(tokenizer.encode(text))
+def check_max_context_length(tokens: RequestTokens, max_context_length: int):
+    if not _check_max_context_length(tokens=tokens, max_context_length=max_context_length):
+        raise BadRequestError(
+            message=(
+                f"This model's maximum context length is {max_context_length} tokens. However, your request has {tokens.prompt_tokens} input "
+                "tokens. Please reduce the length of the input messages."
+            ),
+            param="messages",
+        )
+
+
+def check_priority(request: Request, priority: int | None) -> int:
+    """Priority of the request, only allowed by the `priority` scheduling policy like vLLM"""
+    priority = priority or 0
+    if priority != 0 and request.app.state.scheduling_policy != "priority":
+        raise BadRequestError(message=f"Got priority {priority} but Priority scheduling is not enabled.", param="priority")
+
+    return priority
+
+
+def check_num_choices(body: ChatCompletionRequest) -> tuple[int, int]:
+    """
+    Number of choices returned (`n`) and of sequences generated (`best_of`, an extra parameter of vLLM) for the request.
+
+    Returns:
+        tuple[int, int]: n and best_of.
+    """
+    n = 1 if body.n is None else body.n
+    best_of = (body.model_extra or {}).get("best_of") or n
+    if n < 1:
+        raise BadRequestError(message=f"n must be at least 1, got {n}.", param="n")
+    if not isinstance(best_of, int) or best_of < n:
+        raise BadRequestError(message=f"best_of must be greater than or equal to n, got n={n} and best_of={best_of}.", param="best_of")
+    if body.stream and best_of > n:
+        raise BadRequestError(message="best_of > n is not supported with streaming.", param="best_of")
+
+    return n, best_of
+
+
+def get_stopping_criteria(request: Request, body: ChatCompletionRequest, tokens: RequestTokens) -> StoppingCriteria:
+    """Stopping criteria of the request, the generation is bounded by the room left in the context of the model"""
+    min_tokens = body.min_tokens or 0
+    if min_tokens < 0:
+        raise BadRequestError(message=f"min_tokens must be greater than or equal to 0, got {min_tokens}.", param="min_tokens")
+    if body.max_tokens is not None and min_tokens > body.max_tokens:
+        raise BadRequestError(message=f"min_tokens must be less than or equal to max_tokens={body.max_tokens}, got {min_tokens}.", param="min_tokens")
 
+    stop = (body.stop,) if isinstance(body.stop, str) else tuple(body.stop or ())
 
-def check_max_context_length(prompt: str, max_context_length: int) -> int:
-    return len(tokenizer.encode(prompt)) <= max_context_length
+    return StoppingCriteria(
+        stop=tuple(string for string in stop if string),
+        stop_token_ids=frozenset(body.stop_token_ids or ()),
+        min_tokens=min_tokens,
+        ignore_eos=body.ignore_eos,
+        include_stop_str_in_output=body.include_stop_str_in_output,
+        max_model_tokens=max(0, request.app.state.max_context - tokens.prompt_tokens),
+    )
 
 
-async def generate_stream(request: Request, body: ChatCompletionRequest):
-    """Generate streaming response chunks in SSE format"""
+def check_logprobs(body: ChatCompletionRequest) -> None:
+    """Reject the logprobs parameters that vLLM rejects"""
+    top_logprobs = body.top_logprobs or 0
+    if top_logprobs < 0:
+        raise BadRequestError(message="`top_logprobs` must be a positive value.", param="top_logprobs")
+    if top_logprobs > 0 and not body.logprobs:
+        raise BadRequestError(message="when using `top_logprobs`, `logprobs` must be set to true.", param="top_logprobs")
+    if top_logprobs > MAX_LOGPROBS:
+        raise BadRequestError(
+            message=f"Requested sample logprobs of {top_logprobs}, which is greater than max allowed: {MAX_LOGPROBS}", param="top_logprobs"
+        )
+    if body.prompt_logprobs is not None:
+        if body.stream:
+            raise BadRequestError(message="`prompt_logprobs` are not available when stream is enabled.", param="prompt_logprobs")
+        if not 0 <= body.prompt_logprobs <= MAX_LOGPROBS:
+            raise BadRequestError(
+                message=f"Requested prompt logprobs of {body.prompt_logprobs}, which must be between 0 and {MAX_LOGPROBS}", param="prompt_logprobs"
+            )
+
+
+def sample_choice_logprobs(body: ChatCompletionRequest, choices: list[GeneratedChoice]) -> list[TokenLogprobs | None]:
+    """Logprobs of the generated tokens of each choice, None for all the choices if not requested"""
+    if not body.logprobs:
+        return [None] * len(choices)
 
-    prompt = "\n\n".join([extract_prompt(content=msg.content) for msg in body.messages])
-    i = 0
+    vocabulary = get_corpus().vocabulary
+    return [sample_logprobs(token_ids=choice.token_ids, vocabulary=vocabulary, num_top=body.top_logprobs or 0) for choice in choices]
 
-    async for chunk_text in generate_stream_chat_content(prompt=prompt, max_tokens=body.max_tokens):
-        # Check if this is the final "[DONE]" chunk
-        # The generator sends "[DONE]\n\n" as the final chunk
-        if "[DONE]" in chunk_text:
-            # Send final chunk with finish_reason
+
+def get_choice_logprobs(logprobs: TokenLogprobs | None, start: int = 0, stop: int | None = None) -> ChoiceLogprobs | None:
+    """
+    Logprobs of the tokens from `start` to `stop` of a choice in the OpenAI format, built without validation
+    since a completion has as many entries as tokens.
+    """
+    if logprobs is None:
+        return None
+
+    content = []
+    rows = (logprobs.token_ids[start:stop], logprobs.logprobs[start:stop], logprobs.top_token_ids[start:stop], logprobs.top_logprobs[start:stop])
+    for token_id, logprob, top_token_ids, top_logprobs in zip(*(row.tolist() for row in rows), strict=True):
+        top = []
+        for top_token_id, top_logprob in zip(top_token_ids, top_logprobs, strict=True):
+            top_token, top_bytes = decode_token(token_id=top_token_id)
+            top.append({"token": top_token, "logprob": top_logprob, "bytes": top_bytes})
+        token, token_bytes = decode_token(token_id=token_id)
+        content.append(LogprobContent.model_construct(token=token, logprob=logprob, bytes=token_bytes, top_logprobs=top))
+
+    return ChoiceLogprobs.model_construct(content=content, refusal=None)
+
+
+def get_prompt_logprobs(body: ChatCompletionRequest, tokens: RequestTokens) -> list[dict | None] | None:
+    """
+    Prompt logprobs in the vLLM format: for each prompt token but the first, the logprob, rank and text of the
+    token and of the `prompt_logprobs` most likely candidates, by token ID.
+    """
+    if body.prompt_logprobs is None:
+        return None
+
+    logprobs = sample_logprobs(token_ids=np.asarray(tokens.prompt_token_ids[1:]), vocabulary=get_corpus().vocabulary, num_top=body.prompt_logprobs)
+    prompt_logprobs: list[dict | None] = [None]
+    rows = (logprobs.token_ids, logprobs.logprobs, logprobs.ranks, logprobs.top_token_ids, logprobs.top_logprobs)
+    for token_id, logprob, rank, top_token_ids, top_logprobs in zip(*(row.tolist() for row in rows), strict=True):
+        position = {str(token_id): {"logprob": logprob, "rank": rank, "decoded_token": decode_token(token_id=token_id)[0]}}
+        for top_rank, (top_token_id, top_logprob) in enumerate(zip(top_token_ids, top_logprobs, strict=True), start=1):
+            if top_token_id != token_id:
+                position[str(top_token_id)] = {"logprob": top_logprob, "rank": top_rank, "decoded_token": decode_token(token_id=top_token_id)[0]}
+        prompt_logprobs.append(position)
+
+    return prompt_logprobs
+
+
+def match_prefix_cache(request: Request, body: ChatCompletionRequest, tokens: RequestTokens) -> None:
+    """Record on the token accounting the number of prompt tokens found in the prefix cache, if enabled"""
+    prefix_cache = request.app.state.prefix_cache
+    if prefix_cache is not None:
+        tokens.cached_tokens = prefix_cache.match(token_ids=tokens.prompt_token_ids, cache_salt=body.cache_salt)
+
+
+def get_usage(request: Request, tokens: RequestTokens) -> Usage:
+    """Usage block of the response, with the cached prompt tokens when the prefix cache is enabled"""
+    usage = Usage(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens, total_tokens=tokens.total_tokens)
+    if request.app.state.prefix_cache is not None:
+        usage.prompt_tokens_details = PromptTokensDetails(cached_tokens=tokens.cached_tokens)
+
+    return usage
+
+
+async def admit_stream(
+    admission: AdmissionQueue, priority: int, content: AsyncGenerator[tuple[int, int, str], None]
+) -> AsyncGenerator[tuple[int, int, str], None]:
+    """Generate the content once admitted, the slot is held until the end of the stream"""
+    async with admission.admit(priority=priority):
+        async for index, num_tokens, chunk in content:
+            yield index, num_tokens, chunk
+
+
+async def generate_stream(request: Request, body: ChatCompletionRequest, tokens: RequestTokens, stopping: StoppingCriteria, n: int = 1):
+    """Generate streaming response chunks in SSE format, the chunks of the `n` choices are interleaved"""
+
+    scheduler, admission = request.app.state.scheduler, request.app.state.admission
+    if scheduler is not None:
+        choices = generate_choices(tokens=tokens, max_tokens=body.max_tokens, n=n, chunk_tokens=1, stopping=stopping)
+        content = scheduler.generate(tokens=tokens, choices=choices, priority=body.priority or 0)
+    else:
+        choices = generate_choices(tokens=tokens, max_tokens=body.max_tokens, n=n, chunk_tokens=settings.stream_chunk_tokens, stopping=stopping)
+        content = generate_stream_chat_choices(tokens=tokens, choices=choices, inflight=request.app.state.inflight)
+        if admission is not None:
+            content = admit_stream(admission=admission, priority=body.priority or 0, content=content)
+
+    # Content chunks only differ by their index and content, their frame is serialized once
+    delta = StreamDelta(role=None, content=CONTENT_PLACEHOLDER)
+    template = SSETemplate(
+        chunk=ChatStreamResponse(
+            id="baf234d63e524e74b25c2d764b043bc2",
+            model=request.app.state.model_name,
+            created=0,
+            choices=[ChatStreamResponseChoice(index=INDEX_PLACEHOLDER, delta=delta, finish_reason=None)],
+        )
+    )
+    started = [False] * n
+    # logprobs of each choice, sliced by the tokens of each chunk
+    choice_logprobs = sample_choice_logprobs(body=body, choices=choices)
+    positions = [0] * n
+    # text left to send of each choice, the chunks of the tokens of an excluded stop string are empty
+    remaining = [len(choice.text) for choice in choices]
+
+    async for index, num_tokens, chunk_text in content:
+        start = positions[index]
+        positions[index] += num_tokens
+        remaining[index] -= len(chunk_text)
+        if not chunk_text and not remaining[index] and isinstance(choices[index].stop_reason, str):
+            continue
+        if not started[index] or body.logprobs:
+            # The first chunk of each choice carries the role
+            role = None if started[index] else "assistant"
+            logprobs = get_choice_logprobs(logprobs=choice_logprobs[index], start=start, stop=start + num_tokens)
             chunk = ChatStreamResponse(
                 id="baf234d63e524e74b25c2d764b043bc2",
                 model=request.app.state.model_name,
                 created=0,
-                choices=[ChatStreamResponseChoice(index=i, delta=StreamDelta(role=None, content=""), finish_reason="stop")],
+                choices=[
+                    ChatStreamResponseChoice(index=index, delta=StreamDelta(role=role, content=chunk_text), finish_reason=None, logprobs=logprobs)
+                ],
             )
             # Format as SSE: data: <json>\n\n
-            yield f"data: {chunk.model_dump_json()}\n\n"
-            break
+            yield f"data: {chunk.model_dump_json()}\n\n".encode()
+            started[index] = True
+        else:
+            yield template.render(index=index, content=chunk_text)
+    request.app.state.inflight.add_tokens(prompt_tokens=tokens.prompt_tokens, completion_tokens=tokens.completion_tokens)
+    request.app.state.metrics.observe_request(
+        arrival_time=getattr(request.state, "arrival_time", None),
+        prompt_tokens=tokens.prompt_tokens,
+        completion_tokens=tokens.completion_tokens,
+        first_token_time=tokens.first_token_time,
+        finished_reason=choices[0].finish_reason,
+    )
+
+    # Send final chunk with finish_reason for each choice
+    for index, choice in enumerate(choices):
+        delta = StreamDelta(role=None if started[index] else "assistant", content="")
+        chunk = ChatStreamResponse(
+            id="baf234d63e524e74b25c2d764b043bc2",
+            model=request.app.state.model_name,
+            created=0,
+            choices=[ChatStreamResponseChoice(index=index, delta=delta, finish_reason=choice.finish_reason, stop_reason=choice.stop_reason)],
+        )
+        yield f"data: {chunk.model_dump_json()}\n\n".encode()
 
-        # Regular content chunk
-        role = "assistant" if i == 0 else None
+    # Send usage in a last chunk without choices when requested
+    if body.stream_options is not None and body.stream_options.include_usage:
         chunk = ChatStreamResponse(
             id="baf234d63e524e74b25c2d764b043bc2",
             model=request.app.state.model_name,
             created=0,
-            choices=[ChatStreamResponseChoice(index=i, delta=StreamDelta(role=role, content=chunk_text), finish_reason=None)],
+            choices=[],
+            usage=get_usage(request=request, tokens=tokens),
         )
-        # Format as SSE: data: <json>\n\n
-        yield f"data: {chunk.model_dump_json()}\n\n"
-        i += 1
+        yield f"data: {chunk.model_dump_json()}\n\n".encode()
+
+    yield b"data: [DONE]\n\n"
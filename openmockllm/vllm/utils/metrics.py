@@ -0,0 +1,122 @@
+import time
+
+from openmockllm.inflight import InflightTracker
+from openmockllm.metrics import MetricsRegistry, build_1_2_5_buckets
+from openmockllm.vllm.utils.admission import AdmissionQueue
+from openmockllm.vllm.utils.prefix_cache import PrefixCache
+from openmockllm.vllm.utils.scheduler import BatchScheduler
+
+# buckets of the vLLM histograms
+TTFT_BUCKETS = (0.001, 0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 20.0, 40.0, 80.0, 160.0, 640.0, 2560.0)
+TPOT_BUCKETS = (0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 20.0, 40.0, 80.0)
+E2E_BUCKETS = (0.3, 0.5, 0.8, 1.0, 1.5, 2.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 40.0, 50.0, 60.0, 120.0, 240.0, 480.0, 960.0, 1920.0, 7680.0)
+
+
+class VLLMMetrics:
+    """
+    Prometheus metrics of vLLM, with the same names and buckets, measured on the requests of the mock.
+
+    The gauges are read from the requests in flight, or from the continuous batching scheduler or the
+    admission queue when enabled, when the metrics are scraped, like the counters of the prefix cache.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_model_len: int,
+        inflight: InflightTracker,
+        scheduler: BatchScheduler | None = None,
+        admission: AdmissionQueue | None = None,
+        prefix_cache: PrefixCache | None = None,
+    ):
+        self.inflight = inflight
+        self.scheduler = scheduler
+        self.admission = admission
+        self.prefix_cache = prefix_cache
+        self.registry = MetricsRegistry(labels={"model_name": model_name})
+        registry = self.registry
+
+        registry.gauge("vllm:num_requests_running", "Number of requests in model execution batches.", function=self._num_requests_running)
+        registry.gauge("vllm:num_requests_waiting", "Number of requests waiting to be processed.", function=self._num_requests_waiting)
+        registry.gauge("vllm:kv_cache_usage_perc", "KV-cache usage. 1 means 100 percent usage.", function=self._kv_cache_usage)
+        registry.gauge("vllm:gpu_cache_usage_perc", "GPU KV-cache usage. 1 means 100 percent usage.", function=self._kv_cache_usage)
+        registry.counter_function("vllm:num_preemptions_total", "Cumulative number of preemption from the engine.", function=self._num_preemptions)
+        registry.counter_function(
+            "vllm:prefix_cache_queries_total", "Number of prefix cache queries, in terms of tokens.", function=self._prefix_cache_queries
+        )
+        registry.counter_function(
+            "vllm:prefix_cache_hits_total", "Number of prefix cache hits, in terms of tokens.", function=self._prefix_cache_hits
+        )
+        self.prompt_tokens = registry.counter("vllm:prompt_tokens_total", "Number of prefill tokens processed.")
+        self.generation_tokens = registry.counter("vllm:generation_tokens_total", "Number of generation tokens processed.")
+        self.request_success = registry.counter("vllm:request_success_total", "Count of successfully processed requests.", label="finished_reason")
+        self.time_to_first_token = registry.histogram(
+            "vllm:time_to_first_token_seconds", "Histogram of time to first token in seconds.", TTFT_BUCKETS
+        )
+        self.time_per_output_token = registry.histogram(
+            "vllm:time_per_output_token_seconds", "Histogram of time per output token in seconds.", TPOT_BUCKETS
+        )
+        self.e2e_request_latency = registry.histogram("vllm:e2e_request_latency_seconds", "Histogram of e2e request latency in seconds.", E2E_BUCKETS)
+        token_buckets = build_1_2_5_buckets(max_value=max_model_len)
+        self.request_prompt_tokens = registry.histogram("vllm:request_prompt_tokens", "Number of prefill tokens processed.", token_buckets)
+        self.request_generation_tokens = registry.histogram("vllm:request_generation_tokens", "Number of generation tokens processed.", token_buckets)
+
+    def _num_requests_running(self) -> int:
+        if self.scheduler is not None:
+            return len(self.scheduler.running)
+        if self.admission is not None:
+            return self.admission.running
+        return self.inflight.inflight_requests
+
+    def _num_requests_waiting(self) -> int:
+        if self.scheduler is not None:
+            return len(self.scheduler.waiting)
+        if self.admission is not None:
+            return len(self.admission.waiting)
+        return 0
+
+    def _kv_cache_usage(self) -> float:
+        return self.scheduler.kv_used / self.scheduler.kv_cache_tokens if self.scheduler is not None else 0.0
+
+    def _num_preemptions(self) -> int:
+        return self.scheduler.num_preemptions if self.scheduler is not None else 0
+
+    def _prefix_cache_queries(self) -> int:
+        return self.prefix_cache.queries if self.prefix_cache is not None else 0
+
+    def _prefix_cache_hits(self) -> int:
+        return self.prefix_cache.hits if self.prefix_cache is not None else 0
+
+    def observe_request(
+        self,
+        arrival_time: float | None,
+        prompt_tokens: int,
+        completion_tokens: int = 0,
+        first_token_time: float | None = None,
+        finished_reason: str = "stop",
+    ) -> None:
+        """
+        Record a finished request.
+
+        Args:
+            arrival_time (float | None): `time.perf_counter()` when the request arrived.
+            prompt_tokens (int): Number of tokens of the prompt.
+            completion_tokens (int): Number of generated tokens, 0 for pooling requests.
+            first_token_time (float | None): `time.perf_counter()` when the first token was generated.
+            finished_reason (str): Why the generation stopped.
+        """
+        now = time.perf_counter()
+        self.prompt_tokens.inc(prompt_tokens)
+        self.generation_tokens.inc(completion_tokens)
+        self.request_success.inc(label=finished_reason)
+        self.request_prompt_tokens.observe(prompt_tokens)
+        if arrival_time is not None:
+            self.e2e_request_latency.observe(now - arrival_time)
+        if first_token_time is None:
+            return
+
+        self.request_generation_tokens.observe(completion_tokens)
+        if arrival_time is not None:
+            self.time_to_first_token.observe(first_token_time - arrival_time)
+        if completion_tokens > 1:
+            self.time_per_output_token.observe((now - first_token_time) / (completion_tokens - 1))
@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+
+class PrefixCache:
+    """
+    Automatic prefix caching simulation of vLLM.
+
+    The prompt is split in blocks of `block_size` tokens, the hash of a block chains the hash of the
+    previous block, so that a block is only reused after the same prefix. The first block is also
+    salted with the `cache_salt` of the request, if any. The cached prefix of a prompt is its longest
+    run of leading blocks found in the cache, the last token of the prompt is never cached since it
+    has to be computed to sample the first token. Only full blocks are cached, the least recently
+    used blocks are evicted beyond `num_blocks` blocks.
+    """
+
+    def __init__(self, num_blocks: int, block_size: int = 16):
+        self.num_blocks = num_blocks
+        self.block_size = block_size
+        self.blocks: OrderedDict[int, None] = OrderedDict()
+        self.queries = 0  # number of prompt tokens looked up
+        self.hits = 0  # number of prompt tokens found in the cache
+
+    def stats(self) -> dict:
+        return {
+            "blocks": len(self.blocks),
+            "num_blocks": self.num_blocks,
+            "block_size": self.block_size,
+            "queries": self.queries,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.queries if self.queries else 0.0,
+        }
+
+    def get_block_hashes(self, token_ids: list[int], cache_salt: str | None = None) -> list[int]:
+        hashes, parent = [], hash(cache_salt)
+        for start in range(0, len(token_ids) - self.block_size + 1, self.block_size):
+            parent = hash((parent, *token_ids[start : start + self.block_size]))
+            hashes.append(parent)
+
+        return hashes
+
+    def match(self, token_ids: list[int], cache_salt: str | None = None) -> int:
+        """
+        Look up the cached prefix of a prompt, then cache all its full blocks.
+
+        Args:
+            token_ids (list[int]): Tokens of the prompt.
+            cache_salt (str | None): Salt of the request, prompts are only shared by requests with the same salt.
+
+        Returns:
+            int: Number of tokens of the prompt found in the cache.
+        """
+        # the last token is always computed
+        hashes = self.get_block_hashes(token_ids=token_ids[:-1], cache_salt=cache_salt)
+
+        cached_blocks = 0
+        for block_hash in hashes:
+            if block_hash not in self.blocks:
+                break
+            cached_blocks += 1
+
+        for block_hash in hashes:
+            self.blocks[block_hash] = None
+            self.blocks.move_to_end(block_hash)
+        while len(self.blocks) > self.num_blocks:
+            self.blocks.popitem(last=False)
+
+        cached_tokens = cached_blocks * self.block_size
+        self.queries += len(token_ids)
+        self.hits += cached_tokens
+
+        return cached_tokens
@@ -0,0 +1,211 @@
+import asyncio
+from collections.abc import AsyncGenerator
+import heapq
+import itertools
+import time
+
+from openmockllm.latency import get_latency_profile
+from openmockllm.logger import init_logger
+from openmockllm.settings import settings
+from openmockllm.utils import GeneratedChoice, RequestTokens, get_realistic_itl, get_realistic_ttft
+
+logger = init_logger(__name__)
+
+
+class Sequence:
+    """
+    A choice of a request handled by the scheduler, decoded one token per engine step. The choices of a
+    request share its token accounting and the queue their tokens are sent to.
+    """
+
+    def __init__(
+        self,
+        tokens: RequestTokens,
+        chunks: list[str],
+        queue: asyncio.Queue[tuple[int, str | None]],
+        index: int = 0,
+        priority: int = 0,
+        arrival: int = 0,
+    ):
+        self.tokens = tokens
+        self.chunks = chunks
+        self.queue = queue
+        self.index = index
+        self.priority = priority
+        self.arrival = arrival
+        self.position = 0  # number of tokens already decoded
+
+    def __lt__(self, other: "Sequence") -> bool:
+        # order of the waiting queue
+        return (self.priority, self.arrival, self.index) < (other.priority, other.arrival, other.index)
+
+    @property
+    def kv_tokens(self) -> int:
+        """Number of KV cache slots used by the sequence."""
+        return self.tokens.prompt_tokens + self.position
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.chunks)
+
+    def decode(self) -> None:
+        if self.tokens.first_token_time is None:
+            self.tokens.first_token_time = time.perf_counter()
+        self.queue.put_nowait((self.index, self.chunks[self.position]))
+        self.position += 1
+        if self.finished:
+            self.queue.put_nowait((self.index, None))
+
+
+class BatchScheduler:
+    """
+    Continuous batching simulation of the vLLM engine.
+
+    A single step loop decodes one token for every running sequence at each step. Waiting sequences
+    are admitted in arrival order (`fcfs` policy), or by priority then arrival (`priority` policy, lower
+    values first), while there are less than `max_num_seqs` running sequences and their KV cache fits in
+    `kv_cache_tokens`. When the running sequences outgrow the KV cache, the most recently admitted ones
+    (the lowest priority ones with the `priority` policy) are preempted and moved back to the waiting
+    queue: they pay the prefill of their prompt and already generated tokens again when they are resumed.
+
+    When latency simulation is enabled, a step lasts one inter-token latency, stretched by the
+    batch occupancy, plus the prefill time of the sequences admitted at this step.
+    """
+
+    def __init__(self, max_num_seqs: int, kv_cache_tokens: int, policy: str = "fcfs"):
+        self.max_num_seqs = max_num_seqs
+        self.kv_cache_tokens = kv_cache_tokens
+        self.policy = policy
+        self.waiting: list[Sequence] = []  # heap of the sequences, first in arrival or priority order
+        self.running: list[Sequence] = []
+        self.num_preemptions = 0
+        self._arrivals = itertools.count()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def kv_used(self) -> int:
+        return sum(seq.kv_tokens for seq in self.running)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self.running),
+            "waiting": len(self.waiting),
+            "kv_cache_usage": self.kv_used / self.kv_cache_tokens,
+            "num_preemptions": self.num_preemptions,
+            "policy": self.policy,
+        }
+
+    async def generate(self, tokens: RequestTokens, choices: list[GeneratedChoice], priority: int = 0) -> AsyncGenerator[tuple[int, int, str], None]:
+        """
+        Queue the choices of a request, generated with one chunk per token, and yield their `(index, num_tokens, chunk)`
+        as they are decoded by the step loop, grouped in chunks of `settings.stream_chunk_tokens` tokens.
+        """
+        queue: asyncio.Queue[tuple[int, str | None]] = asyncio.Queue()
+        priority, arrival = priority if self.policy == "priority" else 0, next(self._arrivals)
+        seqs = [
+            Sequence(tokens=tokens, chunks=choice.chunks, queue=queue, index=index, priority=priority, arrival=arrival)
+            for index, choice in enumerate(choices)
+            if choice.chunks
+        ]
+        if not seqs:
+            return
+
+        for seq in seqs:
+            heapq.heappush(self.waiting, seq)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+        buffers: list[list[str]] = [[] for _ in choices]
+        remaining = len(seqs)
+        try:
+            while remaining:
+                index, chunk = await queue.get()
+                if chunk is not None:
+                    buffers[index].append(chunk)
+                else:
+                    remaining -= 1
+                if buffers[index] and (chunk is None or len(buffers[index]) == settings.stream_chunk_tokens):
+                    yield index, len(buffers[index]), "".join(buffers[index])
+                    buffers[index].clear()
+        finally:
+            # client disconnected before the end of the generation
+            self.running = [seq for seq in self.running if seq.queue is not queue]
+            if any(seq.queue is queue for seq in self.waiting):
+                self.waiting = [seq for seq in self.waiting if seq.queue is not queue]
+                heapq.heapify(self.waiting)
+
+    async def complete(self, tokens: RequestTokens, choices: list[GeneratedChoice], priority: int = 0) -> list[GeneratedChoice]:
+        """
+        Same as `generate`, returns the choices once they are all decoded.
+        """
+        async for _ in self.generate(tokens=tokens, choices=choices, priority=priority):
+            pass
+
+        return choices
+
+    def _schedule(self) -> list[Sequence]:
+        """
+        Preempt running sequences that no longer fit in the KV cache, then admit waiting sequences.
+
+        Returns:
+            list[Sequence]: Sequences admitted at this step, they need a prefill.
+        """
+        # each running sequence needs one more KV slot for the next decode step
+        while len(self.running) > 1 and self.kv_used + len(self.running) > self.kv_cache_tokens:
+            victim = max(self.running) if self.policy == "priority" else self.running[-1]
+            self.running.remove(victim)
+            heapq.heappush(self.waiting, victim)
+            self.num_preemptions += 1
+
+        admitted = []
+        while self.waiting and len(self.running) < self.max_num_seqs:
+            seq = self.waiting[0]
+            # a sequence larger than the KV cache runs alone rather than never being scheduled
+            if self.running and self.kv_used + len(self.running) + seq.kv_tokens + 1 > self.kv_cache_tokens:
+                break
+            self.running.append(heapq.heappop(self.waiting))
+            admitted.append(seq)
+
+        return admitted
+
+    def _step_time(self, admitted: list[Sequence]) -> float:
+        if not settings.simulate_latency:
+            return 0.0
+
+        # prefills of the admitted sequences are batched together with the decode step, the choices of a
+        # request share the prefill of its prompt
+        prefill = max(
+            (
+                get_realistic_ttft(
+                    input_tokens=seq.kv_tokens, inflight_requests=1, cached_tokens=seq.tokens.prompt_tokens if seq.index else seq.tokens.cached_tokens
+                )
+                for seq in admitted
+            ),
+            default=0.0,
+        )
+        if get_latency_profile() is not None:
+            # measured inter-token latencies already include the contention of the running sequences
+            decode = get_realistic_itl(output_tokens=1, inflight_requests=len(self.running))
+        else:
+            decode = get_realistic_itl(output_tokens=1, inflight_requests=1) * (1 + len(self.running) / self.max_num_seqs)
+
+        return prefill + decode
+
+    async def _run(self) -> None:
+        try:
+            while self.running or self.waiting:
+                admitted = self._schedule()
+                await asyncio.sleep(self._step_time(admitted=admitted))
+
+                for seq in list(self.running):
+                    seq.decode()
+                    if seq.finished:
+                        self.running.remove(seq)
+        except Exception:
+            logger.exception("Scheduler step loop failed")
+            for seq in self.running + self.waiting:
+                seq.queue.put_nowait((seq.index, None))
+            self.running.clear()
+            self.waiting.clear()
+        finally:
+            self._task = None
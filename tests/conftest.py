@@ -5,19 +5,25 @@ import pytest
 import pytest_asyncio
 
 
+@pytest.fixture
+def base_url():
+    """URL of the server under test, overridden by the modules starting a server with their own arguments"""
+    return "http://localhost:8000"
+
+
 @pytest_asyncio.fixture
-async def mistral_client():
+async def mistral_client(base_url):
     """Create an official MistralClient SDK instance configured for testing"""
 
-    client = Mistral(api_key=None, server_url="http://localhost:8000")
+    client = Mistral(api_key=None, server_url=base_url)
 
     yield client
 
 
 @pytest.fixture
-def tei_client():
+def tei_client(base_url):
     """Create an httpx client for testing TEI backend"""
-    client = httpx.Client(base_url="http://localhost:8000", timeout=30.0)
+    client = httpx.Client(base_url=base_url, timeout=30.0)
 
     yield client
 
@@ -25,17 +31,17 @@ def tei_client():
 
 
 @pytest.fixture
-def vllm_client():
+def vllm_client(base_url):
     """Create an OpenAI client for testing vLLM backend (OpenAI compatible)"""
-    client = OpenAI(api_key="test-key", base_url="http://localhost:8000/v1")
+    client = OpenAI(api_key="test-key", base_url=f"{base_url}/v1")
 
     yield client
 
 
 @pytest_asyncio.fixture
-async def vllm_async_client():
+async def vllm_async_client(base_url):
     """Create an async OpenAI client for testing vLLM backend"""
-    client = AsyncOpenAI(api_key="test-key", base_url="http://localhost:8000/v1")
+    client = AsyncOpenAI(api_key="test-key", base_url=f"{base_url}/v1")
 
     yield client
 
@@ -0,0 +1,18 @@
+import json
+import os
+import subprocess
+import sys
+
+from openmockllm.main import ARGS_ENV, parse_args
+
+
+def test_module_app_from_env():
+    """Test that `openmockllm.main:app` is created on first access from the arguments passed through the environment"""
+    args = parse_args(argv=["--backend", "tei", "--model-name", "env-model"])
+    code = "import openmockllm.main as main; assert main.app is main.app; print(main.app.state.backend, main.app.state.model_name)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], env={**os.environ, ARGS_ENV: json.dumps(vars(args))}, capture_output=True, text=True, check=True
+    )
+
+    # the logs of the app are written to stdout before
+    assert result.stdout.splitlines()[-1].split() == ["tei", "env-model"]
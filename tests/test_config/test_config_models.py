@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from openmockllm.config import load_models_config
+from openmockllm.main import parse_args
+from tests.utils import kill_openmockllm, run_openmockllm
+
+CONFIG_PATH = Path(__file__).resolve().parents[2] / "docs" / "models.json"
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """Server started with the example config file"""
+    process = run_openmockllm(config=CONFIG_PATH)
+    yield process.url
+    kill_openmockllm(process)
+
+
+def get_models(tei_client):
+    return tei_client.get("/v1/models").json()["data"]
+
+
+def test_models_under_prefix(tei_client):
+    """Test that each model of the config file is served under its prefix"""
+    models = get_models(tei_client)
+    assert [model["id"] for model in models] == ["llama-3.1-8b", "mistral-small", "bge-m3"]
+
+    for model in models:
+        if model["backend"] == "tei":
+            response = tei_client.get(f"{model['prefix']}/info")
+            assert response.status_code == 200
+            assert response.json()["model_id"] == model["id"]
+        else:
+            response = tei_client.get(f"{model['prefix']}/v1/models")
+            assert response.status_code == 200
+            assert [m["id"] for m in response.json()["data"]] == [model["id"]]
+
+
+def test_dispatch_on_model_field(tei_client):
+    """Test that chat requests without prefix are dispatched to the model of their model field"""
+    models = [model for model in get_models(tei_client) if model["backend"] in ("vllm", "mistral")]
+
+    for model in models:
+        before = tei_client.get(f"{model['prefix']}/stats").json()
+        response = tei_client.post(
+            "/v1/chat/completions", json={"model": model["id"], "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 5}
+        )
+        after = tei_client.get(f"{model['prefix']}/stats").json()
+
+        assert response.status_code == 200
+        assert response.json()["model"] == model["id"]
+        assert after["total"] == before["total"] + 1
+
+
+def test_unknown_model(tei_client):
+    """Test that requests for a model missing from the config file are rejected"""
+    response = tei_client.post("/v1/chat/completions", json={"model": "unknown-model", "messages": [{"role": "user", "content": "Hello"}]})
+
+    assert response.status_code == 404
+
+
+def test_config_paths_relative_to_config_file(tmp_path, monkeypatch):
+    """Test that the paths of a config file are relative to its directory, not to the working directory"""
+    monkeypatch.chdir(tmp_path)
+    models = load_models_config(path=CONFIG_PATH, args=parse_args(argv=[]))
+
+    assert Path(models[0].latency_profile) == CONFIG_PATH.parent / "latency_profile.json"
+    assert models[1].latency_profile is None
+
+
+def test_config_invalid_latency_profile(tmp_path):
+    """Test that a missing or invalid latency profile is reported when loading the config file"""
+    (tmp_path / "invalid.json").write_text(json.dumps({"ttft": [{"percentiles": {"p50": 0.1}}]}))
+    for profile in ("missing.json", "invalid.json"):
+        config = tmp_path / "models.json"
+        config.write_text(json.dumps({"models": [{"name": "llama", "backend": "vllm", "latency-profile": profile}]}))
+
+        with pytest.raises(ValueError, match="latency profile"):
+            load_models_config(path=config, args=parse_args(argv=[]))
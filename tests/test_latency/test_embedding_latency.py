@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from openmockllm import utils
+from openmockllm.settings import settings
+from openmockllm.utils import get_realistic_embedding_latency, simulate_embedding_latency
+
+
+@pytest.fixture
+def latency_settings(monkeypatch):
+    """Embedding cost model of 10 ms per request, 1000 tokens per second and 50% slowdown per additional request"""
+    monkeypatch.setattr(settings, "embedding_request_overhead", 0.01)
+    monkeypatch.setattr(settings, "reference_embedding_tps", 1000)
+    monkeypatch.setattr(settings, "embedding_contention", 0.5)
+
+
+def test_embedding_latency_grows_with_batch_tokens(latency_settings):
+    """Test that the latency of a request grows with the number of tokens of its batch"""
+    latencies = [[get_realistic_embedding_latency(input_tokens=input_tokens) for _ in range(200)] for input_tokens in (0, 100, 1000, 10000)]
+
+    for smaller, larger in zip(latencies, latencies[1:]):
+        assert max(smaller) < min(larger)
+    assert sum(latencies[-1]) / 200 == pytest.approx(10.01, rel=0.05)
+
+
+def test_embedding_latency_bounds(latency_settings):
+    """Test that the latency stays within 30% of the cost model, and grows with the requests in flight"""
+    for input_tokens, inflight_requests in [(0, 1), (100, 1), (100, 3), (5000, 10)]:
+        mean = (0.01 + input_tokens / 1000) * (1 + 0.5 * (inflight_requests - 1))
+        latencies = [get_realistic_embedding_latency(input_tokens=input_tokens, inflight_requests=inflight_requests) for _ in range(1000)]
+
+        assert all(mean * 0.7 <= latency <= mean * 1.3 for latency in latencies)
+
+
+def test_embedding_latency_floor(monkeypatch):
+    """Test that the latency is at least 1 ms"""
+    monkeypatch.setattr(settings, "embedding_request_overhead", 0.0)
+
+    assert get_realistic_embedding_latency(input_tokens=0) == 0.001
+
+
+@pytest.mark.parametrize("simulate_latency", [False, True])
+def test_simulate_embedding_latency(latency_settings, monkeypatch, simulate_latency):
+    """Test that the embedding latency is only waited for when latency simulation is enabled"""
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(settings, "simulate_latency", simulate_latency)
+    monkeypatch.setattr(utils.asyncio, "sleep", sleep)
+    asyncio.run(simulate_embedding_latency(input_tokens=1000))
+
+    if simulate_latency:
+        assert len(sleeps) == 1 and 1.01 * 0.7 <= sleeps[0] <= 1.01 * 1.3
+    else:
+        assert sleeps == []
@@ -0,0 +1,90 @@
+import json
+import math
+from pathlib import Path
+
+import pytest
+
+from openmockllm.latency import InverseCDF, LatencyProfile
+
+PROFILE_PATH = Path(__file__).resolve().parents[2] / "docs" / "latency_profile.json"
+
+CSV_PROFILE = """metric,prompt_tokens,concurrency,p1,p50,p90,p99
+ttft,512,1,0.045,0.062,0.081,0.12
+ttft,512,16,0.07,0.11,0.19,0.34
+itl,,1,0.0098,0.0112,0.0125,0.016
+"""
+
+
+def test_inverse_cdf_interpolation():
+    """Test that the quantiles between two percentiles are interpolated linearly"""
+    distribution = InverseCDF(percentiles={0: 0.0, 100: 1.0}, size=4)
+
+    assert distribution.table == pytest.approx([0.125, 0.375, 0.625, 0.875])
+    assert distribution.mean == pytest.approx(0.5)
+
+
+def test_inverse_cdf_tails():
+    """Test that the quantiles beyond the lowest and highest percentiles stay at their latencies"""
+    distribution = InverseCDF(percentiles={10: 1.0, 50: 1.5, 90: 2.0}, size=100)
+
+    assert distribution.table[:10] == [1.0] * 10
+    assert distribution.table[-10:] == [2.0] * 10
+    assert distribution.table[50] == pytest.approx(1.5 + 0.5 * 0.5 / 40)
+    assert all(1.0 <= distribution.sample() <= 2.0 for _ in range(1000))
+
+
+def test_inverse_cdf_non_decreasing():
+    """Test that a noisy measure with a lower latency at a higher percentile is smoothed out"""
+    distribution = InverseCDF(percentiles={50: 2.0, 90: 1.0, 99: 3.0}, size=100)
+
+    assert distribution.table == sorted(distribution.table)
+    assert min(distribution.table) == 2.0
+
+
+def test_json_profile():
+    """Test that a JSON profile is looked up by prompt length bucket and concurrency level"""
+    profile = LatencyProfile.from_file(path=PROFILE_PATH)
+
+    assert profile.ttft.buckets == [512, 4096, 32768]
+    assert profile.itl.buckets == [math.inf]
+    # prompts up to the bucket, the concurrency levels from theirs, longer prompts and lower concurrencies in the nearest table
+    assert profile.ttft.lookup(prompt_tokens=100, concurrency=1).table[0] == pytest.approx(0.045, rel=0.1)
+    assert profile.ttft.lookup(prompt_tokens=1000, concurrency=20).table[0] == pytest.approx(0.31, rel=0.1)
+    assert profile.ttft.lookup(prompt_tokens=100000, concurrency=1000) is profile.ttft.lookup(prompt_tokens=32768, concurrency=16)
+    assert profile.itl.lookup(prompt_tokens=100, concurrency=0) is profile.itl.lookup(prompt_tokens=100, concurrency=1)
+
+
+def test_csv_profile(tmp_path):
+    """Test that a CSV profile has the same measures as the JSON one"""
+    path = tmp_path / "profile.csv"
+    path.write_text(CSV_PROFILE)
+    profile = LatencyProfile.from_file(path=path)
+    reference = LatencyProfile.from_file(path=PROFILE_PATH)
+
+    assert profile.ttft.levels == [[1, 16]]
+    for concurrency in (1, 16):
+        table = profile.ttft.lookup(prompt_tokens=512, concurrency=concurrency).table
+        assert table == reference.ttft.lookup(prompt_tokens=512, concurrency=concurrency).table
+    assert profile.itl.lookup(prompt_tokens=512, concurrency=1).table == reference.itl.lookup(prompt_tokens=512, concurrency=1).table
+
+
+@pytest.mark.parametrize(
+    "name, content",
+    [
+        ("not_json.json", "{"),
+        ("list.json", json.dumps([{"percentiles": {"p50": 0.1}}])),
+        ("no_itl.json", json.dumps({"ttft": [{"percentiles": {"p50": 0.1}}]})),
+        ("no_percentiles.json", json.dumps({"ttft": [{"concurrency": 1}], "itl": [{"percentiles": {"p50": 0.01}}]})),
+        ("bad_percentile.json", json.dumps({"ttft": [{"percentiles": {"p50": "fast"}}], "itl": [{"percentiles": {"p50": 0.01}}]})),
+        ("unknown_metric.csv", "metric,p50\nttft,0.1\nitl,0.01\ne2e,1.0\n"),
+        ("no_metric.csv", "prompt_tokens,p50\n512,0.1\n"),
+        ("no_percentiles.csv", "metric,concurrency\nttft,1\nitl,1\n"),
+    ],
+)
+def test_malformed_profile(tmp_path, name, content):
+    """Test that a malformed profile is rejected with a ValueError"""
+    path = tmp_path / name
+    path.write_text(content)
+
+    with pytest.raises(ValueError):
+        LatencyProfile.from_file(path=path)
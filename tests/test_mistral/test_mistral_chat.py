@@ -109,3 +109,14 @@ def test_chat_completion_audio_transcription(mistral_client):
     assert response.usage.prompt_tokens > 0
     assert response.usage.completion_tokens > 0
     assert response.usage.total_tokens > 0
+
+
+def test_chat_completion_streaming_usage(mistral_client):
+    """Test that the final streamed chunk reports usage"""
+    stream_response = mistral_client.chat.stream(model="openmockllm", messages=[{"role": "user", "content": "Hello, how are you?"}], max_tokens=30)
+
+    chunks = list(stream_response)
+
+    assert chunks[-1].data.choices[0].finish_reason == "stop"
+    assert chunks[-1].data.usage is not None
+    assert chunks[-1].data.usage.completion_tokens == 30
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.utils import kill_openmockllm, run_openmockllm
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """TEI server with the dynamic batcher"""
+    process = run_openmockllm(backend="tei", dynamic_batching=True)
+    yield process.url
+    kill_openmockllm(process)
+
+
+def get_batcher_stats(tei_client):
+    return tei_client.get("/stats").json()["batcher"]
+
+
+def test_batcher_coalesces_inputs_of_a_request(tei_client):
+    """Test that the inputs of a request fitting in --max-batch-tokens are processed in a single batch"""
+    before = get_batcher_stats(tei_client)
+    response = tei_client.post("/embed", json={"inputs": ["First text", "Second text", "Third text"]})
+    after = get_batcher_stats(tei_client)
+
+    assert response.status_code == 200
+    assert after["batches"] == before["batches"] + 1
+
+
+def test_batcher_concurrent_requests(tei_client):
+    """Test that concurrent requests all succeed or are rejected as overloaded"""
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda i: tei_client.post("/embed", json={"inputs": f"Text {i}"}), range(16)))
+
+    assert all(response.status_code in (200, 429) for response in responses)
+    assert get_batcher_stats(tei_client)["requests"] == 0
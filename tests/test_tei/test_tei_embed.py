@@ -0,0 +1,62 @@
+import pytest
+
+
+def test_embed_single_string(tei_client):
+    """Test /embed with a single string"""
+    response = tei_client.post("/embed", json={"inputs": "Hello, world!"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert len(data[0]) == 1024
+    assert sum(x * x for x in data[0]) == pytest.approx(1.0, rel=1e-4)
+
+
+def test_embed_batch_with_dimensions(tei_client):
+    """Test /embed with a batch of strings and token IDs"""
+    response = tei_client.post("/embed", json={"inputs": ["Hello", [9906, 11, 1917]], "dimensions": 64, "normalize": False})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert all(len(embedding) == 64 for embedding in data)
+
+
+def test_embed_empty_batch(tei_client):
+    """Test that an empty batch is rejected"""
+    response = tei_client.post("/embed", json={"inputs": []})
+
+    assert response.status_code == 400
+    assert response.json()["error_type"] == "empty"
+
+
+def test_embed_truncate(tei_client):
+    """Test that inputs longer than the max input length are rejected unless truncated"""
+    inputs = "deep learning " * 1000
+
+    response = tei_client.post("/embed", json={"inputs": inputs})
+    assert response.status_code == 413
+    assert response.json()["error_type"] == "validation"
+
+    response = tei_client.post("/embed", json={"inputs": inputs, "truncate": True, "truncation_direction": "left"})
+    assert response.status_code == 200
+
+
+def test_embed_all(tei_client):
+    """Test that /embed_all returns one vector per token"""
+    response = tei_client.post("/embed_all", json={"inputs": [[1, 2, 3], [4, 5]]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [len(tokens) for tokens in data] == [3, 2]
+    assert all(len(vector) == 1024 for tokens in data for vector in tokens)
+
+
+def test_embed_sparse(tei_client):
+    """Test that /embed_sparse weights each distinct token of the input"""
+    response = tei_client.post("/embed_sparse", json={"inputs": [[7, 3, 7]]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [value["index"] for value in data[0]] == [3, 7]
+    assert data[0][1]["value"] > data[0][0]["value"] > 0
@@ -17,8 +17,8 @@ def test_embeddings_single_string(tei_client):
     assert data["data"][0]["index"] == 0
     assert isinstance(data["data"][0]["embedding"], list)
     assert len(data["data"][0]["embedding"]) == 1024  # Default dimension from server
-    assert data["usage"]["prompt_tokens"] == 0
-    assert data["usage"]["total_tokens"] == 0
+    assert data["usage"]["prompt_tokens"] > 0
+    assert data["usage"]["total_tokens"] == data["usage"]["prompt_tokens"]
 
 
 def test_embeddings_list_of_strings(tei_client):
@@ -104,6 +104,16 @@ def test_embeddings_response_structure(tei_client):
     assert "total_tokens" in data["usage"]
 
 
+def test_embeddings_usage(tei_client):
+    """Test that the usage counts the tokens of all the inputs, one embedding per token with /embed_all"""
+    texts = ["First text", "A longer second text, with punctuation."]
+    response = tei_client.post("/v1/embeddings", json={"input": texts, "model": "openmockllm"})
+    token_embeddings = tei_client.post("/embed_all", json={"inputs": texts}).json()
+
+    assert response.status_code == 200
+    assert response.json()["usage"]["prompt_tokens"] == sum(len(embeddings) for embeddings in token_embeddings)
+
+
 def test_embeddings_empty_batch_error(tei_client):
     """Test that empty input raises appropriate error"""
     response = tei_client.post("/v1/embeddings", json={"input": [], "model": "openmockllm"})
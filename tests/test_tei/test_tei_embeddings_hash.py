@@ -0,0 +1,22 @@
+import pytest
+
+from tests.utils import kill_openmockllm, run_openmockllm
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """TEI server with hash embeddings"""
+    process = run_openmockllm(backend="tei", embedding_mode="hash")
+    yield process.url
+    kill_openmockllm(process)
+
+
+def test_embeddings_hash_mode_is_deterministic(tei_client):
+    """Test that the same input gets the same normalized vector with --embedding-mode hash"""
+    first = tei_client.post("/v1/embeddings", json={"input": ["Same text", "Other text"], "dimensions": 64}).json()
+    second = tei_client.post("/v1/embeddings", json={"input": "Same text", "dimensions": 64}).json()
+
+    assert first["data"][0]["embedding"] == second["data"][0]["embedding"]
+    assert first["data"][0]["embedding"] != first["data"][1]["embedding"]
+    assert sum(x * x for x in first["data"][0]["embedding"]) == pytest.approx(1.0, rel=1e-5)
+    assert tei_client.get("/stats").json()["embeddings"]["cache"]["hits"] >= 1
@@ -0,0 +1,24 @@
+import pytest
+
+from tests.utils import kill_openmockllm, run_openmockllm
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """TEI server with projection embeddings"""
+    process = run_openmockllm(backend="tei", embedding_mode="projection")
+    yield process.url
+    kill_openmockllm(process)
+
+
+def test_embeddings_projection_mode_tracks_token_overlap(tei_client):
+    """Test that similar texts get closer vectors than unrelated texts with --embedding-mode projection"""
+    texts = ["the cat sat on the mat", "the cat sat on a mat", "1234567890"]
+    data = tei_client.post("/v1/embeddings", json={"input": texts}).json()["data"]
+    cat, other_cat, numbers = (item["embedding"] for item in data)
+
+    def dot(a, b):
+        return sum(x * y for x, y in zip(a, b, strict=True))
+
+    assert dot(cat, cat) == pytest.approx(1.0, rel=1e-5)
+    assert dot(cat, other_cat) > dot(cat, numbers)
@@ -0,0 +1,36 @@
+import re
+
+
+def get_sample(text: str, name: str) -> float:
+    match = re.search(rf"^{re.escape(name)}(?:{{[^}}]*}})? (\S+)$", text, flags=re.MULTILINE)
+    assert match, f"{name} not found"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint(tei_client):
+    """Test that the metrics are exposed in the Prometheus text format with the TEI names"""
+    response = tei_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("te_request_duration", "te_request_queue_duration", "te_batch_next_size", "te_queue_size"):
+        assert f"# TYPE {name} " in response.text
+
+
+def test_metrics_embed(tei_client):
+    """Test that embed requests are measured by the metrics"""
+    before = tei_client.get("/metrics").text
+    tei_client.post("/embed", json={"inputs": ["First text", "Second text"]})
+    after = tei_client.get("/metrics").text
+
+    assert 'te_request_success{method="batch"}' in after
+    assert get_sample(after, "te_request_duration_count") == get_sample(before, "te_request_duration_count") + 1
+    assert get_sample(after, "te_request_input_length_count") == get_sample(before, "te_request_input_length_count") + 2
+    assert get_sample(after, "te_batch_next_size_count") > get_sample(before, "te_batch_next_size_count")
+
+
+def test_metrics_failure(tei_client):
+    """Test that failed requests are counted by error type"""
+    tei_client.post("/embed", json={"inputs": []})
+
+    assert 'te_request_failure{err="empty"}' in tei_client.get("/metrics").text
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_predict_single(tei_client):
+    """Test /predict with a single string"""
+    response = tei_client.post("/predict", json={"inputs": "I like you"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert {prediction["label"] for prediction in data} == {"LABEL_0", "LABEL_1"}
+    assert sum(prediction["score"] for prediction in data) == pytest.approx(1.0)
+    assert data[0]["score"] >= data[1]["score"]
+
+
+def test_predict_batch(tei_client):
+    """Test /predict with a batch of single strings and pairs"""
+    response = tei_client.post(
+        "/predict", json={"inputs": [["What is Deep Learning?", "Deep Learning is ..."], ["Cooking", "Sports"]], "raw_scores": True}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert all(len(predictions) == 2 for predictions in data)
+    # the pair with tokens in common is classified as similar, the pair without as dissimilar
+    assert data[0][0]["label"] == "LABEL_1"
+    assert data[1][0]["label"] == "LABEL_0"
+
+
+def test_predict_pair(tei_client):
+    """Test that a list of two strings is a single pair"""
+    response = tei_client.post("/predict", json={"inputs": ["What is Deep Learning?", "Deep Learning is ..."]})
+
+    assert response.status_code == 200
+    assert isinstance(response.json()[0], dict)
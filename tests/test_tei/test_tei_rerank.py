@@ -193,3 +193,32 @@ def test_rerank_with_optional_parameters(tei_client):
         assert "index" in rank
         assert "score" in rank
         assert "text" in rank
+
+
+def test_rerank_scores_follow_query_overlap(tei_client):
+    """Test that texts sharing more tokens with the query get higher scores"""
+    texts = ["Sports are fun", "Deep Learning is a subset of machine learning", "Cooking is an art"]
+    response = tei_client.post("/rerank", json={"query": "What is Deep Learning?", "texts": texts})
+
+    assert response.status_code == 200
+    assert response.json()[0]["index"] == 1
+
+
+def test_rerank_top_n(tei_client):
+    """Test that only the top_n best texts are returned"""
+    texts = [f"Text number {i} about deep learning" if i % 3 == 0 else f"Unrelated text {i}" for i in range(30)]
+    full = tei_client.post("/rerank", json={"query": "deep learning", "texts": texts, "raw_scores": True}).json()
+    top = tei_client.post("/rerank", json={"query": "deep learning", "texts": texts, "raw_scores": True, "top_n": 5}).json()
+
+    assert [rank["score"] for rank in top] == [rank["score"] for rank in full[:5]]
+
+
+def test_rerank_truncate(tei_client):
+    """Test that inputs longer than the max input length are rejected unless truncated"""
+    texts = ["deep learning " * 1000]
+
+    response = tei_client.post("/rerank", json={"query": "deep learning", "texts": texts})
+    assert response.status_code == 413
+
+    response = tei_client.post("/rerank", json={"query": "deep learning", "texts": texts, "truncate": True})
+    assert response.status_code == 200
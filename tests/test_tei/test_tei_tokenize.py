@@ -0,0 +1,55 @@
+def test_tokenize_single_string(tei_client):
+    """Test that tokens of a single string come with their offsets"""
+    text = "Hello, wörld!"
+    response = tei_client.post("/tokenize", json={"inputs": text})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    assert "".join(token["text"] for token in data[0]) == text
+    for token in data[0]:
+        assert token["text"] == text[token["start"] : token["stop"]]
+        assert token["special"] is False
+
+
+def test_tokenize_batch(tei_client):
+    """Test tokenizing a batch of strings, twice to go through the encoding cache"""
+    texts = ["First document", "Second document", ""]
+    first = tei_client.post("/tokenize", json={"inputs": texts}).json()
+    second = tei_client.post("/tokenize", json={"inputs": texts}).json()
+
+    assert len(first) == 3
+    assert first[2] == []
+    assert first == second
+
+
+def test_decode_roundtrip(tei_client):
+    """Test that decoding the tokens of a text returns the text"""
+    tokens = tei_client.post("/tokenize", json={"inputs": ["Hello, world!", "Bye"]}).json()
+    ids = [[token["id"] for token in text_tokens] for text_tokens in tokens]
+
+    response = tei_client.post("/decode", json={"ids": ids})
+    assert response.status_code == 200
+    assert response.json() == ["Hello, world!", "Bye"]
+
+    response = tei_client.post("/decode", json={"ids": ids[0]})
+    assert response.json() == ["Hello, world!"]
+
+
+def test_decode_invalid_token(tei_client):
+    """Test that unknown token IDs are a tokenizer error"""
+    response = tei_client.post("/decode", json={"ids": [4000000000]})
+
+    assert response.status_code == 422
+    assert response.json()["error_type"] == "tokenizer"
+
+
+def test_tokenize_special_tokens(tei_client):
+    """Test that special tokens in the text are encoded as such, and that no special token is added, like Hugging Face tokenizers"""
+    text = "Hello<|endoftext|>"
+    for add_special_tokens in (True, False):
+        tokens = tei_client.post("/tokenize", json={"inputs": text, "add_special_tokens": add_special_tokens}).json()[0]
+
+        assert "".join(token["text"] for token in tokens) == text
+        assert [token["special"] for token in tokens][-1] is True
+        assert not any(token["special"] for token in tokens[:-1])
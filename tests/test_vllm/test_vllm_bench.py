@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from openmockllm.bench import Workload, parse_bench_args, run_workload
+from tests.utils import kill_openmockllm, run_openmockllm
+
+
+@pytest.fixture(scope="module")
+def tei_url():
+    """URL of a TEI server for the rerank workload"""
+    process = run_openmockllm(backend="tei")
+    yield process.url
+    kill_openmockllm(process)
+
+
+@pytest.mark.parametrize("workload", ["chat", "chat-stream", "embeddings", "rerank"])
+def test_bench_workload(workload, request):
+    """Test that the bench measures the requests of a workload"""
+    args, _ = parse_bench_args(argv=["--workload", workload, "--max-tokens", "8", "--prompt-tokens", "16"])
+    url = request.getfixturevalue("tei_url") if workload == "rerank" else "http://localhost:8000"
+    report = asyncio.run(run_workload(url=url, workload=Workload(args=args), concurrency=4, requests=12))
+
+    assert report["requests"] == 12
+    assert report["errors"] == 0
+    assert report["requests_per_second"] > 0
+    assert report["tokens_per_second"] > 0
+    assert set(report["latency_ms"]) == {"p50", "p95", "p99"}
+    if workload == "chat-stream":
+        assert report["ttft_ms"]["p50"] <= report["latency_ms"]["p50"]
+        assert report["itl_ms"] is not None
+
+
+@pytest.mark.parametrize("workload", ["chat", "chat-stream"])
+def test_bench_workload_logprobs(workload):
+    """Test that the bench requests the logprobs of the chat completions"""
+    args, _ = parse_bench_args(argv=["--workload", workload, "--max-tokens", "8", "--top-logprobs", "5"])
+    workload = Workload(args=args)
+    report = asyncio.run(run_workload(url="http://localhost:8000", workload=workload, concurrency=4, requests=8))
+
+    assert workload.body["logprobs"] is True and workload.body["top_logprobs"] == 5
+    assert report["requests"] == 8
+    assert report["errors"] == 0
+    assert report["tokens_per_second"] > 0
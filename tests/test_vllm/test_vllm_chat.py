@@ -1,3 +1,5 @@
+import httpx
+import openai
 import pytest
 
 
@@ -166,3 +168,249 @@ async def test_chat_completion_async_basic(vllm_async_client):
     assert response.usage.prompt_tokens > 0
     assert response.usage.completion_tokens > 0
     assert response.usage.total_tokens > 0
+
+
+def test_chat_completion_max_tokens_is_reached(vllm_client):
+    """Test that the completion is exactly max_tokens tokens long"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Tell me a long story"}],
+        max_tokens=200,
+    )
+
+    assert response.usage.completion_tokens == 200
+
+
+def test_chat_completion_finish_reason_length(vllm_client):
+    """Test that a completion cut by max_tokens finishes with the length reason"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Tell me a long story"}],
+        max_tokens=20,
+    )
+
+    assert response.choices[0].finish_reason == "length"
+    assert response.choices[0].stop_reason is None
+
+
+def test_chat_completion_stop_strings(vllm_client):
+    """Test that the generation stops at the first stop string, excluded from the output by default"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Tell me a long story"}],
+        max_tokens=200,
+        n=3,
+        stop=[" ", "\n"],
+    )
+
+    for choice in response.choices:
+        assert choice.finish_reason == "stop"
+        assert choice.stop_reason in (" ", "\n")
+        assert " " not in choice.message.content and "\n" not in choice.message.content
+    assert response.usage.completion_tokens < 3 * 200
+
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Tell me a long story"}],
+        max_tokens=200,
+        stop=" ",
+        extra_body={"include_stop_str_in_output": True, "min_tokens": 10},
+    )
+
+    assert response.choices[0].message.content.endswith(" ")
+    assert response.usage.completion_tokens >= 10
+
+
+def test_chat_completion_streaming_stop_strings(vllm_client):
+    """Test that the streamed content stops at the first stop string"""
+    stream_response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Tell me a long story"}],
+        max_tokens=200,
+        stop=[" "],
+        stream=True,
+    )
+
+    chunks = list(stream_response)
+    content = "".join(c.choices[0].delta.content or "" for c in chunks)
+
+    assert len(content) > 0 and " " not in content
+    assert chunks[-1].choices[0].finish_reason == "stop"
+    # the chunk of the stop string is not sent without its text
+    assert chunks[-2].choices[0].delta.content
+
+
+def test_chat_completion_min_tokens_greater_than_max_tokens(vllm_client):
+    """Test that min_tokens greater than max_tokens is rejected"""
+    with pytest.raises(openai.BadRequestError):
+        vllm_client.chat.completions.create(
+            model="openmockllm", messages=[{"role": "user", "content": "Hello"}], max_tokens=10, extra_body={"min_tokens": 20}
+        )
+
+
+def test_chat_completion_priority_without_priority_scheduling(base_url):
+    """Test that a priority is rejected unless the server uses priority scheduling, like vLLM"""
+    stats = httpx.get(f"{base_url}/stats").json()
+    if (stats.get("scheduler") or stats.get("admission") or {}).get("policy") == "priority":
+        pytest.skip("server started with --scheduling-policy priority")
+    body = {"model": "openmockllm", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 5, "priority": 1}
+    response = httpx.post(f"{base_url}/v1/chat/completions", json=body)
+
+    assert response.status_code == 400
+    assert response.json()["param"] == "priority"
+
+
+def test_chat_completion_max_context_exceeded(vllm_client):
+    """Test that a prompt longer than the max context is rejected"""
+    with pytest.raises(openai.BadRequestError):
+        vllm_client.chat.completions.create(
+            model="openmockllm",
+            messages=[{"role": "user", "content": "hello " * 130000}],
+        )
+
+
+def test_chat_completion_streaming_usage(vllm_client):
+    """Test that streamed chunks match completion tokens and usage is reported when requested"""
+    stream_response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=30,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+    chunks = list(stream_response)
+    content_chunks = [c for c in chunks if c.choices and c.choices[0].delta.content]
+
+    assert chunks[-1].choices == []
+    assert chunks[-1].usage is not None
+    assert chunks[-1].usage.completion_tokens == 30
+    assert chunks[-1].usage.total_tokens == chunks[-1].usage.prompt_tokens + 30
+    assert len(content_chunks) <= 30
+
+
+def test_chat_completion_n_choices(vllm_client):
+    """Test that n choices are returned, each max_tokens tokens long"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=10,
+        n=3,
+    )
+
+    assert [choice.index for choice in response.choices] == [0, 1, 2]
+    assert all(choice.message.content for choice in response.choices)
+    assert response.usage.completion_tokens == 30
+
+
+def test_chat_completion_best_of(vllm_client):
+    """Test that best_of sequences are generated and n are returned"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=10,
+        n=2,
+        extra_body={"best_of": 4},
+    )
+
+    assert len(response.choices) == 2
+    assert response.usage.completion_tokens == 20
+
+    with pytest.raises(openai.BadRequestError):
+        vllm_client.chat.completions.create(model="openmockllm", messages=[{"role": "user", "content": "Hello"}], n=2, extra_body={"best_of": 1})
+
+
+def test_chat_completion_streaming_n_choices(vllm_client):
+    """Test that the chunks of n streamed choices are interleaved with their own index"""
+    stream_response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=10,
+        n=3,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+    chunks = list(stream_response)
+    indexes = [c.choices[0].index for c in chunks if c.choices and c.choices[0].delta.content]
+    finish_reasons = {c.choices[0].index: c.choices[0].finish_reason for c in chunks if c.choices and c.choices[0].finish_reason}
+
+    assert indexes[:3] == [0, 1, 2]
+    assert sorted(set(indexes)) == [0, 1, 2]
+    assert finish_reasons == {0: "length", 1: "length", 2: "length"}
+    assert chunks[-1].usage.completion_tokens == 30
+
+
+def test_chat_completion_logprobs(vllm_client):
+    """Test that every generated token has its logprob and top logprobs"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=10,
+        n=2,
+        logprobs=True,
+        top_logprobs=5,
+    )
+
+    for choice in response.choices:
+        content = choice.logprobs.content
+        assert len(content) == 10
+        # the last token may end within a character
+        assert choice.message.content.startswith(b"".join(bytes(token.bytes) for token in content).decode(errors="ignore"))
+        for token in content:
+            assert token.logprob <= 0
+            top = [top_logprob.logprob for top_logprob in token.top_logprobs]
+            assert len(top) == 5
+            assert top == sorted(top, reverse=True)
+            assert len({tuple(top_logprob.bytes) for top_logprob in token.top_logprobs}) == 5
+
+    response = vllm_client.chat.completions.create(model="openmockllm", messages=[{"role": "user", "content": "Hello"}], max_tokens=10)
+    assert response.choices[0].logprobs is None
+
+
+def test_chat_completion_prompt_logprobs(vllm_client):
+    """Test that every prompt token but the first has its logprob and the top candidates"""
+    response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=10,
+        extra_body={"prompt_logprobs": 2},
+    )
+
+    prompt_logprobs = response.prompt_logprobs
+    assert len(prompt_logprobs) == response.usage.prompt_tokens
+    assert prompt_logprobs[0] is None
+    for position in prompt_logprobs[1:]:
+        assert 1 <= len(position) <= 3
+        for logprob in position.values():
+            assert logprob["logprob"] <= 0 and logprob["rank"] >= 1 and "decoded_token" in logprob
+
+
+def test_chat_completion_streaming_logprobs(vllm_client):
+    """Test that the streamed chunks carry the logprobs of their tokens"""
+    stream_response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=20,
+        logprobs=True,
+        top_logprobs=2,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+    chunks = list(stream_response)
+    content = [token for c in chunks if c.choices and c.choices[0].logprobs for token in c.choices[0].logprobs.content]
+
+    assert len(content) == chunks[-1].usage.completion_tokens == 20
+    assert all(len(token.top_logprobs) == 2 for token in content)
+
+
+def test_chat_completion_invalid_logprobs(vllm_client):
+    """Test that the logprobs parameters rejected by vLLM are rejected"""
+    with pytest.raises(openai.BadRequestError):
+        vllm_client.chat.completions.create(model="openmockllm", messages=[{"role": "user", "content": "Hello"}], top_logprobs=5)
+
+    with pytest.raises(openai.BadRequestError):
+        vllm_client.chat.completions.create(
+            model="openmockllm", messages=[{"role": "user", "content": "Hello"}], stream=True, extra_body={"prompt_logprobs": 1}
+        )
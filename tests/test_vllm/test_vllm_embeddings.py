@@ -1,3 +1,5 @@
+import base64
+
 import pytest
 
 
@@ -72,3 +74,18 @@ async def test_embeddings_async(vllm_async_client):
     assert response.data is not None
     assert len(response.data) == 1
     assert response.data[0].embedding is not None
+
+
+def test_embeddings_token_ids_input(vllm_client):
+    """Test creating embeddings from token IDs, returned as base64 floats"""
+    response = vllm_client.embeddings.create(
+        model="openmockllm",
+        input=[[9906, 11, 1917, 0], [2028, 374, 264, 1296]],
+        dimensions=256,
+        encoding_format="base64",
+    )
+
+    assert len(response.data) == 2
+    # base64 of 256 little-endian float32
+    assert all(len(base64.b64decode(embedding_data.embedding)) == 256 * 4 for embedding_data in response.data)
+    assert response.usage.prompt_tokens == 8
@@ -0,0 +1,41 @@
+import re
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def metrics_client():
+    """Create an httpx client for testing metrics endpoint"""
+    client = httpx.Client(base_url="http://localhost:8000", timeout=30.0)
+    yield client
+    client.close()
+
+
+def get_sample(text: str, name: str) -> float:
+    match = re.search(rf"^{re.escape(name)}(?:{{[^}}]*}})? (\S+)$", text, flags=re.MULTILINE)
+    assert match, f"{name} not found"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint(metrics_client):
+    """Test that the metrics are exposed in the Prometheus text format with the vLLM names"""
+    response = metrics_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("vllm:num_requests_running", "vllm:num_requests_waiting", "vllm:kv_cache_usage_perc", "vllm:time_to_first_token_seconds"):
+        assert f"# TYPE {name} " in response.text
+    assert 'model_name="openmockllm"' in response.text
+
+
+def test_metrics_chat(metrics_client):
+    """Test that chat requests are measured by the metrics"""
+    before = metrics_client.get("/metrics").text
+    metrics_client.post("/v1/chat/completions", json={"model": "openmockllm", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 5})
+    after = metrics_client.get("/metrics").text
+
+    assert get_sample(after, "vllm:generation_tokens_total") == get_sample(before, "vllm:generation_tokens_total") + 5
+    assert get_sample(after, "vllm:prompt_tokens_total") > get_sample(before, "vllm:prompt_tokens_total")
+    assert get_sample(after, "vllm:time_to_first_token_seconds_count") == get_sample(before, "vllm:time_to_first_token_seconds_count") + 1
+    assert get_sample(after, "vllm:e2e_request_latency_seconds_count") == get_sample(before, "vllm:e2e_request_latency_seconds_count") + 1
@@ -0,0 +1,58 @@
+import uuid
+
+import httpx
+import pytest
+
+from tests.utils import kill_openmockllm, run_openmockllm
+
+# long enough to fill several blocks of the prefix cache
+SYSTEM_PROMPT = "You are a helpful assistant answering questions about the documentation. " * 8
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """Server simulating the prefix cache"""
+    process = run_openmockllm(enable_prefix_caching=True)
+    yield process.url
+    kill_openmockllm(process)
+
+
+def get_cached_tokens(vllm_client, question: str, cache_salt: str) -> int:
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": question}]
+    response = vllm_client.chat.completions.create(model="openmockllm", messages=messages, max_tokens=5, extra_body={"cache_salt": cache_salt})
+
+    return response.usage.prompt_tokens_details.cached_tokens
+
+
+def test_prefix_cache_hit(vllm_client, base_url):
+    """Test that the shared prefix of two prompts is reported as cached"""
+    salt = uuid.uuid4().hex
+    assert get_cached_tokens(vllm_client, "First question?", cache_salt=salt) == 0
+
+    cached_tokens = get_cached_tokens(vllm_client, "Second question?", cache_salt=salt)
+    assert cached_tokens > 0
+    assert cached_tokens % httpx.get(f"{base_url}/stats").json()["prefix_cache"]["block_size"] == 0
+
+
+def test_prefix_cache_salt(vllm_client):
+    """Test that prompts are not shared by requests with different cache salts"""
+    get_cached_tokens(vllm_client, "First question?", cache_salt=uuid.uuid4().hex)
+
+    assert get_cached_tokens(vllm_client, "First question?", cache_salt=uuid.uuid4().hex) == 0
+
+
+def test_prefix_cache_stream_usage(vllm_client):
+    """Test that the cached tokens are reported in the usage chunk of streamed responses"""
+    salt = uuid.uuid4().hex
+    get_cached_tokens(vllm_client, "First question?", cache_salt=salt)
+    stream_response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "Second question?"}],
+        max_tokens=5,
+        stream=True,
+        stream_options={"include_usage": True},
+        extra_body={"cache_salt": salt},
+    )
+    chunks = list(stream_response)
+
+    assert chunks[-1].usage.prompt_tokens_details.cached_tokens > 0
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import httpx
+import pytest
+
+from tests.utils import kill_openmockllm, run_openmockllm
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """Server generating a single chat request at a time, by priority, with latency so that the next requests queue"""
+    process = run_openmockllm(scheduling_policy="priority", max_running_requests=1, simulate_latency="True")
+    yield process.url
+    kill_openmockllm(process)
+
+
+def wait_for_waiting_requests(base_url: str, count: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while httpx.get(f"{base_url}/stats").json()["admission"]["waiting"] < count:
+        assert time.monotonic() < deadline, f"{count} requests never waited for the slot"
+        time.sleep(0.01)
+
+
+def post_chat(vllm_client, priority: int) -> float:
+    vllm_client.chat.completions.create(
+        model="openmockllm", messages=[{"role": "user", "content": "Hello"}], max_tokens=5, extra_body={"priority": priority}
+    )
+
+    return time.perf_counter()
+
+
+def test_priority_order(vllm_client, base_url):
+    """Test that the waiting requests are admitted by priority, lower values first"""
+    # the slot is held from the first chunk of the stream until its last one
+    stream = vllm_client.chat.completions.create(
+        model="openmockllm", messages=[{"role": "user", "content": "Hello"}], max_tokens=200, stream=True, extra_body={"priority": 0}
+    )
+    next(iter(stream))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        low = executor.submit(post_chat, vllm_client, 10)
+        wait_for_waiting_requests(base_url=base_url, count=1)
+        high = executor.submit(post_chat, vllm_client, -10)
+        wait_for_waiting_requests(base_url=base_url, count=2)
+        for _ in stream:
+            pass
+
+        assert high.result() < low.result()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from openmockllm.settings import settings
+from openmockllm.utils import GeneratedChoice, RequestTokens
+from openmockllm.vllm.utils import scheduler
+from openmockllm.vllm.utils.scheduler import BatchScheduler, Sequence
+
+
+class RecordingScheduler(BatchScheduler):
+    """Scheduler recording the number of running sequences of each step"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sizes = []
+
+    def _schedule(self) -> list[Sequence]:
+        admitted = super()._schedule()
+        self.batch_sizes.append(len(self.running))
+        return admitted
+
+
+def make_choices(num_tokens: int, n: int = 1) -> list[GeneratedChoice]:
+    return [GeneratedChoice(start=0, num_tokens=num_tokens, chunks=["a"] * num_tokens) for _ in range(n)]
+
+
+async def complete_request(batch_scheduler: BatchScheduler, completed: list[int], request: int, num_tokens: int = 5, priority: int = 0):
+    choices = await batch_scheduler.complete(tokens=RequestTokens(prompt="Hello"), choices=make_choices(num_tokens=num_tokens), priority=priority)
+    completed.append(request)
+    return choices
+
+
+@pytest.mark.asyncio
+async def test_scheduler_max_running():
+    """Test that no more than max_num_seqs sequences run at the same step, and that all the requests complete"""
+    batch_scheduler = RecordingScheduler(max_num_seqs=2, kv_cache_tokens=100000)
+    completed = []
+    results = await asyncio.gather(*(complete_request(batch_scheduler, completed, request) for request in range(5)))
+
+    assert max(batch_scheduler.batch_sizes) == 2
+    assert sorted(completed) == list(range(5))
+    assert all(choice.text == "a" * 5 for choices in results for choice in choices)
+    assert batch_scheduler.stats()["running"] == batch_scheduler.stats()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_fifo_admission():
+    """Test that the waiting requests are admitted in arrival order with the fcfs policy, whatever their priority"""
+    batch_scheduler = BatchScheduler(max_num_seqs=1, kv_cache_tokens=100000)
+    completed = []
+    await asyncio.gather(*(complete_request(batch_scheduler, completed, request, priority=-request) for request in range(4)))
+
+    assert completed == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_priority_admission():
+    """Test that the waiting requests are admitted by priority with the priority policy, then in arrival order"""
+    batch_scheduler = BatchScheduler(max_num_seqs=1, kv_cache_tokens=100000, policy="priority")
+    completed = []
+    # the first request is admitted before the next ones arrive
+    first = asyncio.create_task(complete_request(batch_scheduler, completed, 0))
+    await asyncio.sleep(0)
+    await asyncio.gather(
+        *(complete_request(batch_scheduler, completed, request, priority=priority) for request, priority in [(1, 5), (2, -5), (3, 5)])
+    )
+    await first
+
+    assert completed == [0, 2, 1, 3]
+
+
+def test_scheduler_itl_under_batch_size(monkeypatch):
+    """Test that a step lasts one inter-token latency stretched by the batch occupancy"""
+    monkeypatch.setattr(settings, "simulate_latency", True)
+    monkeypatch.setattr(scheduler, "get_realistic_itl", lambda output_tokens, inflight_requests: 0.01)
+    batch_scheduler = BatchScheduler(max_num_seqs=4, kv_cache_tokens=100000)
+
+    step_times = []
+    for batch_size in range(1, 5):
+        batch_scheduler.running = [Sequence(tokens=RequestTokens(prompt="Hello"), chunks=["a"], queue=asyncio.Queue()) for _ in range(batch_size)]
+        step_times.append(batch_scheduler._step_time(admitted=[]))
+
+    assert step_times == pytest.approx([0.01 * (1 + batch_size / 4) for batch_size in range(1, 5)])
+    # a full batch decodes each of its sequences at half the speed of a single one
+    assert step_times[-1] == pytest.approx(2 * 0.01)
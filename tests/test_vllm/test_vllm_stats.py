@@ -0,0 +1,32 @@
+import httpx
+import pytest
+
+
+@pytest.fixture
+def stats_client():
+    """Create an httpx client for testing stats endpoint"""
+    client = httpx.Client(base_url="http://localhost:8000", timeout=30.0)
+    yield client
+    client.close()
+
+
+def test_stats_endpoint(stats_client):
+    """Test that chat requests are counted by the stats endpoint"""
+    before = stats_client.get("/stats").json()
+    stats_client.post("/v1/chat/completions", json={"model": "openmockllm", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 5})
+    after = stats_client.get("/stats").json()
+
+    assert after["backend"] == "vllm"
+    assert after["running"] == 0
+    assert after["total"] == before["total"] + 1
+    assert after["routes"]["/v1/chat/completions"]["running"] == 0
+
+
+def test_stats_tokens(stats_client):
+    """Test that the tokens of chat requests are counted by the stats endpoint"""
+    before = stats_client.get("/stats").json()
+    stats_client.post("/v1/chat/completions", json={"model": "openmockllm", "messages": [{"role": "user", "content": "Hello"}], "max_tokens": 5})
+    after = stats_client.get("/stats").json()
+
+    assert after["prompt_tokens"] > before["prompt_tokens"]
+    assert after["completion_tokens"] == before["completion_tokens"] + 5
@@ -0,0 +1,45 @@
+from openmockllm.stopping import MAX_IGNORE_EOS_TOKENS, StoppingCriteria
+from openmockllm.utils import RequestTokens, generate_choices, get_corpus
+
+
+def find_stop(corpus) -> tuple[int, str]:
+    """Start of a completion and a stop string made of its 5th and 6th tokens, found nowhere before in the completion"""
+    for start in corpus.paragraph_starts:
+        stop = corpus.slice(start=start + 4, stop=start + 6)
+        if len(stop) > 1 and corpus.slice(start=start, stop=start + 6).find(stop) == len(corpus.slice(start=start, stop=start + 4)):
+            return start, stop
+
+    raise AssertionError("no completion with distinct tokens in the corpus")
+
+
+def test_stop_string_straddling_min_tokens():
+    """Test that a stop string starting within the first min_tokens tokens is matched when its last token is the min_tokens-th"""
+    corpus = get_corpus()
+    start, stop = find_stop(corpus)
+
+    num_tokens, text_length, stop_reason = StoppingCriteria(stop=(stop,), min_tokens=6).apply(corpus=corpus, start=start, num_tokens=50)
+
+    assert (num_tokens, stop_reason) == (6, stop)
+    assert text_length == len(corpus.slice(start=start, stop=start + 4))
+
+
+def test_stop_string_before_min_tokens():
+    """Test that a stop string completed within the first min_tokens tokens is ignored"""
+    corpus = get_corpus()
+    start, stop = find_stop(corpus)
+
+    num_tokens, _, _ = StoppingCriteria(stop=(stop,), min_tokens=7).apply(corpus=corpus, start=start, num_tokens=50)
+
+    assert num_tokens >= 7
+
+
+def test_ignore_eos_without_max_tokens():
+    """Test that ignoring the end of sequence token without max_tokens does not generate the whole context"""
+    stopping = StoppingCriteria(ignore_eos=True, max_model_tokens=128000)
+    choice = generate_choices(tokens=RequestTokens(prompt="Hello"), stopping=stopping)[0]
+
+    assert choice.num_tokens == MAX_IGNORE_EOS_TOKENS
+    assert choice.finish_reason == "length"
+
+    stopping = StoppingCriteria(ignore_eos=True, max_model_tokens=100)
+    assert generate_choices(tokens=RequestTokens(prompt="Hello"), stopping=stopping)[0].num_tokens == 100
@@ -0,0 +1,29 @@
+import pytest
+
+from tests.utils import kill_openmockllm, run_openmockllm
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    """Server streaming chunks of 3 tokens"""
+    process = run_openmockllm(stream_chunk_tokens=3)
+    yield process.url
+    kill_openmockllm(process)
+
+
+@pytest.mark.parametrize("max_tokens", [20, 21])
+def test_streaming_chunks_logprobs(vllm_client, max_tokens):
+    """Test that each streamed chunk carries the logprobs of its own tokens, the last chunk being shorter"""
+    stream_response = vllm_client.chat.completions.create(
+        model="openmockllm",
+        messages=[{"role": "user", "content": "Hello, how are you?"}],
+        max_tokens=max_tokens,
+        logprobs=True,
+        stream=True,
+    )
+
+    chunks = [c for c in stream_response if c.choices[0].finish_reason is None]
+
+    assert [len(c.choices[0].logprobs.content) for c in chunks] == [3] * (max_tokens // 3) + ([max_tokens % 3] if max_tokens % 3 else [])
+    data = b"".join(bytes(token.bytes) for c in chunks for token in c.choices[0].logprobs.content)
+    assert data.decode(errors="ignore") == "".join(c.choices[0].delta.content for c in chunks)
@@ -9,7 +9,12 @@ logger = logging.getLogger(__name__)
 
 
 def run_openmockllm(**kwargs) -> subprocess.Popen:
-    """Run the openmockllm process and return the process object."""
+    """
+    Run the openmockllm process and return the process object.
+
+    The keyword arguments are the arguments of the server, with underscores for dashes: `True` passes a flag
+    (e.g. `continuous_batching=True`), other values are passed as is (e.g. `simulate_latency="True"`).
+    """
 
     port = random.randint(40000, 41000)
 
@@ -26,10 +31,12 @@ def run_openmockllm(**kwargs) -> subprocess.Popen:
 
     command = ["openmockllm", "--port", str(port)]
     for key, value in kwargs.items():
-        command.append(f"--{key}")
-        command.append(str(value))
+        command.append(f"--{key.replace('_', '-')}")
+        if value is not True:
+            command.append(str(value))
 
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # the logs of the requests are not read, a pipe would fill up and block the server
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
 
     url = f"http://localhost:{port}"
     process.url = url